@@ -1,8 +1,9 @@
 from fastapi import APIRouter
 
 from api.api_v1.endpoints import currencies, indexes, rewards, latest_block_rewards
+from api.responses import MsgspecJSONResponse
 
-api_v1_router = APIRouter(prefix="/api/v1")
+api_v1_router = APIRouter(prefix="/api/v1", default_response_class=MsgspecJSONResponse)
 api_v1_router.include_router(currencies.router, tags=["currencies"])
 api_v1_router.include_router(indexes.router, tags=["indexes"])
 api_v1_router.include_router(rewards.router, tags=["rewards"])
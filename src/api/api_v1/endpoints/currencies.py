@@ -1,13 +1,11 @@
-import json
 import logging
 
-from pydantic import parse_raw_as
-from pydantic.json import pydantic_encoder
 from redis import Redis
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 from fastapi_plugins import depends_redis
 from fastapi_limiter.depends import RateLimiter
 
+from api.responses import encode_json
 from providers.coin_gecko import CoinGecko
 
 router = APIRouter()
@@ -28,10 +26,11 @@ async def supported_currencies(
     # Try to get data from cache first
     data_cache = await cache.get(cache_key)
     if data_cache:
-        return parse_raw_as(list[str], data_cache)
+        # Cached as the JSON of the response
+        return Response(content=data_cache, media_type="application/json")
 
     supported_currencies = sorted(await CoinGecko.supported_vs_currencies(cache))
 
-    await cache.set(cache_key, json.dumps(supported_currencies, default=pydantic_encoder), ex=86_400)
+    await cache.set(cache_key, encode_json(supported_currencies), ex=86_400)
 
     return supported_currencies
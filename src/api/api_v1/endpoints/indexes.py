@@ -93,4 +93,4 @@ async def indexes_for_rp_node_address(
     db_provider: DbProvider = Depends(depends_db),
     rate_limiter: RateLimiter = Depends(RateLimiter(times=10, hours=1)),
 ):
-    return db_provider.indexes_for_rp_node_address(node_address=rp_node_address.lower())
+    return await db_provider.indexes_for_rp_node_address(node_address=rp_node_address.lower())
@@ -1,16 +1,14 @@
 import datetime
-import json
 import logging
 
 import pytz
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 from fastapi_limiter.depends import RateLimiter
 from fastapi_plugins import depends_redis
-from pydantic import parse_raw_as
-from pydantic.json import pydantic_encoder
 from redis import Redis
 
 from api.api_v1.models import ExecLayerBlockReward
+from api.responses import encode_json
 from providers.beacon_node import BeaconNode, depends_beacon_node
 from providers.db_provider import DbProvider, depends_db
 
@@ -34,11 +32,12 @@ async def latest_block_rewards(
     # Try to get data from cache first
     data_cache = await cache.get(cache_key)
     if data_cache:
-        return parse_raw_as(list[ExecLayerBlockReward], data_cache)
+        # Cached as the JSON of the response
+        return Response(content=data_cache, media_type="application/json")
 
     max_slot = beacon_node.slot_for_datetime(datetime.datetime.now(tz=pytz.UTC))
 
-    block_rewards = db_provider.block_rewards(min_slot=0, max_slot=max_slot, proposer_indexes=[], limit=50)
+    block_rewards = await db_provider.block_rewards(min_slot=0, max_slot=max_slot, proposer_indexes=[], limit=50)
 
     exec_layer_block_rewards = []
     for br in block_rewards:
@@ -54,9 +53,10 @@ async def latest_block_rewards(
                 reward=br_reward_eth,
                 slot=br.slot,
                 mev=br.mev,
+                verified=br.reward_verified,
             )
         )
 
-    await cache.set(cache_key, json.dumps(exec_layer_block_rewards, default=pydantic_encoder), ex=60)
+    await cache.set(cache_key, encode_json(exec_layer_block_rewards), ex=60)
 
     return exec_layer_block_rewards
@@ -1,9 +1,11 @@
+import bisect
+import itertools
 import logging
+from collections import defaultdict
 from decimal import Decimal
 from typing import List
 import datetime
 from enum import Enum
-import asyncio
 
 from redis import Redis
 from fastapi import APIRouter, Depends, HTTPException, Query
@@ -20,10 +22,11 @@ from api.api_v1.models import (
     ValidatorRewards,
     Withdrawal,
 )
-from db.tables import Balance
+from api.responses import MsgspecJSONResponse
 from providers.beacon_node import depends_beacon_node, BeaconNode, GENESIS_DATETIME
 from providers.coin_gecko import depends_coin_gecko, CoinGecko, SupportedToken
 from providers.db_provider import depends_db, DbProvider
+from providers.price_cache import MissingPriceError
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -168,40 +171,21 @@ async def rewards(
     activation_slots = await beacon_node.activation_slots_for_validators(
         validator_indexes=list(validator_indexes), cache=cache
     )
+    initial_balance_slot = first_slot_in_requested_period
     initial_balances = {}
-    for activation_slot in set(activation_slots.values()):
-        if activation_slot is None:
-            continue
-        vi_with_this_as = []
-        for vi in validator_indexes:
-            if activation_slots[vi] == activation_slot:
-                vi_with_this_as.append(vi)
-
+    for vi in validator_indexes:
+        activation_slot = activation_slots[vi]
         # In case the validator is being activated during the requested time period,
         # the initial balance will be equal to its balance in the activation epoch.
-        if activation_slot > first_slot_in_requested_period:
-            initial_balance_slot = activation_slot
-            # In 99.999% of time the balance at the activation slot will be 32 -> return 32
-            # (otherwise retrieving it on-demand is very resource-intensive and slow)
-            initial_balances_tmp = [
-                Balance(
-                    slot=activation_slot,
-                    validator_index=vi,
-                    balance=32,
-                ) for vi in vi_with_this_as
-            ]
-            #initial_balances_tmp = await beacon_node.balances_for_slot(initial_balance_slot, vi_with_this_as)
-        else:
-            initial_balance_slot = BeaconNode.slot_for_datetime(start_dt_utc)
-            initial_balances_tmp = db_provider.balances(slots=[initial_balance_slot], validator_indexes=vi_with_this_as)
-
-        for vi in vi_with_this_as:
-            balance = next(ib for ib in initial_balances_tmp if ib.validator_index == vi)
+        # In 99.999% of time the balance at the activation slot will be 32 -> use 32
+        # (otherwise retrieving it on-demand is very resource-intensive and slow)
+        if activation_slot is not None and activation_slot > first_slot_in_requested_period:
             initial_balances[vi] = InitialBalance(
-                date=BeaconNode.datetime_for_slot(initial_balance_slot, timezone).date(),
-                slot=initial_balance_slot,
-                balance=balance.balance,
+                date=BeaconNode.datetime_for_slot(activation_slot, timezone).date(),
+                slot=activation_slot,
+                balance=32,
             )
+    # The initial balances of the other validators are retrieved together with the end-of-day balances
 
     # - We'll also need balances at midnight for each day in the requested date range
     #   I'm using 23:59:59, 1 second before midnight here, for convenience reasons
@@ -230,6 +214,7 @@ async def rewards(
     head_slot = BeaconNode.head_slot()
     slots_needed = [s for s in slots_needed if s <= head_slot]
     slots_needed = sorted(slots_needed)
+    slots_needed_set = set(slots_needed)
 
     logger.debug(f"Slots: {slots_needed}")
 
@@ -241,11 +226,49 @@ async def rewards(
             eth_prices={},
         )
 
-    # Retrieve the balances for the needed slots from the database
+    # Retrieve the initial and end-of-day balances from the database, all at once
     logger.debug("Retrieving balances from DB")
-    balances = db_provider.balances(
-        slots=slots_needed, validator_indexes=validator_indexes
+    balances = await db_provider.balances(
+        slots=[initial_balance_slot, *slots_needed], validator_indexes=validator_indexes
     )
+    balances_per_validator = defaultdict(list)
+    for b in balances:
+        if b.slot == initial_balance_slot and b.validator_index not in initial_balances:
+            if activation_slots[b.validator_index] is None:
+                continue
+            initial_balances[b.validator_index] = InitialBalance(
+                date=BeaconNode.datetime_for_slot(initial_balance_slot, timezone).date(),
+                slot=initial_balance_slot,
+                balance=b.balance,
+            )
+        if b.slot in slots_needed_set:
+            # Ordered by slot
+            balances_per_validator[b.validator_index].append(b)
+    for vi in validator_indexes:
+        if activation_slots[vi] is not None and vi not in initial_balances:
+            raise HTTPException(status_code=500, detail=f"No initial balance found for {vi}")
+
+    # Retrieve the withdrawals and execution layer rewards of all validators
+    min_slot = beacon_node.slot_for_datetime(start_dt_utc)
+    max_slot = beacon_node.slot_for_datetime(datetime.datetime.combine(
+        end_date,
+        datetime.time(hour=23, minute=59, second=59, tzinfo=timezone)
+    ))
+    withdrawals_per_validator = defaultdict(list)
+    for w in sorted(await db_provider.withdrawals(
+        min_slot=min_slot,
+        max_slot=max_slot,
+        validator_indexes=validator_indexes,
+    ), key=lambda w: w.slot):
+        withdrawals_per_validator[w.validator_index].append(w)
+    block_rewards_per_validator = defaultdict(list)
+    for br in await db_provider.block_rewards(
+        min_slot=min_slot,
+        max_slot=max_slot,
+        proposer_indexes=validator_indexes,
+    ):
+        # Ordered by slot, descending
+        block_rewards_per_validator[br.proposer_index].append(br)
 
     # Retrieve ETH price for the relevant dates
     # - these are determined by the end-of-day slots
@@ -253,19 +276,20 @@ async def rewards(
     #   in slots_needed except for the first slot in there (the
     #   first slot on start_date)
     logger.debug("Retrieving ETH prices")
-    # Use a semaphore to make sure we don't overload CoinGecko with
-    # too many requests at once in case the prices aren't cached
-    sem = asyncio.Semaphore(5)
-    date_eth_price: dict[datetime.date, float] = {}
-    for slot in slots_needed:
-        date = BeaconNode.datetime_for_slot(slot, timezone).date()
-
-        async with sem:
-            date_eth_price[date] = float(db_provider.close_price_for_date(
-                token=SupportedToken.ETH,
-                currency=currency,
-                date=date,
-            ))
+    price_dates = sorted({BeaconNode.datetime_for_slot(slot, timezone).date() for slot in slots_needed})
+    try:
+        prices = await db_provider.close_prices(
+            token=SupportedToken.ETH,
+            currency=currency,
+            start_date=price_dates[0],
+            end_date=price_dates[-1],
+        )
+    except MissingPriceError as e:
+        logger.exception(e)
+        raise HTTPException(status_code=500, detail=f"Failed to get price for {e.date}")
+    date_eth_price: dict[datetime.date, float] = {
+        date: prices[(date - price_dates[0]).days] for date in price_dates
+    }
 
     # Order the prices nicely
     date_eth_price = {date: price for date, price in sorted(date_eth_price.items())}
@@ -283,22 +307,12 @@ async def rewards(
         # Skip pending validators
         if activation_slots[validator_index] is None:
             continue
-        validator_balances = [
-            b for b in balances if b.validator_index == validator_index
-        ]
-
-        # Sort them by the slot number
-        validator_balances = sorted(validator_balances, key=lambda x: x.slot)
-
-        # Retrieve the withdrawals
-        withdrawals = db_provider.withdrawals(
-            min_slot=beacon_node.slot_for_datetime(start_dt_utc),
-            max_slot=beacon_node.slot_for_datetime(datetime.datetime.combine(
-                end_date,
-                datetime.time(hour=23, minute=59, second=59, tzinfo=timezone)
-            )),
-            validator_indexes=[validator_index]
-        )
+        validator_balances = balances_per_validator[validator_index]
+
+        # Withdrawals ordered by slot, with cumulative amounts to sum them up per day
+        withdrawals = withdrawals_per_validator[validator_index]
+        withdrawal_slots = [w.slot for w in withdrawals]
+        cumulative_withdrawn_gwei = [0, *itertools.accumulate(w.amount_gwei for w in withdrawals)]
 
         # Populate the initial and end-of-day validator balances
         initial_balance = initial_balances[validator_index]
@@ -324,13 +338,11 @@ async def rewards(
                 )
             )
 
-            # Calculate earnings, accounting for withdrawals
-            amount_withdrawn_this_day = sum(
-                w.amount_gwei for w in db_provider.withdrawals(
-                    min_slot=prev_balance.slot,
-                    max_slot=vb.slot,
-                    validator_indexes=[validator_index]
-                )
+            # Calculate earnings, accounting for withdrawals made from the previous balance's slot
+            # up to this balance's slot (both inclusive)
+            amount_withdrawn_this_day = (
+                cumulative_withdrawn_gwei[bisect.bisect_right(withdrawal_slots, vb.slot)]
+                - cumulative_withdrawn_gwei[bisect.bisect_left(withdrawal_slots, prev_balance.slot)]
             )
             day_rewards_eth = vb.balance - prev_balance.balance + amount_withdrawn_this_day / Decimal(1e9)
 
@@ -340,15 +352,8 @@ async def rewards(
             # Set prev_balance to current balance for next loop iteration
             prev_balance = vb
 
-        # Retrieve the execution layer rewards
-        block_rewards = db_provider.block_rewards(
-            min_slot=beacon_node.slot_for_datetime(start_dt_utc),
-            max_slot=beacon_node.slot_for_datetime(datetime.datetime.combine(
-                end_date,
-                datetime.time(hour=23, minute=59, second=59, tzinfo=timezone)
-            )),
-            proposer_indexes=[validator_index]
-        )
+        # Execution layer rewards
+        block_rewards = block_rewards_per_validator[validator_index]
 
         # Check if all execution layer rewards were processed correctly
         for br in block_rewards:
@@ -378,6 +383,7 @@ async def rewards(
                     reward=br_reward_eth,
                     slot=br.slot,
                     mev=br.mev,
+                    verified=br.reward_verified,
                 )
             )
 
@@ -397,4 +403,5 @@ async def rewards(
                 total_execution_layer_currency=total_execution_layer_currency,
             )
         )
-    return aggregate_rewards
+    # Validated already
+    return MsgspecJSONResponse(aggregate_rewards)
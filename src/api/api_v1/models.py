@@ -28,6 +28,9 @@ class ExecLayerBlockReward(BaseModel):
     reward: float = Field(..., example=0.013)
     slot: int = Field(..., example=78391)
     mev: bool = Field(..., example=False)
+    verified: bool = Field(True,
+                           example=True,
+                           description="False if the reward is a provisional value reported by a MEV relay that was not verified yet")
 
     def __str__(self):
         return f"ExecLayerBlockReward for {self.slot}"
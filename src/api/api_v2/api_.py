@@ -1,7 +1,8 @@
 from fastapi import APIRouter
 
 from api.api_v2.endpoints import prices, rewards
+from api.responses import MsgspecJSONResponse
 
-api_v2_router = APIRouter(prefix="/api/v2")
+api_v2_router = APIRouter(prefix="/api/v2", default_response_class=MsgspecJSONResponse)
 api_v2_router.include_router(rewards.router, tags=["rewards"])
 api_v2_router.include_router(prices.router, tags=["prices"])
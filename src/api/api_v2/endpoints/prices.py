@@ -11,6 +11,7 @@ from api.api_v2.models import PricesResponse, PriceForDate
 from providers.beacon_node import GENESIS_DATETIME
 from providers.coin_gecko import CoinGecko, depends_coin_gecko, SupportedToken
 from providers.db_provider import DbProvider, depends_db
+from providers.price_cache import MissingPriceError
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -44,28 +45,25 @@ async def prices(
     today = datetime.datetime.now(tz=pytz.UTC).date()
     end_date = min(end_date, today - datetime.timedelta(days=1))
 
-    range_day_count = (end_date - start_date).days + 1
+    try:
+        prices = await db_provider.close_prices(
+            token=token,
+            currency=currency,
+            start_date=start_date,
+            end_date=end_date,
+        )
+    except MissingPriceError as e:
+        logger.exception(e)
+        raise HTTPException(status_code=500,
+                            detail=f"Failed to get price for {e.date}")
 
-    response = PricesResponse(
+    return PricesResponse(
         currency=currency,
-        prices=[]
-    )
-    for day_idx in range(range_day_count):
-        date = start_date + datetime.timedelta(days=day_idx)
-        try:
-            response.prices.append(
-                PriceForDate(
-                    date=date,
-                    price=db_provider.close_price_for_date(
-                        token=token,
-                        currency=currency,
-                        date=date,
-                    )
-                )
+        prices=[
+            PriceForDate(
+                date=start_date + datetime.timedelta(days=day_idx),
+                price=price,
             )
-        except Exception as e:
-            logger.exception(e)
-            raise HTTPException(status_code=500,
-                                detail=f"Failed to get price for {date}")
-
-    return response
+            for day_idx, price in enumerate(prices)
+        ]
+    )
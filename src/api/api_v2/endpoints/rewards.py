@@ -1,219 +1,53 @@
+import asyncio
 import datetime
 import logging
 from collections import defaultdict
 from decimal import Decimal
-from typing import Type
-
-from math import floor
+from typing import AsyncIterator, Awaitable, TypeVar
 
+import numpy as np
 import pytz
 from redis import Redis
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
 from fastapi_plugins import depends_redis
 from fastapi_limiter.depends import RateLimiter
-
-from api.api_v2.models import RewardsRequest, ValidatorRewards, RewardForDate, \
-    RocketPoolValidatorRewards, RewardsResponseRocketPool, RewardsResponseFull, RocketPoolNodeRewardForDate
-from db.tables import Withdrawal, RocketPoolBondReduction, RocketPoolMinipool
+from prometheus_client.metrics import Histogram
+
+from api.api_v2.models import RewardsRequest, ValidatorRewards, RewardForDate, ExecutionLayerRewardForDate, \
+    RocketPoolValidatorRewards, RewardsResponseRocketPool, RewardsResponseFull, RocketPoolNodeRewardForDate, \
+    RewardsResponseFormat
+from api.responses import MsgspecJSONResponse, encode_json
+from api.rewards_columnar import RewardsMatrix
+from api.rewards_engine import BalanceArrays, BlockRewardArrays, WithdrawalArrays, \
+    compute_consensus_layer_rewards, compute_execution_layer_rewards, slot_days
+from api.rewards_stream import ValidatorOrderedRows, stream_validator_rewards
 from providers.beacon_node import BeaconNode, depends_beacon_node
 from providers.db_provider import DbProvider, depends_db
-from providers.execution_node import ExecutionNode
-from providers.rocket_pool import SMOOTHING_POOL_ADDRESS, RocketPoolDataProvider
+from providers.rocket_pool import SMOOTHING_POOL_ADDRESS
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+REWARDS_STAGE_SECONDS = Histogram(
+    "rewards_stage_seconds",
+    "Time spent in each stage of a rewards request",
+    labelnames=("endpoint", "stage"),
+    buckets=[.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60, 120, 180, 300, float("inf")],
+)
 
-async def _get_rocket_pool_reward_share_withdrawal_for_bond_fee(withdrawal, bond, fee, minipool_address: str):
-    _FULL_MINIPOOL_BOND = 32 * Decimal(1e18)
-
-    if withdrawal.amount_gwei > 8 * Decimal(1e9):
-        # Consider this a full withdrawal
-        # TODO
-        # We need to take into account "penalties",
-        # see _distributeBalance
-
-        # uint256 nodeAmount = 0;
-        #         uint256 userCapital = getUserDepositBalance();
-        #         // Check if node operator was slashed
-        #         if (_balance < userCapital) {
-        #             // Only slash on first call to distribute
-        #             if (withdrawalBlock == 0) {
-        #                 // Record shortfall for slashing
-        #                 nodeSlashBalance = userCapital.sub(_balance);
-        #             }
-
-        rocket_pool_data = RocketPoolDataProvider(execution_node=ExecutionNode())
-        block_number = (
-            await BeaconNode().get_slot_proposer_data(withdrawal.slot)).block_number
-        user_capital = await rocket_pool_data.get_minipool_user_deposit_balance(
-            minipool_address=minipool_address,
-            block_number=block_number
-        )
-        node_capital = await rocket_pool_data.get_minipool_node_deposit_balance(
-            minipool_address=minipool_address,
-            block_number=block_number
-        )
-        capital = user_capital + node_capital
-
-        # Work with wei from here
-        withdrawal_amount_wei = withdrawal.amount_gwei * Decimal(1e9)
-
-        # First check - if the withdrawal amount is less than the "user" part
-        # the node operator gets nothing (likely due to being slashed)
-        # -> they will actually lose RPL from their node's RPL collateral
-        # -> that will not be part of the output, not supported for now
-        if withdrawal_amount_wei < user_capital:
-            # TODO not supported yet
-            raise HTTPException(status_code=500, detail="Full withdrawal, balance < user_capital!")
-
-        # nodeAmount = _calculateNodeShare(_balance);
-        #     function _calculateNodeShare(uint256 _balance) internal view returns (uint256) {
-        #         uint256 userCapital = getUserDepositBalance();
-        #         uint256 nodeCapital = nodeDepositBalance;
-        #         uint256 nodeShare = 0;
-        #         // Calculate the total capital (node + user)
-        #         uint256 capital = userCapital.add(nodeCapital);
-        #         if (_balance > capital) {
-        #             // Total rewards to share
-        #             uint256 rewards = _balance.sub(capital);
-        #             nodeShare = nodeCapital.add(calculateNodeRewards(nodeCapital, userCapital, rewards));
-        #         } else if (_balance > userCapital) {
-        #             nodeShare = _balance.sub(userCapital);
-        #         }
-        #         // Check if node has an ETH penalty
-        #         uint256 penaltyRate = RocketMinipoolPenaltyInterface(rocketMinipoolPenalty).getPenaltyRate(address(this));
-        #         if (penaltyRate > 0) {
-        #             uint256 penaltyAmount = nodeShare.mul(penaltyRate).div(calcBase);
-        #             if (penaltyAmount > nodeShare) {
-        #                 penaltyAmount = nodeShare;
-        #             }
-        #             nodeShare = nodeShare.sub(penaltyAmount);
-        #         }
-        #         return nodeShare;
-
-        if withdrawal_amount_wei >= capital:
-            # Total rewards to share
-            total_reward_wei = withdrawal_amount_wei - capital
-            # --> calculate node's share by current bond, fee... per usual
-            return total_reward_wei * (
-                # NO bond part
-                (bond / _FULL_MINIPOOL_BOND)
-                # User bond part - commission
-                + ((_FULL_MINIPOOL_BOND - bond) / _FULL_MINIPOOL_BOND) * (fee / Decimal(1e18))
-            )
-        # TODO rest of branches?
-        # TODO handle ETH penalties!
-        msg = (f"Full withdrawal detected where withdrawal value ({withdrawal_amount_wei})"
-               f" is less than minipool capital ({capital}) for minipool {minipool_address}"
-               f" - unable to determine node operator share")
-        logger.error(msg)
-        raise HTTPException(
-            status_code=500,
-            detail=msg
-        )
-
-    return Decimal(1e9) * withdrawal.amount_gwei * (
-        # NO bond part
-        (bond / _FULL_MINIPOOL_BOND)
-        # User bond part - commission
-        + ((_FULL_MINIPOOL_BOND - bond) / _FULL_MINIPOOL_BOND) * (fee / Decimal(1e18))
-    )
-
-
-async def get_rocket_pool_reward_share_withdrawal(withdrawal: Withdrawal, minipool: 'Type[RocketPoolMinipool]') -> RewardForDate:
-    # Figure out correct bond & fee for this withdrawal
-    withdrawal_dt = BeaconNode.datetime_for_slot(
-        slot=withdrawal.slot,
-        timezone=pytz.UTC
-    )
-
-    # Go over bond reductions in reverse order - most recent to least recent
-    # If the withdrawal occurred after a given bond reduction, its value
-    # will be split among the node and user based on the bond/fee at
-    # that time
-    for bond_reduction in sorted(minipool.bond_reductions,
-                                 key=lambda x: x.timestamp, reverse=True):
-        if withdrawal_dt > bond_reduction.timestamp:
-            amount_no = await _get_rocket_pool_reward_share_withdrawal_for_bond_fee(
-                withdrawal=withdrawal,
-                bond=bond_reduction.new_bond_amount,
-                fee=bond_reduction.new_fee,
-                minipool_address=minipool.minipool_address,
-            )
-
-            return RewardForDate(
-                date=withdrawal_dt.date(),
-                amount_wei=amount_no,
-            )
-
-    # The withdrawal occurred before any bond reductions
-    # => apply minipool's initial bond & fee
-    amount_no = await _get_rocket_pool_reward_share_withdrawal_for_bond_fee(
-        withdrawal=withdrawal,
-        bond=minipool.initial_bond_value,
-        fee=minipool.initial_fee_value,
-        minipool_address=minipool.minipool_address,
-    )
-
-    return RewardForDate(
-        date=withdrawal_dt.date(),
-        amount_wei=amount_no,
-    )
-
+T = TypeVar("T")
 
-async def get_rocket_pool_reward_share_proposal_fee_distributor(
-    node_address: str,
-    fee_distributor: str,
-    slot: int,
-    beacon_node: BeaconNode,
-    rocket_pool_data: RocketPoolDataProvider,
-) -> int:
-    logger.info(f"Getting reward share for proposal in slot {slot}, FD {fee_distributor}...")
+_COLUMNAR_MEDIA_TYPES = {
+    RewardsResponseFormat.COLUMNAR: "application/json",
+    RewardsResponseFormat.ARROW: "application/vnd.apache.arrow.stream",
+    RewardsResponseFormat.PARQUET: "application/vnd.apache.parquet",
+}
 
-    # TODO pass block_number here directly once those are indexed
-    #  and present in the block reward table
-    block_number = (await beacon_node.get_slot_proposer_data(slot)).block_number
 
-    try:
-        node_share_before_proposal = await rocket_pool_data.get_node_fee_distributor_share(
-            node_fee_distributor_address=fee_distributor,
-            block_number=block_number-1,
-        )
-        node_share_after_proposal = await rocket_pool_data.get_node_fee_distributor_share(
-            node_fee_distributor_address=fee_distributor,
-            block_number=block_number,
-        )
-        # TODO check if units correct here
-        return node_share_after_proposal - node_share_before_proposal
-    except ValueError:
-        # getNodeShare only available in post-Atlas distributor delegate...
-        # We have to calculate the shares manually here
-        avg_node_fee = await rocket_pool_data.get_node_average_fee(
-            node_address=node_address,
-            block_number=block_number,
-        )
-        # assume the collateralization ratio is half in this case
-        # see e.g. https://github.com/rocket-pool/rocketpool/commit/f50109be11d68043446528c25c015a060475e6ca#diff-67701dbf2e859026c6c26c91b5e6e87f63a74de84093b0b98e08e92ade041cc5
-        # "// Fallback for backwards compatibility before ETH matched was recorded (all minipools matched 16 ETH from protocol)"
-        # "// All legacy minipools had a 1:1 ratio"
-        # Verify if this value is ok (in terms of order of magnitude too)
-        collateralization_ratio = 2 * Decimal(1e18)
-
-        fee_distributor_balance_change = await rocket_pool_data.execution_node.get_balance(
-            address=fee_distributor, block_number=block_number,
-            use_infura=True) - await rocket_pool_data.execution_node.get_balance(
-            address=fee_distributor, block_number=block_number - 1, use_infura=True)
-        # Note - no need to adjust this balance change for withdrawal operations since all RP
-        # withdrawal operations go to the minipool smart contracts
-        node_balance_change = fee_distributor_balance_change * Decimal(1e18) / collateralization_ratio
-        user_balance_change = fee_distributor_balance_change - node_balance_change
-        node_share = node_balance_change + user_balance_change * avg_node_fee / Decimal(1e18)
-        user_share = fee_distributor_balance_change - node_share
-
-        # TODO check if units correct here
-        # Round down like SafeMath does, which is used in RP smart contracts
-        return floor(node_share)
+async def _stage(endpoint: str, stage: str, awaitable: Awaitable[T]) -> T:
+    with REWARDS_STAGE_SECONDS.labels(endpoint, stage).time():
+        return await awaitable
 
 
 async def _preprocess_request_input_data(rewards_request: RewardsRequest) -> tuple[
@@ -275,23 +109,25 @@ async def rewards(
     (validator_indexes, start_datetime, end_datetime,
      min_slot, max_slot, _) = await _preprocess_request_input_data(rewards_request)
 
-    # Get all withdrawals
-    logger.debug(f"Getting withdrawals")
-    all_withdrawals = sorted(db_provider.withdrawals(
-        min_slot=min_slot,
-        max_slot=max_slot,
-        validator_indexes=validator_indexes
-    ), key=lambda x: x.slot)
-
-    # Get all block rewards
-    logger.debug(f"Getting block rewards for ({min_slot} - {max_slot})")
-    all_block_rewards = db_provider.block_rewards(
-        min_slot=min_slot,
-        max_slot=max_slot,
-        proposer_indexes=validator_indexes
+    # Independent queries run concurrently, each on its own pooled connection
+    logger.debug(f"Getting withdrawals, block rewards ({min_slot} - {max_slot}), minipools and fee distributors")
+    all_withdrawals, all_block_rewards, rocket_pool_minipools, rocket_pool_fee_distributors = await asyncio.gather(
+        _stage("rocket_pool", "withdrawals", db_provider.withdrawals(
+            min_slot=min_slot,
+            max_slot=max_slot,
+            validator_indexes=validator_indexes
+        )),
+        _stage("rocket_pool", "block_rewards", db_provider.block_rewards(
+            min_slot=min_slot,
+            max_slot=max_slot,
+            proposer_indexes=validator_indexes
+        )),
+        _stage("rocket_pool", "minipools", db_provider.minipools_for_validators(validator_indexes=validator_indexes)),
+        _stage("rocket_pool", "fee_distributors", db_provider.fee_distributor_addresses_for_validator_indexes(
+            validator_indexes=validator_indexes
+        )),
     )
-
-    rocket_pool_minipools = db_provider.minipools_for_validators(validator_indexes=validator_indexes)
+    all_withdrawals = sorted(all_withdrawals, key=lambda x: x.slot)
 
     if len(rocket_pool_minipools.keys()) != len(validator_indexes):
         mp_indexes = set(rocket_pool_minipools.keys())
@@ -300,35 +136,37 @@ async def rewards(
         logger.warning(f"Unable to find RP minipools ({rocket_pool_minipools}) for all validators ({validator_indexes})!")
         raise HTTPException(status_code=400, detail=f"Unable to find RP minipools for all validators, missing {unknown_validator_indexes}!")
 
-    rocket_pool_validator_indexes = [index for index, mp in
-                                     rocket_pool_minipools.items()]
-    rocket_pool_node_rewards = db_provider.rocket_pool_node_rewards_for_minipools(
-        minipool_addresses=[mp.minipool_address for mp in
-                            rocket_pool_minipools.values()],
-        from_datetime=start_datetime,
-        to_datetime=end_datetime,
-    )
-    rocket_pool_fee_distributors = db_provider.fee_distributor_addresses_for_validator_indexes(
-        validator_indexes=rocket_pool_validator_indexes
+    # Node operator shares are computed by the Rocket Pool indexer
+    rocket_pool_node_rewards, withdrawal_shares, proposal_shares = await asyncio.gather(
+        _stage("rocket_pool", "node_rewards", db_provider.rocket_pool_node_rewards_for_minipools(
+            minipool_addresses=[mp.minipool_address for mp in
+                                rocket_pool_minipools.values()],
+            from_datetime=start_datetime,
+            to_datetime=end_datetime,
+        )),
+        _stage("rocket_pool", "withdrawal_shares", db_provider.rocket_pool_withdrawal_shares(
+            withdrawal_ids=[w.id for w in all_withdrawals]
+        )),
+        _stage("rocket_pool", "proposal_shares", db_provider.rocket_pool_proposal_shares(
+            slots=[br.slot for br in all_block_rewards]
+        )),
     )
-    rocket_pool_data = None
-    if len(rocket_pool_validator_indexes) > 0:
-        # we'll need Rocket Pool data
-        rocket_pool_data = RocketPoolDataProvider(execution_node=ExecutionNode())
 
     validator_rewards_list = []
     withdrawals_node_operator = defaultdict(list)
-    for validator_index in validator_indexes:
-        minipool = rocket_pool_minipools[validator_index]
-
-        for withdrawal in [w for w in all_withdrawals if
-                           w.validator_index == validator_index]:
-            withdrawals_node_operator[validator_index].append(
-                await get_rocket_pool_reward_share_withdrawal(
-                    withdrawal=withdrawal,
-                    minipool=minipool
-                )
+    for withdrawal in all_withdrawals:
+        share = withdrawal_shares.get(withdrawal.id)
+        if share is None or share.error is not None:
+            msg = share.error if share is not None else (
+                f"Node operator share not available yet for withdrawal"
+                f" in slot {withdrawal.slot} (validator {withdrawal.validator_index})"
             )
+            logger.error(msg)
+            raise HTTPException(status_code=500, detail=msg)
+        withdrawals_node_operator[withdrawal.validator_index].append(RewardForDate(
+            date=BeaconNode.datetime_for_slot(slot=withdrawal.slot, timezone=pytz.UTC).date(),
+            amount_wei=share.node_operator_share_wei,
+        ))
 
     el_rewards_node_operator = defaultdict(list)
     for validator_index in validator_indexes:
@@ -336,6 +174,7 @@ async def rewards(
 
         # Sum in case multiple proposals happen on the same day
         exec_layer_rewards_node_operator_for_date = defaultdict(Decimal)
+        exec_layer_rewards_verified_for_date = defaultdict(lambda: True)
         # Only count block rewards if they didn't go to Rocket Pool's Smoothing Pool
         for br in [br for br in all_block_rewards if br.proposer_index == validator_index]:
             if not br.reward_processed_ok:
@@ -356,16 +195,18 @@ async def rewards(
                 continue
             elif reward_recipient == rocket_pool_fee_distributors[
                 validator_index]:
-                # Get the balance delta of the fee distributor contract
+                # Node operator share of the fee distributor's balance change
                 date = BeaconNode.datetime_for_slot(slot=br.slot, timezone=pytz.UTC).date()
 
-                exec_layer_rewards_node_operator_for_date[date] += await get_rocket_pool_reward_share_proposal_fee_distributor(
-                    node_address=minipool.node_address,
-                    fee_distributor=rocket_pool_fee_distributors[validator_index],
-                    slot=br.slot,
-                    beacon_node=beacon_node,
-                    rocket_pool_data=rocket_pool_data,
-                )
+                share = proposal_shares.get(br.slot)
+                if share is None or share.error is not None:
+                    msg = share.error if share is not None else (
+                        f"Node operator share not available yet for proposal in slot {br.slot}"
+                    )
+                    logger.error(msg)
+                    raise HTTPException(status_code=500, detail=msg)
+                exec_layer_rewards_verified_for_date[date] &= br.reward_verified
+                exec_layer_rewards_node_operator_for_date[date] += share.node_operator_share_wei
             else:
                 message = f"Block reward for slot {br.slot} "\
                           f"proposed by RP minipool ({minipool.minipool_address} / {validator_index})"\
@@ -379,9 +220,10 @@ async def rewards(
                 )
 
         for date, reward_amount in exec_layer_rewards_node_operator_for_date.items():
-            el_rewards_node_operator[validator_index].append(RewardForDate(
+            el_rewards_node_operator[validator_index].append(ExecutionLayerRewardForDate(
                 date=date,
-                amount_wei=reward_amount
+                amount_wei=reward_amount,
+                verified=exec_layer_rewards_verified_for_date[date],
             ))
 
     for validator_index in sorted(validator_indexes):
@@ -392,7 +234,7 @@ async def rewards(
         )
         validator_rewards_list.append(validator_rewards)
 
-    return RewardsResponseRocketPool.construct(
+    return MsgspecJSONResponse(RewardsResponseRocketPool.construct(
         validator_rewards_list=validator_rewards_list,
         rocket_pool_node_rewards=[
             RocketPoolNodeRewardForDate(
@@ -403,7 +245,59 @@ async def rewards(
             )
             for reward in rocket_pool_node_rewards
         ],
-    )
+    ))
+
+
+def _check_block_rewards(block_rewards: list, expected_fee_recipient_addresses: list[str]) -> None:
+    # Check if all execution layer rewards were processed correctly
+    for br in block_rewards:
+        if not br.reward_processed_ok:
+            msg = (f"Execution layer rewards not available"
+                   f" - missing data for proposer {br.proposer_index}, slot {br.slot}")
+            logger.error(msg)
+            raise HTTPException(
+                status_code=500,
+                detail=msg
+            )
+        if len(expected_fee_recipient_addresses) > 0:
+            # Check block reward recipient against expected fee recipient addresses
+            # to double check any MEV was processed correctly
+            if br.mev and br.mev_reward_recipient.lower() not in expected_fee_recipient_addresses:
+                msg = f"Unexpected MEV recipient {br.mev_reward_recipient} for slot {br.slot} (expected: one of {expected_fee_recipient_addresses})"
+                logger.error(msg)
+                raise HTTPException(status_code=400, detail=msg)
+            if not br.mev and br.fee_recipient.lower() not in expected_fee_recipient_addresses:
+                msg = f"Unexpected fee recipient {br.fee_recipient} for slot {br.slot} (expected: one of {expected_fee_recipient_addresses})"
+                logger.error(msg)
+                raise HTTPException(status_code=400, detail=msg)
+
+
+async def _ndjson_validator_rewards(
+    db_provider: DbProvider,
+    validator_indexes: list[int],
+    initial_balance_rows: list[tuple[int, int, int]],
+    activation_slots: dict[int, int | None],
+    eod_slots: list[int],
+    min_slot: int,
+    max_slot: int,
+    block_rewards: list,
+) -> AsyncIterator[bytes]:
+    execution_layer_rewards = compute_execution_layer_rewards(BlockRewardArrays.from_block_rewards(block_rewards)).by_validator()
+    eod_balances = ValidatorOrderedRows(db_provider.stream_balances_gwei(slots=eod_slots, validator_indexes=validator_indexes))
+    withdrawals = ValidatorOrderedRows(db_provider.stream_withdrawals(min_slot=min_slot, max_slot=max_slot, validator_indexes=validator_indexes))
+    try:
+        async for batch in stream_validator_rewards(
+            validator_indexes=validator_indexes,
+            initial_balances={row[0]: row for row in initial_balance_rows},
+            activation_slots=activation_slots,
+            eod_balances=eod_balances,
+            withdrawals=withdrawals,
+            execution_layer_rewards=execution_layer_rewards,
+        ):
+            yield b"".join(encode_json(validator_rewards) + b"\n" for validator_rewards in batch)
+    finally:
+        await eod_balances.aclose()
+        await withdrawals.aclose()
 
 
 @router.post(  # POST method to support bigger requests
@@ -416,51 +310,53 @@ async def rewards(
     db_provider: DbProvider = Depends(depends_db),
     cache: Redis = Depends(depends_redis),
     rate_limiter: RateLimiter = Depends(RateLimiter(times=100, hours=1)),
+    response_format: RewardsResponseFormat = Query(
+        RewardsResponseFormat.JSON,
+        alias="format",
+        description="With ndjson, the rewards of each validator are returned on a separate line"
+                    " (application/x-ndjson), streamed while they are computed."
+                    " With columnar, the rewards are returned as one array of amounts per validator along"
+                    " a shared date axis - arrow (Arrow IPC stream) and parquet return the same amounts"
+                    " as a table with one row per validator and date.",
+    ),
 ) -> RewardsResponseFull:
     validator_indexes, start_datetime, end_datetime, min_slot, max_slot, expected_fee_recipient_addresses = await _preprocess_request_input_data(rewards_request)
 
     # Let's get the rewards
     first_slot_in_requested_period = min_slot
-    try:
-        activation_slots = await beacon_node.activation_slots_for_validators(validator_indexes=validator_indexes, cache=cache)
-    except Exception:
-        logger.exception(f"Failed to get activation slots for {validator_indexes}")
-        raise HTTPException(status_code=500,
-                            detail=f"Failed to get activation slots for {validator_indexes}")
-    consensus_layer_rewards: dict[int, list[RewardForDate]] = defaultdict(list)
-    execution_layer_rewards: dict[int, list[RewardForDate]] = defaultdict(list)
-    withdrawals: dict[int, list[RewardForDate]] = defaultdict(list)
-
-    # - Get initial balances
-    logger.debug(f"Getting initial balances")
-    initial_balances = {}
-    pending_validator_indexes = set()
-    for validator_index in validator_indexes:
-        act_slot = activation_slots[validator_index]
-        if act_slot is None:
-            # Pending validator without an activation slot
-            pending_validator_indexes.add(validator_index)
-            continue
 
-        if act_slot > first_slot_in_requested_period:
-            initial_balance_maybe = db_provider.balances(
-                slots=[act_slot],
-                validator_indexes=[validator_index],
-            )
-            if len(initial_balance_maybe) == 1:
-                initial_balance = initial_balance_maybe[0]
+    async def _get_initial_balances() -> tuple[dict[int, int | None], set[int], list[tuple[int, int, int]]]:
+        # Initial balance slots depend on the activation slots
+        try:
+            activation_slots = await _stage("full", "activation_slots", beacon_node.activation_slots_for_validators(
+                validator_indexes=validator_indexes, cache=cache,
+            ))
+        except Exception:
+            logger.exception(f"Failed to get activation slots for {validator_indexes}")
+            raise HTTPException(status_code=500,
+                                detail=f"Failed to get activation slots for {validator_indexes}")
+
+        logger.debug(f"Getting initial balances")
+        initial_balance_slots = {}
+        pending_validator_indexes = set()
+        for validator_index in validator_indexes:
+            act_slot = activation_slots[validator_index]
+            if act_slot is None:
+                # Pending validator without an activation slot
+                pending_validator_indexes.add(validator_index)
+                continue
+
+            # Validators activated during the requested period start at their activation balance
+            if act_slot > first_slot_in_requested_period:
+                initial_balance_slots[validator_index] = act_slot
             else:
-                raise HTTPException(status_code=500, detail=f"No initial balance found for {validator_index}")
-        else:
-            initial_balance_slot = BeaconNode.slot_for_datetime(dt=start_datetime)
-            initial_balance = db_provider.balances(
-                slots=[initial_balance_slot],
-                validator_indexes=[validator_index],
-            )[0]
-        initial_balances[validator_index] = initial_balance
-
-    # - Get all end-of-day balances
-    logger.debug(f"Getting EOD balances")
+                initial_balance_slots[validator_index] = BeaconNode.slot_for_datetime(dt=start_datetime)
+        initial_balance_rows = await _stage("full", "initial_balances", db_provider.balances_gwei_at_slots(initial_balance_slots))
+        missing_initial_balances = set(initial_balance_slots).difference(row[0] for row in initial_balance_rows)
+        if missing_initial_balances:
+            raise HTTPException(status_code=500, detail=f"No initial balance found for {sorted(missing_initial_balances)}")
+        return activation_slots, pending_validator_indexes, initial_balance_rows
+
     range_day_count = (end_datetime - start_datetime).days + 1
     eod_slots = [
         beacon_node.slot_for_datetime(
@@ -472,99 +368,86 @@ async def rewards(
         )
         for day_idx in range(range_day_count)
     ]
-    eod_balances = db_provider.balances(slots=eod_slots, validator_indexes=validator_indexes)
-
-    # Get all withdrawals
-    logger.debug(f"Getting withdrawals")
-    all_withdrawals = sorted(db_provider.withdrawals(
-        min_slot=min_slot,
-        max_slot=max_slot,
-        validator_indexes=validator_indexes
-    ), key=lambda x: x.slot)
-
-    # Get all block rewards
-    logger.debug(f"Getting block rewards")
-    all_block_rewards = db_provider.block_rewards(
-        min_slot=min_slot,
-        max_slot=max_slot,
-        proposer_indexes=validator_indexes
-    )
-    # Check if all execution layer rewards were processed correctly
-    for br in all_block_rewards:
-        if not br.reward_processed_ok:
-            msg = (f"Execution layer rewards not available"
-                   f" - missing data for proposer {br.proposer_index}, slot {br.slot}")
-            logger.error(msg)
-            raise HTTPException(
-                status_code=500,
-                detail=msg
-            )
-        if len(expected_fee_recipient_addresses) > 0:
-            # Check block reward recipient against expected fee recipient addresses
-            # to double check any MEV was processed correctly
-            if br.mev and br.mev_reward_recipient.lower() not in expected_fee_recipient_addresses:
-                msg = f"Unexpected MEV recipient {br.mev_reward_recipient} for slot {br.slot} (expected: one of {expected_fee_recipient_addresses})"
-                logger.error(msg)
-                raise HTTPException(status_code=400, detail=msg)
-            if not br.mev and br.fee_recipient.lower() not in expected_fee_recipient_addresses:
-                msg = f"Unexpected fee recipient {br.fee_recipient} for slot {br.slot} (expected: one of {expected_fee_recipient_addresses})"
-                logger.error(msg)
-                raise HTTPException(status_code=400, detail=msg)
-
-    total_validators = len(validator_indexes)
-    for idx, validator_index in enumerate(validator_indexes):
-        logger.debug(f"Processing {validator_index} - {100 * idx / total_validators:.2f}%")
-        if validator_index in pending_validator_indexes:
-            continue
-        prev_balance = initial_balances[validator_index]
-
-        validator_withdrawals = [w for w in all_withdrawals if w.validator_index == validator_index]
-        for eod_balance in [eodb for eodb in eod_balances if eodb.validator_index == validator_index]:
-            if eod_balance.slot < activation_slots[validator_index]:
-                # End of day balance before validator was activated -> discard
-                continue
 
-            amount_earned_wei = Decimal(1e18) * (eod_balance.balance - prev_balance.balance)
-
-            # Account for withdrawals
-            amount_withdrawn_this_day_wei = 0
-            for w in validator_withdrawals:
-                if eod_balance.slot >= w.slot > prev_balance.slot:
-                    amount_withdrawn_this_day_wei += w.amount_gwei * Decimal(1e9)
-            amount_earned_wei += amount_withdrawn_this_day_wei
+    if response_format == RewardsResponseFormat.NDJSON:
+        # Balances and withdrawals are streamed - block rewards (a few per validator) are checked
+        # before the response is started
+        (activation_slots, pending_validator_indexes, initial_balance_rows), all_block_rewards = await asyncio.gather(
+            _get_initial_balances(),
+            _stage("full", "block_rewards", db_provider.block_rewards(
+                min_slot=min_slot,
+                max_slot=max_slot,
+                proposer_indexes=validator_indexes
+            )),
+        )
+        _check_block_rewards(all_block_rewards, expected_fee_recipient_addresses)
+        return StreamingResponse(
+            _ndjson_validator_rewards(
+                db_provider=db_provider,
+                validator_indexes=sorted(set(validator_indexes).difference(pending_validator_indexes)),
+                initial_balance_rows=initial_balance_rows,
+                activation_slots=activation_slots,
+                eod_slots=eod_slots,
+                min_slot=min_slot,
+                max_slot=max_slot,
+                block_rewards=all_block_rewards,
+            ),
+            media_type="application/x-ndjson",
+        )
 
-            date = beacon_node.datetime_for_slot(
-                slot=eod_balance.slot,
-                timezone=pytz.UTC,
-            )
-            consensus_layer_rewards[validator_index].append(
-                RewardForDate.construct(
-                    date=date,
-                    amount_wei=amount_earned_wei,
-                )
+    # Independent queries run concurrently, each on its own pooled connection
+    logger.debug(f"Getting EOD balances, withdrawals and block rewards")
+    (activation_slots, pending_validator_indexes, initial_balance_rows), eod_balance_rows, all_withdrawals, all_block_rewards = \
+        await asyncio.gather(
+            _get_initial_balances(),
+            _stage("full", "eod_balances", db_provider.balances_gwei(slots=eod_slots, validator_indexes=validator_indexes)),
+            _stage("full", "withdrawals", db_provider.withdrawals(
+                min_slot=min_slot,
+                max_slot=max_slot,
+                validator_indexes=validator_indexes
+            )),
+            _stage("full", "block_rewards", db_provider.block_rewards(
+                min_slot=min_slot,
+                max_slot=max_slot,
+                proposer_indexes=validator_indexes
+            )),
+        )
+    initial_balances = BalanceArrays.from_rows(initial_balance_rows)
+    eod_balances = BalanceArrays.from_rows(eod_balance_rows)
+    all_withdrawals = sorted(all_withdrawals, key=lambda x: x.slot)
+
+    _check_block_rewards(all_block_rewards, expected_fee_recipient_addresses)
+
+    # Daily rewards of all validators at once
+    with REWARDS_STAGE_SECONDS.labels("full", "compute").time():
+        consensus_layer_rewards, withdrawals = compute_consensus_layer_rewards(
+            initial_balances=initial_balances,
+            activation_slots=activation_slots,
+            eod_balances=eod_balances,
+            withdrawals=WithdrawalArrays.from_withdrawals(all_withdrawals),
+        )
+        execution_layer_rewards = compute_execution_layer_rewards(BlockRewardArrays.from_block_rewards(all_block_rewards))
+
+    if response_format in _COLUMNAR_MEDIA_TYPES:
+        with REWARDS_STAGE_SECONDS.labels("full", "serialize").time():
+            rewards_matrix = RewardsMatrix.from_daily_amounts(
+                validator_indexes=sorted(set(validator_indexes).difference(pending_validator_indexes)),
+                days=slot_days(np.array(eod_slots, dtype=np.int64)),
+                consensus_layer_rewards=consensus_layer_rewards,
+                execution_layer_rewards=execution_layer_rewards,
+                withdrawals=withdrawals,
             )
-            if amount_withdrawn_this_day_wei > 0:
-                withdrawals[validator_index].append(
-                    RewardForDate.construct(
-                        date=date,
-                        amount_wei=amount_withdrawn_this_day_wei
-                    )
-                )
-            prev_balance = eod_balance
+            if response_format == RewardsResponseFormat.ARROW:
+                content = rewards_matrix.to_arrow_ipc()
+            elif response_format == RewardsResponseFormat.PARQUET:
+                content = rewards_matrix.to_parquet()
+            else:
+                content = rewards_matrix.to_json()
+        return Response(content=content, media_type=_COLUMNAR_MEDIA_TYPES[response_format])
 
-        # Sum in case multiple blocks proposed on same day
-        exec_layer_rewards_for_date = defaultdict(int)
-        for br in [br for br in all_block_rewards if br.proposer_index == validator_index]:
-            exec_layer_rewards_for_date[
-                beacon_node.datetime_for_slot(br.slot, pytz.UTC).date()
-            ] += br.mev_reward_value_wei if br.mev else br.priority_fees_wei
-        for date, rewards_sum in sorted(exec_layer_rewards_for_date.items()):
-            execution_layer_rewards[validator_index].append(
-                RewardForDate.construct(
-                    date=date,
-                    amount_wei=rewards_sum
-                )
-            )
+    consensus_layer_rewards_by_validator = consensus_layer_rewards.by_validator()
+    withdrawals_by_validator = withdrawals.by_validator()
+    execution_layer_rewards_by_validator = execution_layer_rewards.by_validator()
 
     validator_rewards_list = []
     for validator_index in sorted(validator_indexes):
@@ -573,9 +456,18 @@ async def rewards(
 
         validator_rewards_list.append(ValidatorRewards.construct(
             validator_index=validator_index,
-            consensus_layer_rewards=consensus_layer_rewards[validator_index],
-            execution_layer_rewards=execution_layer_rewards[validator_index],
-            withdrawals=withdrawals[validator_index],
+            consensus_layer_rewards=[
+                RewardForDate.construct(date=date, amount_wei=amount_wei)
+                for date, amount_wei in consensus_layer_rewards_by_validator.get(validator_index, [])
+            ],
+            execution_layer_rewards=[
+                ExecutionLayerRewardForDate.construct(date=date, amount_wei=amount_wei, verified=verified)
+                for date, amount_wei, verified in execution_layer_rewards_by_validator.get(validator_index, [])
+            ],
+            withdrawals=[
+                RewardForDate.construct(date=date, amount_wei=amount_wei)
+                for date, amount_wei in withdrawals_by_validator.get(validator_index, [])
+            ],
         ))
 
-    return RewardsResponseFull.construct(validator_rewards_list=validator_rewards_list)
+    return MsgspecJSONResponse(RewardsResponseFull.construct(validator_rewards_list=validator_rewards_list))
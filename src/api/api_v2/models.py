@@ -1,4 +1,5 @@
 import datetime
+from enum import Enum
 
 from pydantic import BaseModel
 
@@ -25,6 +26,11 @@ class RewardForDate(BaseModel):
     amount_wei: int
 
 
+class ExecutionLayerRewardForDate(RewardForDate):
+    # False if the reward includes provisional values that were not verified yet
+    verified: bool = True
+
+
 class RocketPoolNodeRewardForDate(RewardForDate):
     node_address: str
     amount_rpl: int
@@ -34,7 +40,7 @@ class ValidatorRewardsBase(BaseModel):
     validator_index: int
 
     consensus_layer_rewards: list[RewardForDate] | None
-    execution_layer_rewards: list[RewardForDate]
+    execution_layer_rewards: list[ExecutionLayerRewardForDate]
 
     withdrawals: list[RewardForDate]
 
@@ -56,3 +62,13 @@ class RewardsResponseRocketPool(BaseModel):
 
 class RewardsResponseFull(BaseModel):
     validator_rewards_list: list[ValidatorRewards]
+
+
+class RewardsResponseFormat(str, Enum):
+    JSON = "json"
+    # One ValidatorRewards object per line, streamed while the rewards are computed
+    NDJSON = "ndjson"
+    # Per-validator arrays of amounts along a shared date axis, see api.rewards_columnar
+    COLUMNAR = "columnar"
+    ARROW = "arrow"
+    PARQUET = "parquet"
@@ -0,0 +1,42 @@
+"""
+JSON encoding of the API responses, used as the default response class of the v1 and v2 routers
+and for responses that are cached as JSON.
+
+Encoding is done by msgspec instead of the standard library. Like json, msgspec writes
+arbitrarily large ints (amounts in wei) exactly. Decimals are written as JSON numbers with
+all of their digits instead of being converted to floats first. Dates are written in ISO format.
+"""
+from typing import Any
+
+import msgspec
+import numpy as np
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def _enc_hook(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        # Field values only - nested models are passed to this hook in turn
+        return obj.__dict__
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise NotImplementedError(f"Encoding objects of type {type(obj)} is unsupported")
+
+
+_encoder = msgspec.json.Encoder(enc_hook=_enc_hook, decimal_format="number")
+
+
+def encode_json(content: Any) -> bytes:
+    return _encoder.encode(content)
+
+
+class MsgspecJSONResponse(JSONResponse):
+    """
+    Endpoints returning models that were created with BaseModel.construct() - or that are known to
+    match their response_model otherwise - return this response directly. That skips FastAPI
+    validating the models once more and converting them to dicts and lists before encoding them.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return encode_json(content)
+
@@ -0,0 +1,121 @@
+"""
+Columnar representation of the /api/v2/rewards/full response, used by its columnar, arrow and
+parquet response formats.
+
+Instead of a {date, amount_wei} object per validator and day, the rewards are returned as
+one amount per (validator, date) cell of a dense matrix, with a single shared date axis:
+
+- columnar (JSON): {"dates": [...], "validator_indexes": [...], "consensus_layer_rewards_wei": [[...], ...], ...}
+  with one array per validator, aligned with the date axis
+- arrow (Arrow IPC stream) / parquet: one row per validator and date, amounts as decimal128(38, 0)
+
+Consensus layer rewards are null for the dates before a validator's activation. Execution layer
+rewards and withdrawals are 0 for the dates without any.
+"""
+import datetime
+from typing import NamedTuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from api.responses import encode_json
+from api.rewards_engine import DailyAmounts, days_to_dates
+
+_WEI = pa.decimal128(38, 0)
+
+
+def _to_matrix(validator_indexes: np.ndarray, first_day: int, day_count: int, daily_amounts: DailyAmounts,
+               values: np.ndarray, fill_value, dtype) -> np.ndarray:
+    matrix = np.full((len(validator_indexes), day_count), fill_value, dtype=dtype)
+    if matrix.size == 0:
+        return matrix
+    rows = np.minimum(np.searchsorted(validator_indexes, daily_amounts.validator_indexes), len(validator_indexes) - 1)
+    keep = validator_indexes[rows] == daily_amounts.validator_indexes
+    matrix[rows[keep], daily_amounts.days[keep] - first_day] = values[keep]
+    return matrix
+
+
+class RewardsMatrix(NamedTuple):
+    dates: list[datetime.date]
+    validator_indexes: np.ndarray
+    # Shape (validators, dates)
+    consensus_layer_rewards_wei: np.ndarray  # Python ints, None before the activation
+    execution_layer_rewards_wei: np.ndarray  # Python ints
+    execution_layer_rewards_verified: np.ndarray
+    withdrawals_wei: np.ndarray  # Python ints
+
+    @classmethod
+    def from_daily_amounts(
+        cls,
+        validator_indexes: list[int],
+        days: np.ndarray,
+        consensus_layer_rewards: DailyAmounts,
+        execution_layer_rewards: DailyAmounts,
+        withdrawals: DailyAmounts,
+    ) -> "RewardsMatrix":
+        """
+        Arranges the daily amounts of the (sorted) validator indexes along the consecutive UTC days
+        of the requested period (days since 1970-01-01). Amounts of other validators are left out.
+        The period has no days if it only covers dates that are not over yet - the matrices are
+        empty then.
+        """
+        validators = np.asarray(validator_indexes, dtype=np.int64)
+        day_count = len(days)
+        first_day = int(days[0]) if day_count else 0
+        return cls(
+            dates=days_to_dates(days),
+            validator_indexes=validators,
+            consensus_layer_rewards_wei=_to_matrix(
+                validators, first_day, day_count, consensus_layer_rewards, consensus_layer_rewards.amounts_wei,
+                fill_value=None, dtype=object,
+            ),
+            execution_layer_rewards_wei=_to_matrix(
+                validators, first_day, day_count, execution_layer_rewards, execution_layer_rewards.amounts_wei,
+                fill_value=0, dtype=object,
+            ),
+            execution_layer_rewards_verified=_to_matrix(
+                validators, first_day, day_count, execution_layer_rewards, execution_layer_rewards.verified,
+                fill_value=True, dtype=bool,
+            ),
+            withdrawals_wei=_to_matrix(
+                validators, first_day, day_count, withdrawals, withdrawals.amounts_wei,
+                fill_value=0, dtype=object,
+            ),
+        )
+
+    def to_json(self) -> bytes:
+        return encode_json({
+            "dates": [date.isoformat() for date in self.dates],
+            "validator_indexes": self.validator_indexes.tolist(),
+            "consensus_layer_rewards_wei": self.consensus_layer_rewards_wei.tolist(),
+            "execution_layer_rewards_wei": self.execution_layer_rewards_wei.tolist(),
+            "execution_layer_rewards_verified": self.execution_layer_rewards_verified.tolist(),
+            "withdrawals_wei": self.withdrawals_wei.tolist(),
+        })
+
+    def to_arrow_table(self) -> pa.Table:
+        """
+        Returns a table with one row per validator and date, sorted by (validator index, date).
+        """
+        day_count = len(self.dates)
+        return pa.table({
+            "validator_index": np.repeat(self.validator_indexes, day_count),
+            "date": pa.array(np.tile(np.array(self.dates, dtype="datetime64[D]"), len(self.validator_indexes))),
+            "consensus_layer_reward_wei": pa.array(self.consensus_layer_rewards_wei.ravel(), type=_WEI),
+            "execution_layer_reward_wei": pa.array(self.execution_layer_rewards_wei.ravel(), type=_WEI),
+            "execution_layer_reward_verified": self.execution_layer_rewards_verified.ravel(),
+            "withdrawal_wei": pa.array(self.withdrawals_wei.ravel(), type=_WEI),
+        })
+
+    def to_arrow_ipc(self) -> bytes:
+        sink = pa.BufferOutputStream()
+        table = self.to_arrow_table()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    def to_parquet(self) -> bytes:
+        sink = pa.BufferOutputStream()
+        pq.write_table(self.to_arrow_table(), sink)
+        return sink.getvalue().to_pybytes()
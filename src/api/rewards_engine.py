@@ -0,0 +1,218 @@
+"""
+Vectorized computation of the daily rewards of many validators at once, used by /api/v2/rewards/full.
+
+Balances, withdrawals and block rewards are loaded into arrays sorted by (validator index, slot).
+Daily consensus layer rewards, withdrawals and execution layer rewards are then computed using
+array operations (shifts, cumulative sums, group-by reductions) instead of per-validator loops.
+
+Balances and withdrawals are handled in gwei as int64. Amounts in wei (and execution layer rewards,
+which do not necessarily fit into 64 bits) are Python ints.
+"""
+import datetime
+import itertools
+from typing import Iterable, NamedTuple
+
+import numpy as np
+
+from db.tables import BlockReward, Withdrawal
+from providers.beacon_node import GENESIS_DATETIME, SLOT_TIME
+
+GWEI_TO_WEI = 10 ** 9
+
+_SECONDS_PER_DAY = 86_400
+_UNIX_EPOCH_DATE = datetime.date(1970, 1, 1)
+_GENESIS_TIMESTAMP = int(GENESIS_DATETIME.timestamp())
+
+
+class BalanceArrays(NamedTuple):
+    validator_indexes: np.ndarray
+    slots: np.ndarray
+    balances_gwei: np.ndarray
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple[int, int, int]]) -> "BalanceArrays":
+        """
+        Loads (validator index, slot, balance in gwei) rows, as returned by DbProvider.balances_gwei.
+        """
+        rows = list(rows)
+        columns = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64, count=3 * len(rows)).reshape(-1, 3)
+        return cls(
+            validator_indexes=columns[:, 0],
+            slots=columns[:, 1],
+            balances_gwei=columns[:, 2],
+        )
+
+
+class WithdrawalArrays(NamedTuple):
+    validator_indexes: np.ndarray
+    slots: np.ndarray
+    amounts_gwei: np.ndarray
+
+    @classmethod
+    def from_withdrawals(cls, withdrawals: list[Withdrawal]) -> "WithdrawalArrays":
+        count = len(withdrawals)
+        return cls(
+            validator_indexes=np.fromiter((w.validator_index for w in withdrawals), dtype=np.int64, count=count),
+            slots=np.fromiter((w.slot for w in withdrawals), dtype=np.int64, count=count),
+            amounts_gwei=np.fromiter((w.amount_gwei for w in withdrawals), dtype=np.int64, count=count),
+        )
+
+
+class BlockRewardArrays(NamedTuple):
+    proposer_indexes: np.ndarray
+    slots: np.ndarray
+    amounts_wei: np.ndarray  # Python ints
+    verified: np.ndarray
+
+    @classmethod
+    def from_block_rewards(cls, block_rewards: list[BlockReward]) -> "BlockRewardArrays":
+        count = len(block_rewards)
+        amounts_wei = np.empty(count, dtype=object)
+        amounts_wei[:] = [int(br.mev_reward_value_wei if br.mev else br.priority_fees_wei) for br in block_rewards]
+        return cls(
+            proposer_indexes=np.fromiter((br.proposer_index for br in block_rewards), dtype=np.int64, count=count),
+            slots=np.fromiter((br.slot for br in block_rewards), dtype=np.int64, count=count),
+            amounts_wei=amounts_wei,
+            verified=np.fromiter((br.reward_verified for br in block_rewards), dtype=bool, count=count),
+        )
+
+
+class DailyAmounts(NamedTuple):
+    # Sorted by (validator index, day)
+    validator_indexes: np.ndarray
+    days: np.ndarray  # UTC days since 1970-01-01
+    amounts_wei: np.ndarray  # Python ints
+    verified: np.ndarray | None = None
+
+    def by_validator(self) -> dict[int, list[tuple]]:
+        """
+        Returns the (date, amount_wei) - or (date, amount_wei, verified) - rows of each validator.
+        """
+        if len(self.validator_indexes) == 0:
+            return {}
+
+        dates = days_to_dates(self.days)
+        amounts = self.amounts_wei.tolist()
+        rows = list(zip(dates, amounts, self.verified.tolist())) if self.verified is not None else list(zip(dates, amounts))
+
+        starts = np.flatnonzero(np.diff(self.validator_indexes, prepend=-1))
+        ends = np.append(starts[1:], len(rows))
+        return {
+            validator_index: rows[start:end]
+            for validator_index, start, end in zip(self.validator_indexes[starts].tolist(), starts.tolist(), ends.tolist())
+        }
+
+
+def slot_days(slots: np.ndarray) -> np.ndarray:
+    return (_GENESIS_TIMESTAMP + slots * SLOT_TIME) // _SECONDS_PER_DAY
+
+
+def days_to_dates(days: np.ndarray) -> list[datetime.date]:
+    # Only a few distinct days - create each date object once
+    unique_days, inverse = np.unique(days, return_inverse=True)
+    unique_dates = [_UNIX_EPOCH_DATE + datetime.timedelta(days=day) for day in unique_days.tolist()]
+    return [unique_dates[i] for i in inverse.tolist()]
+
+
+def _keys(validator_indexes: np.ndarray, slots: np.ndarray) -> np.ndarray:
+    # Single sortable key for (validator index, slot)
+    return (validator_indexes << 32) | slots
+
+
+def _empty_daily_amounts() -> DailyAmounts:
+    return DailyAmounts(
+        validator_indexes=np.empty(0, dtype=np.int64),
+        days=np.empty(0, dtype=np.int64),
+        amounts_wei=np.empty(0, dtype=object),
+    )
+
+
+def compute_consensus_layer_rewards(
+    initial_balances: BalanceArrays,
+    activation_slots: dict[int, int],
+    eod_balances: BalanceArrays,
+    withdrawals: WithdrawalArrays,
+) -> tuple[DailyAmounts, DailyAmounts]:
+    """
+    Returns the daily consensus layer rewards (balance change + withdrawals since the previous balance)
+    and the daily withdrawals of the validators with an initial balance.
+    End of day balances from before a validator's activation are skipped.
+    """
+    order = np.argsort(initial_balances.validator_indexes, kind="stable")
+    validators = initial_balances.validator_indexes[order]
+    if len(validators) == 0:
+        return _empty_daily_amounts(), _empty_daily_amounts()
+    initial_slots = initial_balances.slots[order]
+    initial_gwei = initial_balances.balances_gwei[order]
+    validator_activation_slots = np.fromiter(
+        (activation_slots[v] for v in validators.tolist()), dtype=np.int64, count=len(validators),
+    )
+
+    # End of day balances of validators with an initial balance, from their activation on
+    positions = np.minimum(np.searchsorted(validators, eod_balances.validator_indexes), len(validators) - 1)
+    keep = (validators[positions] == eod_balances.validator_indexes) \
+        & (eod_balances.slots >= validator_activation_slots[positions])
+    positions = positions[keep]
+    slots = eod_balances.slots[keep]
+    balances_gwei = eod_balances.balances_gwei[keep]
+
+    order = np.argsort(_keys(positions, slots), kind="stable")
+    positions, slots, balances_gwei = positions[order], slots[order], balances_gwei[order]
+    validator_indexes = validators[positions]
+
+    # Previous balance - the initial balance for each validator's first end of day balance
+    first_of_validator = np.diff(positions, prepend=-1) != 0
+    prev_slots = np.roll(slots, 1)
+    prev_balances_gwei = np.roll(balances_gwei, 1)
+    prev_slots[first_of_validator] = initial_slots[positions[first_of_validator]]
+    prev_balances_gwei[first_of_validator] = initial_gwei[positions[first_of_validator]]
+
+    # Withdrawals in (previous balance slot, balance slot] - difference of cumulative withdrawal
+    # amounts, with withdrawals sorted by (validator index, slot)
+    withdrawal_keys = _keys(withdrawals.validator_indexes, withdrawals.slots)
+    withdrawal_order = np.argsort(withdrawal_keys, kind="stable")
+    withdrawal_keys = withdrawal_keys[withdrawal_order]
+    cumulative_withdrawn_gwei = np.concatenate(([0], np.cumsum(withdrawals.amounts_gwei[withdrawal_order])))
+    withdrawn_gwei = (
+        cumulative_withdrawn_gwei[np.searchsorted(withdrawal_keys, _keys(validator_indexes, slots), side="right")]
+        - cumulative_withdrawn_gwei[np.searchsorted(withdrawal_keys, _keys(validator_indexes, prev_slots), side="right")]
+    )
+
+    earned_gwei = balances_gwei - prev_balances_gwei + withdrawn_gwei
+    days = slot_days(slots)
+    withdrawn = withdrawn_gwei > 0
+    return (
+        DailyAmounts(
+            validator_indexes=validator_indexes,
+            days=days,
+            amounts_wei=earned_gwei.astype(object) * GWEI_TO_WEI,
+        ),
+        DailyAmounts(
+            validator_indexes=validator_indexes[withdrawn],
+            days=days[withdrawn],
+            amounts_wei=withdrawn_gwei[withdrawn].astype(object) * GWEI_TO_WEI,
+        ),
+    )
+
+
+def compute_execution_layer_rewards(block_rewards: BlockRewardArrays) -> DailyAmounts:
+    """
+    Returns the execution layer rewards summed up per proposer and day. A day's rewards
+    are only verified if all of its block rewards are.
+    """
+    if len(block_rewards.proposer_indexes) == 0:
+        return _empty_daily_amounts()._replace(verified=np.empty(0, dtype=bool))
+
+    days = slot_days(block_rewards.slots)
+    order = np.lexsort((days, block_rewards.proposer_indexes))
+    proposer_indexes, days = block_rewards.proposer_indexes[order], days[order]
+
+    group_starts = np.flatnonzero(
+        (np.diff(proposer_indexes, prepend=-1) != 0) | (np.diff(days, prepend=-1) != 0)
+    )
+    return DailyAmounts(
+        validator_indexes=proposer_indexes[group_starts],
+        days=days[group_starts],
+        amounts_wei=np.add.reduceat(block_rewards.amounts_wei[order], group_starts),
+        verified=np.logical_and.reduceat(block_rewards.verified[order], group_starts),
+    )
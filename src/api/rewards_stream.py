@@ -0,0 +1,85 @@
+"""
+Streaming variant of the /api/v2/rewards/full computation, used by its NDJSON response format.
+
+End of day balances and withdrawals are read through server-side cursors ordered by
+(validator index, slot). Validators are processed in batches as their rows stream past, so only
+the rows of a single batch are held in memory - regardless of the size of the request.
+"""
+import bisect
+from typing import Any, AsyncIterator, Sequence
+
+from api.rewards_engine import BalanceArrays, WithdrawalArrays, compute_consensus_layer_rewards
+
+# Validators whose rewards are computed at once
+STREAM_BATCH_SIZE = 1_000
+
+
+class ValidatorOrderedRows:
+    """
+    Rows of a partitioned stream ordered by validator index (the first column of each row),
+    taken out for a range of validators at a time.
+    """
+
+    def __init__(self, partitions: AsyncIterator[Sequence[Any]]) -> None:
+        self._partitions = partitions
+        self._buffer: list = []
+        self._exhausted = False
+
+    async def take_up_to(self, validator_index: int) -> list:
+        """
+        Returns the rows of all validators up to validator_index (inclusive) that were not taken yet.
+        """
+        while not self._exhausted and (not self._buffer or self._buffer[-1][0] <= validator_index):
+            try:
+                self._buffer.extend(await anext(self._partitions))
+            except StopAsyncIteration:
+                self._exhausted = True
+
+        end = bisect.bisect_right(self._buffer, validator_index, key=lambda row: row[0])
+        rows, self._buffer = self._buffer[:end], self._buffer[end:]
+        return rows
+
+    async def aclose(self) -> None:
+        await self._partitions.aclose()
+
+
+def _rewards_for_dates(rows: list[tuple]) -> list[dict]:
+    return [{"date": date.isoformat(), "amount_wei": amount_wei} for date, amount_wei in rows]
+
+
+async def stream_validator_rewards(
+    validator_indexes: list[int],
+    initial_balances: dict[int, tuple[int, int, int]],
+    activation_slots: dict[int, int],
+    eod_balances: ValidatorOrderedRows,
+    withdrawals: ValidatorOrderedRows,
+    execution_layer_rewards: dict[int, list[tuple]],
+) -> AsyncIterator[list[dict]]:
+    """
+    Yields the rewards of the (sorted) validator indexes, a batch of validators at a time, in the
+    shape of the ValidatorRewards model. Every validator needs an initial balance row. The
+    execution layer rewards - a few rows per validator - are computed up front.
+    """
+    for start in range(0, len(validator_indexes), STREAM_BATCH_SIZE):
+        batch = validator_indexes[start:start + STREAM_BATCH_SIZE]
+        consensus_layer_rewards, batch_withdrawals = compute_consensus_layer_rewards(
+            initial_balances=BalanceArrays.from_rows(initial_balances[v] for v in batch),
+            activation_slots=activation_slots,
+            eod_balances=BalanceArrays.from_rows(await eod_balances.take_up_to(batch[-1])),
+            withdrawals=WithdrawalArrays.from_withdrawals(await withdrawals.take_up_to(batch[-1])),
+        )
+        consensus_layer_rewards_by_validator = consensus_layer_rewards.by_validator()
+        withdrawals_by_validator = batch_withdrawals.by_validator()
+
+        yield [
+            {
+                "validator_index": validator_index,
+                "consensus_layer_rewards": _rewards_for_dates(consensus_layer_rewards_by_validator.get(validator_index, [])),
+                "execution_layer_rewards": [
+                    {"date": date.isoformat(), "amount_wei": amount_wei, "verified": verified}
+                    for date, amount_wei, verified in execution_layer_rewards.get(validator_index, [])
+                ],
+                "withdrawals": _rewards_for_dates(withdrawals_by_validator.get(validator_index, [])),
+            }
+            for validator_index in batch
+        ]
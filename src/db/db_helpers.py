@@ -1,11 +1,24 @@
+import asyncio
 import os
+import weakref
 from contextlib import contextmanager
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.engine.base import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
 
 _ENGINE = None
+# asyncpg connections can only be used by the event loop they were created in
+_ASYNC_ENGINES: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncEngine]" = weakref.WeakKeyDictionary()
+
+# Connections kept open by each process (e.g. each API worker) - the database has to allow
+# (DB_POOL_SIZE + DB_POOL_MAX_OVERFLOW) * number of processes connections
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", "10"))
+# Queries running longer than this are cancelled by the database
+DB_QUERY_TIMEOUT = float(os.getenv("DB_QUERY_TIMEOUT", "120"))  # seconds
 
 
 def _get_db_uri():
@@ -22,6 +35,23 @@ def _get_engine() -> Engine:
     return _ENGINE
 
 
+def _get_async_engine() -> AsyncEngine:
+    loop = asyncio.get_running_loop()
+    if loop not in _ASYNC_ENGINES:
+        _ASYNC_ENGINES[loop] = create_async_engine(
+            make_url(_get_db_uri()).set(drivername="postgresql+asyncpg"),
+            pool_pre_ping=True,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_POOL_MAX_OVERFLOW,
+            connect_args={
+                "server_settings": {"statement_timeout": str(int(DB_QUERY_TIMEOUT * 1000))},
+                # Client-side limit in case the database does not respond at all
+                "command_timeout": DB_QUERY_TIMEOUT + 5,
+            },
+        )
+    return _ASYNC_ENGINES[loop]
+
+
 def get_session(engine: Engine) -> Session:
     """
     Creates a new session connected to the database defined in the
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Boolean, LargeBinary, Numeric, Integer, Float, String, ForeignKey, TIMESTAMP
+from sqlalchemy import Column, Boolean, LargeBinary, Numeric, Integer, Float, String, Text, ForeignKey, Index, TIMESTAMP
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -29,6 +29,66 @@ class BlockReward(Base):
     mev_reward_recipient = Column(String(length=42), nullable=True)
     mev_reward_value_wei = Column(Numeric(precision=27), nullable=True)
     reward_processed_ok = Column(Boolean, nullable=False)
+    # Provisional values (taken from relay data as-is) are verified asynchronously
+    reward_verified = Column(Boolean, nullable=False, default=True, server_default="true")
+    # Version of the address labels (builders, MEV bots, ...) the block reward was classified with
+    label_registry_version = Column(String(length=16), nullable=True)
+
+    # Retry bookkeeping for slots where reward_processed_ok is False
+    reward_processing_error = Column(Text, nullable=True)
+    reward_processing_attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    reward_processing_next_attempt = Column(TIMESTAMP(timezone=True), nullable=True)
+
+
+class BlockRewardInput(Base):
+    __tablename__ = "block_reward_input"
+
+    # Compact copy of the execution layer data a block reward was classified from
+    # (zlib-compressed JSON), allows re-classifying block rewards offline
+    slot = Column(Integer, nullable=False, primary_key=True, autoincrement=False)
+    data = Column(LargeBinary, nullable=False)
+
+
+class BlockRewardLease(Base):
+    __tablename__ = "block_reward_lease"
+
+    # Leases allow multiple block reward indexer processes to split up
+    # the work - each process claims a range of slots at a time.
+    # The run column separates independent (re-)indexing runs.
+    run = Column(String(length=32), nullable=False, primary_key=True)
+    range_start = Column(Integer, nullable=False, primary_key=True, autoincrement=False)
+    range_end = Column(Integer, nullable=False)
+    owner = Column(String(length=128), nullable=True)
+    expires_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    completed = Column(Boolean, nullable=False, default=False, server_default="false")
+
+
+class EventLog(Base):
+    __tablename__ = "event_log"
+
+    # Local copy of the execution layer logs of the subscribed event topics,
+    # see providers/event_log_store.py. Only logs of finalized-enough blocks are stored.
+    block_number = Column(Integer, nullable=False, primary_key=True, autoincrement=False)
+    log_index = Column(Integer, nullable=False, primary_key=True, autoincrement=False)
+    address = Column(String(length=42), nullable=False)
+    topic0 = Column(String(length=66), nullable=False)
+    # Remaining topics, comma-separated
+    topics = Column(Text, nullable=False)
+    data = Column(Text, nullable=False)
+    transaction_hash = Column(String(length=66), nullable=False)
+
+    __table_args__ = (
+        Index("ix_event_log_topic0_block_number", "topic0", "block_number"),
+    )
+
+
+class IndexerCursor(Base):
+    __tablename__ = "indexer_cursor"
+
+    # Last block number whose events were fully processed, per indexed event stream.
+    # Advanced in the same transaction as the data indexed from the events.
+    stream = Column(String(length=64), nullable=False, primary_key=True)
+    last_block_number = Column(Integer, nullable=False)
 
 
 class Price(Base):
@@ -52,6 +112,16 @@ class RocketPoolBondReduction(Base):
     minipool = relationship("RocketPoolMinipool", back_populates="bond_reductions")
 
 
+class RocketPoolContractAddress(Base):
+    __tablename__ = "rocket_pool_contract_address"
+
+    # Address an upgradeable contract's RocketStorage name resolved to, starting at start_block_number.
+    # Blocks up to the "rocket_pool_contract_address_<contract_name>" indexer cursor are covered.
+    contract_name = Column(String(length=64), nullable=False, primary_key=True)
+    start_block_number = Column(Integer, nullable=False, primary_key=True, autoincrement=False)
+    address = Column(String(length=42), nullable=False)
+
+
 class RocketPoolMinipool(Base):
     __tablename__ = "rocket_pool_minipool"
 
@@ -76,6 +146,21 @@ class RocketPoolNode(Base):
     minipools = relationship("RocketPoolMinipool", back_populates="node")
 
 
+class RocketPoolProposalShare(Base):
+    __tablename__ = "rocket_pool_proposal_share"
+
+    # Node operator share of a block reward paid to the node's fee distributor,
+    # computed by the Rocket Pool indexer
+    slot = Column(ForeignKey("block_reward.slot"), primary_key=True)
+    fee_distributor = Column(String(length=42), nullable=False)
+    node_operator_share_wei = Column(Numeric(precision=27), nullable=True)
+    # Set instead of the share if it could not be computed
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, server_default="1")
+    # Failed computations are retried from then on, NULL if not retried anymore
+    next_attempt = Column(TIMESTAMP(timezone=True), nullable=True)
+
+
 class RocketPoolReward(Base):
     __tablename__ = "rocket_pool_reward"
 
@@ -98,6 +183,32 @@ class RocketPoolRewardPeriod(Base):
     rewards = relationship("RocketPoolReward", back_populates="reward_period")
 
 
+class RocketPoolUnresolvedMinipool(Base):
+    __tablename__ = "rocket_pool_unresolved_minipool"
+
+    # Minipool whose node was not indexed yet or whose data could not be read when the Rocket Pool
+    # indexer came across its creation. Retried on every run, up to a maximum number of attempts.
+    minipool_address = Column(String(length=42), nullable=False, primary_key=True)
+    node_address = Column(String(length=42), nullable=False)
+    minipool_manager_address = Column(String(length=42), nullable=False)
+    creation_block_number = Column(Integer, nullable=False)
+    attempts = Column(Integer, nullable=False)
+
+
+class RocketPoolWithdrawalShare(Base):
+    __tablename__ = "rocket_pool_withdrawal_share"
+
+    # Node operator share of a minipool withdrawal, computed by the Rocket Pool indexer
+    withdrawal_id = Column(ForeignKey("withdrawal.id"), primary_key=True)
+    minipool_address = Column(ForeignKey("rocket_pool_minipool.minipool_address"), nullable=False)
+    node_operator_share_wei = Column(Numeric(precision=27), nullable=True)
+    # Set instead of the share if it can not be determined (e.g. full withdrawal below the minipool's capital)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, server_default="1")
+    # Failed computations are retried from then on, NULL if not retried anymore
+    next_attempt = Column(TIMESTAMP(timezone=True), nullable=True)
+
+
 class Validator(Base):
     __tablename__ = "validator"
 
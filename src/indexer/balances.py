@@ -2,15 +2,18 @@ import datetime
 import logging
 import asyncio
 from collections import defaultdict
+from itertools import islice
 
 import pytz
 from prometheus_client import start_http_server, Gauge
 from sqlalchemy import text
+from sqlalchemy.orm import Session
 
 from shared.setup_logging import setup_logging
 from providers.beacon_node import BeaconNode, GENESIS_DATETIME
 from db.tables import Balance
 from db.db_helpers import session_scope
+from indexer.lanes import IndexingLane
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +22,15 @@ TIMEZONES_TO_INDEX = (
     pytz.utc,
 )
 
+# Slots within this window are processed by the head lane - before any backfill slots.
+# The backfill lane is worked through in batches of BACKFILL_BATCH_SIZE slots. Before each batch,
+# the head lane runs again, so newly finalized end-of-day slots never wait behind the whole backlog.
+HEAD_LANE_SLOTS = 2 * 7200  # ~2 days
+BACKFILL_BATCH_SIZE = 10
+
+HEAD_LANE = IndexingLane(indexer="balances", name="head")
+BACKFILL_LANE = IndexingLane(indexer="balances", name="backfill")
+
 ALREADY_INDEXED_SLOTS = set()
 
 SLOTS_WITH_MISSING_BALANCES = Gauge(
@@ -27,28 +39,13 @@ SLOTS_WITH_MISSING_BALANCES = Gauge(
 )
 
 
-async def index_balances():
-    global ALREADY_INDEXED_SLOTS
-
+def _eod_slots(beacon_node: BeaconNode) -> set[int]:
+    """
+    Returns the end-of-day slots (and the first slot) of every day since START_DATE, up to the head slot.
+    """
     start_date = datetime.date.fromisoformat(START_DATE)
     end_date = datetime.date.today() + datetime.timedelta(days=1)
 
-    beacon_node = BeaconNode()
-
-    activation_slots = set()
-
-    logger.debug(f"Calculating the needed slot numbers...")
-
-    # Slot numbers for balances at activation slot
-    # We only want to store activation balances for validators during their activation epoch
-    validator_index_to_activation_slot = await beacon_node.activation_slots_for_validators(validator_indexes=None, cache=None)
-    activation_slot_to_validators = defaultdict(list)
-    for vi, as_ in validator_index_to_activation_slot.items():
-        if as_ is not None:
-            activation_slot_to_validators[as_].append(vi)
-            activation_slots.add(as_)
-
-    # Slot numbers for end-of-day balances
     eod_slots = set()
     for timezone in TIMEZONES_TO_INDEX:
 
@@ -85,6 +82,87 @@ async def index_balances():
 
         for slot in slots:
             eod_slots.add(slot)
+    return eod_slots
+
+
+async def _index_slot(
+    session: Session,
+    beacon_node: BeaconNode,
+    slot: int,
+    eod_slots: set[int],
+    activation_slot_to_validators: dict[int, list[int]],
+) -> bool:
+    """
+    Stores the balances for the slot. Returns True if the slot was indexed.
+    """
+    logger.info(f"Indexing slot {slot}")
+
+    # Wait for slot to be finalized
+    if not await beacon_node.is_slot_finalized(slot):
+        logger.info(f"Waiting for slot {slot} to be finalized")
+        return False
+
+    # Store balances in DB
+    if slot in eod_slots:
+        # Index balances for all validators
+        balances_for_slot = await beacon_node.balances_for_slot(slot)
+    else:
+        # Activation slot - only index balances for validators which were activated at this point
+        balances_for_slot = await beacon_node.balances_for_slot(
+            slot=slot, validator_indexes=activation_slot_to_validators[slot]
+        )
+    logger.debug(f"Executing insert statements for slot {slot}")
+    if len(balances_for_slot) == 0:
+        # No balances available for slot (yet?), move on
+        logger.warning(f"No balances retrieved for slot {slot}")
+        return False
+    session.execute(
+        text(
+            "INSERT INTO balance(validator_index, slot, balance)"
+            " VALUES(:validator_index, :slot, :balance)"
+            " ON CONFLICT ON CONSTRAINT balance_pkey DO NOTHING"
+        ),
+        [
+            {
+                "validator_index": balance.validator_index,
+                "slot": balance.slot,
+                "balance": balance.balance,
+            }
+            for balance in balances_for_slot
+        ]
+    )
+    ALREADY_INDEXED_SLOTS.append(slot)
+    SLOTS_WITH_MISSING_BALANCES.dec(1)
+    logger.debug("Committing")
+    session.commit()
+    return True
+
+
+async def index_balances() -> None:
+    """
+    Indexes the balances of all slots that still need to be indexed. The needed slots are
+    determined once per run - the backfill lane is then worked through in batches, with the head
+    lane (including end-of-day slots that became available in the meantime) going first each time.
+    """
+    global ALREADY_INDEXED_SLOTS
+
+    beacon_node = BeaconNode()
+
+    activation_slots = set()
+
+    logger.debug(f"Calculating the needed slot numbers...")
+
+    # Slot numbers for balances at activation slot
+    # We only want to store activation balances for validators during their activation epoch
+    validator_index_to_activation_slot = await beacon_node.activation_slots_for_validators(validator_indexes=None, cache=None)
+    activation_slot_to_validators = defaultdict(list)
+    for vi, as_ in validator_index_to_activation_slot.items():
+        if as_ is not None:
+            activation_slot_to_validators[as_].append(vi)
+            activation_slots.add(as_)
+
+    # Slot numbers for end-of-day balances
+    eod_slots = _eod_slots(beacon_node)
 
     # Remove slots that have already been indexed previously
     logger.info("Removing previously indexed slots")
@@ -97,63 +175,38 @@ async def index_balances():
     for s in ALREADY_INDEXED_SLOTS:
         if s in activation_slots:
             activation_slots.remove(s)
-        if s in eod_slots:
-            eod_slots.remove(s)
 
-    # Order the slots - to retrieve the balances for the oldest slots first
-    slots_to_index = sorted(activation_slots.union(eod_slots))
+    # Split the slots into lanes - recent slots first, then the oldest backfill slots
+    all_slots_to_index = activation_slots.union(eod_slots.difference(ALREADY_INDEXED_SLOTS))
+    head_lane_start = BeaconNode.head_slot() - HEAD_LANE_SLOTS
+    HEAD_LANE.reset(s for s in all_slots_to_index if s >= head_lane_start)
+    BACKFILL_LANE.reset(s for s in all_slots_to_index if s < head_lane_start)
+    # Every backfill slot is attempted once per run
+    backfill_slots = iter(BACKFILL_LANE.pending_slots())
 
-    logger.info(f"Indexing balances for {len(slots_to_index)} slots")
-    SLOTS_WITH_MISSING_BALANCES.set(len(slots_to_index))
+    logger.info(f"Indexing balances for {len(all_slots_to_index)} slots"
+                f" (head lane: {len(HEAD_LANE)}, backfill lane: {len(BACKFILL_LANE)})")
+    SLOTS_WITH_MISSING_BALANCES.set(len(all_slots_to_index))
 
-    commit_every = 1
-    current_tx = 0
     with session_scope() as session:
-        for slot in slots_to_index:
-            logger.info(f"Indexing slot {slot}")
-            current_tx += 1
-
-            # Wait for slot to be finalized
-            if not await beacon_node.is_slot_finalized(slot):
-                logger.info(f"Waiting for slot {slot} to be finalized")
-                continue
-
-            # Store balances in DB
-            if slot in eod_slots:
-                # Index balances for all validators
-                balances_for_slot = await beacon_node.balances_for_slot(slot)
-            else:
-                # Activation slot - only index balances for validators which were activated at this point
-                balances_for_slot = await beacon_node.balances_for_slot(
-                    slot=slot, validator_indexes=activation_slot_to_validators[slot]
-                )
-            logger.debug(f"Executing insert statements for slot {slot}")
-            if len(balances_for_slot) == 0:
-                # No balances available for slot (yet?), move on
-                logger.warning(f"No balances retrieved for slot {slot}")
-                continue
-            session.execute(
-                text(
-                    "INSERT INTO balance(validator_index, slot, balance)"
-                    " VALUES(:validator_index, :slot, :balance)"
-                    " ON CONFLICT ON CONSTRAINT balance_pkey DO NOTHING"
-                ),
-                [
-                    {
-                        "validator_index": balance.validator_index,
-                        "slot": balance.slot,
-                        "balance": balance.balance,
-                    }
-                    for balance in balances_for_slot
-                ]
-            )
-            ALREADY_INDEXED_SLOTS.append(slot)
-            SLOTS_WITH_MISSING_BALANCES.dec(1)
-            if current_tx == commit_every:
-                logger.debug("Committing")
-                current_tx = 0
-                session.commit()
-        session.commit()
+        while True:
+            # End-of-day slots of the days that ended since the slots were determined
+            new_eod_slots = _eod_slots(beacon_node).difference(eod_slots)
+            if new_eod_slots:
+                eod_slots.update(new_eod_slots)
+                HEAD_LANE.add(new_eod_slots)
+                SLOTS_WITH_MISSING_BALANCES.inc(len(new_eod_slots))
+
+            for slot in HEAD_LANE.pending_slots():
+                if await _index_slot(session, beacon_node, slot, eod_slots, activation_slot_to_validators):
+                    HEAD_LANE.done(slot)
+
+            batch = list(islice(backfill_slots, BACKFILL_BATCH_SIZE))
+            if not batch:
+                break
+            for slot in batch:
+                if await _index_slot(session, beacon_node, slot, eod_slots, activation_slot_to_validators):
+                    BACKFILL_LANE.done(slot)
 
 
 if __name__ == "__main__":
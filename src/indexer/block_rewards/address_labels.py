@@ -0,0 +1,102 @@
+"""
+Registry of labelled addresses (MEV builders, MEV bots, forwarder contracts, spam senders, ...)
+used to classify block rewards, loaded from address_labels.yml.
+
+The file is checked for changes every RELOAD_INTERVAL, so that labels can be updated
+without restarting the indexer.
+"""
+import hashlib
+import logging
+import os
+import time
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+BUILDER = "builder"
+MEV_BOT = "mev_bot"
+FORWARDER = "forwarder"
+SPAM_SENDER = "spam_sender"
+ROCKETPOOL_DISTRIBUTOR = "rocketpool_distributor"
+LIDO_REWARDS_VAULT = "lido_rewards_vault"
+STAKEFISH_FEE_POOL = "stakefish_fee_pool"
+KRAKEN_DISTRIBUTOR = "kraken_distributor"
+
+ADDRESS_LABELS_FILE = os.getenv("ADDRESS_LABELS_FILE") or os.path.join(os.path.dirname(__file__), "address_labels.yml")
+RELOAD_INTERVAL = 30  # seconds
+
+
+class AddressLabelRegistry:
+    def __init__(self, labels: dict[str, frozenset[str]], version: str) -> None:
+        self.version = version
+        self._addresses = labels
+
+        by_address: dict[str, set[str]] = {}
+        for label, addresses in labels.items():
+            for address in addresses:
+                by_address.setdefault(address, set()).add(label)
+        self._labels = {address: frozenset(address_labels) for address, address_labels in by_address.items()}
+
+    @classmethod
+    def from_yaml(cls, raw: bytes) -> "AddressLabelRegistry":
+        data = yaml.safe_load(raw)
+        return cls(
+            labels={
+                label: frozenset(address.lower() for address in addresses)
+                for label, addresses in data["labels"].items()
+            },
+            version=hashlib.sha256(raw).hexdigest()[:12],
+        )
+
+    def labels_for(self, address: str | None) -> frozenset[str]:
+        if address is None:
+            return frozenset()
+        return self._labels.get(address.lower(), frozenset())
+
+    def has_label(self, address: str | None, label: str) -> bool:
+        return label in self.labels_for(address)
+
+    def addresses(self, label: str) -> frozenset[str]:
+        return self._addresses.get(label, frozenset())
+
+
+_REGISTRY: AddressLabelRegistry | None = None
+_REGISTRY_MTIME: float | None = None
+_LAST_RELOAD_CHECK = 0.0
+
+
+def registry() -> AddressLabelRegistry:
+    """
+    Returns the current registry, reloading it first if the labels file changed.
+    If the changed file cannot be loaded, the previously loaded registry is kept.
+    """
+    global _REGISTRY, _REGISTRY_MTIME, _LAST_RELOAD_CHECK
+
+    now = time.monotonic()
+    if _REGISTRY is not None and now - _LAST_RELOAD_CHECK < RELOAD_INTERVAL:
+        return _REGISTRY
+    _LAST_RELOAD_CHECK = now
+
+    mtime = os.path.getmtime(ADDRESS_LABELS_FILE)
+    if _REGISTRY is not None and mtime == _REGISTRY_MTIME:
+        return _REGISTRY
+
+    with open(ADDRESS_LABELS_FILE, "rb") as f:
+        raw = f.read()
+    try:
+        loaded = AddressLabelRegistry.from_yaml(raw)
+    except Exception as e:
+        if _REGISTRY is None:
+            raise
+        logger.exception(f"Failed to reload address labels, keeping version {_REGISTRY.version}: {e}")
+        return _REGISTRY
+
+    if _REGISTRY is not None:
+        logger.info(f"Reloaded address labels: {_REGISTRY.version} -> {loaded.version}")
+    _REGISTRY, _REGISTRY_MTIME = loaded, mtime
+    return _REGISTRY
+
+
+def labels_for(address: str | None) -> frozenset[str]:
+    return registry().labels_for(address)
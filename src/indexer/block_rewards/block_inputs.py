@@ -0,0 +1,189 @@
+"""
+Compact local copies of the data block rewards are classified from.
+
+While indexing, RecordingExecutionNode records trimmed down versions of the
+execution layer responses (and relay payloads) the classifier uses for a block.
+ReplayExecutionNode serves them back without making any requests, which allows
+re-classifying blocks offline - e.g. after adding a builder, a MEV bot or a new
+detector rule.
+"""
+import abc
+import json
+import zlib
+from typing import Any, Awaitable, Callable
+
+from providers.beacon_node import SlotProposerData
+from providers.execution_node import ExecutionNode, TxData
+from providers.mev_relay import DeliveredPayloadsResponse
+from indexer.block_rewards.block_rewards_mev_simple import get_relay_payload
+
+_BLOCK_HEADER_FIELDS = ("miner", "extraData", "baseFeePerGas", "gasUsed")
+_TX_FIELDS = ("hash", "from", "to", "value")
+_RECEIPT_FIELDS = ("gasUsed", "effectiveGasPrice")
+_LOG_FIELDS = ("removed", "topics", "data")
+_TRACE_FIELDS = ("type", "from", "to", "value", "error")
+
+
+class MissingBlockInput(LookupError):
+    pass
+
+
+def _compact_block(block: dict) -> dict:
+    compact = {field: block[field] for field in _BLOCK_HEADER_FIELDS}
+    compact["transactions"] = [
+        {field: tx[field] for field in _TX_FIELDS} if isinstance(tx, dict) else tx
+        for tx in block["transactions"]
+    ]
+    return compact
+
+
+def _compact_trace(frame: dict) -> dict:
+    compact = {field: frame[field] for field in _TRACE_FIELDS if field in frame}
+    if "calls" in frame:
+        compact["calls"] = [_compact_trace(call) for call in frame["calls"]]
+    return compact
+
+
+class BlockInputs:
+    """
+    The inputs used to classify a single block, keyed by the request that returned them.
+    """
+    def __init__(self, data: dict[str, Any] | None = None) -> None:
+        self.data = data if data is not None else {}
+
+    @staticmethod
+    def _key(*request: Any) -> str:
+        return json.dumps(request)
+
+    def __contains__(self, request: tuple) -> bool:
+        return self._key(*request) in self.data
+
+    def get(self, request: tuple) -> Any:
+        try:
+            return self.data[self._key(*request)]
+        except KeyError:
+            raise MissingBlockInput(f"No recorded input for {request}")
+
+    def set(self, request: tuple, value: Any) -> None:
+        self.data[self._key(*request)] = value
+
+    @property
+    def slot_proposer_data(self) -> SlotProposerData:
+        return SlotProposerData(**self.get(("slot_proposer_data",)))
+
+    @slot_proposer_data.setter
+    def slot_proposer_data(self, slot_proposer_data: SlotProposerData) -> None:
+        self.set(("slot_proposer_data",), slot_proposer_data._asdict())
+
+    def encode(self) -> bytes:
+        return zlib.compress(json.dumps(self.data, separators=(",", ":")).encode())
+
+    @classmethod
+    def decode(cls, encoded: bytes) -> "BlockInputs":
+        return cls(json.loads(zlib.decompress(encoded)))
+
+
+class _BlockInputsExecutionNode(abc.ABC):
+    """
+    Implements the ExecutionNode methods used by the block reward classifier on top of BlockInputs.
+    """
+    # Composite methods - these only call the methods implemented below
+    get_miner_data = ExecutionNode.get_miner_data
+    get_burnt_tx_fees_for_block = ExecutionNode.get_burnt_tx_fees_for_block
+    get_block_priority_tx_fees = ExecutionNode.get_block_priority_tx_fees
+    _get_miner_data_rpc_supported = False
+    BASE_URL = None
+
+    def __init__(self, inputs: BlockInputs) -> None:
+        self.inputs = inputs
+
+    @abc.abstractmethod
+    async def _input(
+            self,
+            request: tuple,
+            fetch: Callable[[ExecutionNode], Awaitable[Any]],
+            compact: Callable[[Any], Any] = lambda value: value,
+    ) -> Any:
+        """
+        Returns the (compact) response to the request - fetch makes the request to an execution node.
+        """
+
+    async def get_block(self, block_number: int, verbose=False) -> dict:
+        return await self._input(
+            ("get_block", block_number, verbose),
+            lambda node: node.get_block(block_number, verbose=verbose),
+            _compact_block,
+        )
+
+    async def get_block_receipts(self, block_number: int, use_infura: bool = True) -> list[dict]:
+        return await self._input(
+            ("get_block_receipts", block_number),
+            lambda node: node.get_block_receipts(block_number, use_infura=use_infura),
+            lambda receipts: [{field: r[field] for field in _RECEIPT_FIELDS} for r in receipts],
+        )
+
+    async def get_balance(self, address: str, block_number: int, use_infura=False) -> int:
+        return await self._input(
+            ("get_balance", address.lower(), block_number),
+            lambda node: node.get_balance(address, block_number, use_infura=use_infura),
+        )
+
+    async def get_tx_data(self, block_number: int, tx_index: int) -> TxData:
+        return TxData(*await self._input(
+            ("get_tx_data", block_number, tx_index),
+            lambda node: node.get_tx_data(block_number, tx_index),
+            list,
+        ))
+
+    async def get_tx_fee(self, tx_hash: str) -> int:
+        return await self._input(
+            ("get_tx_fee", tx_hash),
+            lambda node: node.get_tx_fee(tx_hash),
+        )
+
+    async def get_logs(self, address: str | None, block_number_range: tuple[int, int], topics: list[str], use_infura=True) -> list[dict]:
+        return await self._input(
+            ("get_logs", address, list(block_number_range), topics),
+            lambda node: node.get_logs(address, block_number_range, topics, use_infura=use_infura),
+            lambda logs: [{field: log[field] for field in _LOG_FIELDS} for log in logs],
+        )
+
+    async def trace_block(self, block_number: int, use_infura: bool = True) -> list[dict]:
+        return await self._input(
+            ("trace_block", block_number),
+            lambda node: node.trace_block(block_number, use_infura=use_infura),
+            lambda traces: [_compact_trace(trace) for trace in traces],
+        )
+
+    async def get_relay_payload(self, block_hash: str) -> DeliveredPayloadsResponse | None:
+        payload = await self._input(
+            ("get_relay_payload", block_hash),
+            lambda _: get_relay_payload(block_hash),
+            lambda p: list(p) if p is not None else None,
+        )
+        return DeliveredPayloadsResponse(*payload) if payload is not None else None
+
+
+class RecordingExecutionNode(_BlockInputsExecutionNode):
+    """
+    Passes requests through to the execution node (and MEV relays), recording compact copies of the responses.
+    The compact copies are returned, so that the classifier sees the same data when replaying.
+    """
+    def __init__(self, execution_node: ExecutionNode, inputs: BlockInputs | None = None) -> None:
+        super().__init__(inputs if inputs is not None else BlockInputs())
+        self.execution_node = execution_node
+
+    async def _input(self, request, fetch, compact=lambda value: value) -> Any:
+        if request in self.inputs:
+            return self.inputs.get(request)
+        value = compact(await fetch(self.execution_node))
+        self.inputs.set(request, value)
+        return value
+
+
+class ReplayExecutionNode(_BlockInputsExecutionNode):
+    """
+    Serves recorded inputs, raises MissingBlockInput for anything that was not recorded.
+    """
+    async def _input(self, request, fetch, compact=lambda value: value) -> Any:
+        return self.inputs.get(request)
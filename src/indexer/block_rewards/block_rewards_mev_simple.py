@@ -1,39 +1,72 @@
+import abc
 import asyncio
 import logging
+import os
 import re
 from collections import namedtuple
-from typing import Optional
+from typing import Any, Awaitable, Callable, Optional
+
+from prometheus_client import Counter, Histogram
 
 from providers.beacon_node import SlotProposerData
 from providers.db_provider import DbProvider
-from providers.execution_node import ExecutionNode
+from providers.execution_node import ExecutionNode, TxData
 from providers.http_client_w_backoff import NonOkStatusCode
-from providers.mev_builders import BUILDER_FEE_RECIPIENTS
-from providers.mev_relay import MevRelay
-from indexer.block_rewards.mev_bots import SMART_CONTRACTS_MEV_BOTS
+from providers.mev_relay import DeliveredPayloadsResponse, MevRelay
+from indexer.block_rewards import address_labels
+from indexer.block_rewards.address_labels import AddressLabelRegistry, BUILDER, MEV_BOT, FORWARDER, SPAM_SENDER, \
+    ROCKETPOOL_DISTRIBUTOR, LIDO_REWARDS_VAULT, STAKEFISH_FEE_POOL, KRAKEN_DISTRIBUTOR
 from indexer.block_rewards.smart_contract_fee_recipients import (
-    _get_rocketpool_rewards_distribution_value, SMART_CONTRACTS_ROCKETPOOL,
-    _get_lido_rewards_distribution_value, SMART_CONTRACT_LIDO_EXEC_LAYER_REWARDS_VAULT,
-    _get_stakefish_rewards_distribution_value, SMART_CONTRACTS_STAKEFISH,
-    _get_kraken_rewards_distribution_value, SMART_CONTRACTS_KRAKEN,
+    _get_rocketpool_rewards_distribution_value,
+    _get_lido_rewards_distribution_value,
+    _get_stakefish_rewards_distribution_value,
+    _get_kraken_rewards_distribution_value,
 )
 
 logger = logging.getLogger(__name__)
 
 BlockRewardValue = namedtuple(
     "BlockRewardValue",
-    ["block_priority_tx_fees", "contains_mev", "mev_recipient", "mev_recipient_balance_change"]
+    ["block_priority_tx_fees", "contains_mev", "mev_recipient", "mev_recipient_balance_change", "verified",
+     "label_registry_version"],
+    # Provisional values (not verified against the MEV recipient's balance change) set verified to False
+    defaults=(True, None),
 )
 
-# Smart contract forwarder contracts - they immediately forward the reward to another address
-# -> cannot compare values
-SMART_CONTRACT_FORWARDER_RECIPIENTS = {
-    addr.lower() for addr in (
-        "0xd6bdD5c289a38ea7bBd57Da9625dba60CeE94879",
-        "0x7cd1af7d5299c5bfd4a63291eb5aa57f0ce60024", # Kraken
-        "0x6386eD8A268Ce332Db01b992402430968760C86d", # Kraken
-    )
-}
+# MEV found by a detector - the MEV reward recipient and the value it is expected to receive (if known)
+MevDetection = namedtuple("MevDetection", ["mev_recipient", "expected_value"])
+
+BLOCK_REWARD_DETECTOR_RESULTS = Counter(
+    "block_reward_detector_results",
+    "Results of block reward MEV detectors",
+    labelnames=("detector", "outcome"),
+)
+BLOCK_REWARD_ACCOUNTING_COMPARISONS = Counter(
+    "block_reward_accounting_comparisons",
+    "Comparisons of traced and balance-based fee recipient balance changes",
+    labelnames=("outcome",),
+)
+BLOCK_REWARD_DETECTOR_SECONDS = Histogram(
+    "block_reward_detector_seconds",
+    "Time it takes to run a block reward MEV detector, including fetching the data it needs",
+    labelnames=("detector",),
+)
+
+RelayPayloadSource = Callable[[str], Awaitable[Optional[DeliveredPayloadsResponse]]]
+
+# see https://ethstaker.cc/mev-relay-list/
+MEV_RELAY_API_URLS = (
+    "https://boost-relay.flashbots.net",
+    "https://relay-analytics.ultrasound.money",
+    "https://agnostic-relay.net",
+    "https://bloxroute.max-profit.blxrbdn.com",
+    "https://bloxroute.regulated.blxrbdn.com",
+    "https://mainnet-relay.securerpc.com",
+    "https://relay.wenmerge.com",
+    "https://aestus.live",
+    "https://titanrelay.xyz",
+    "https://eu-relay.ethgas.com",
+)
 
 # Relayooor.wtf relay is down -> cannot get delivered payloads
 RELAYOOOR_SLOTS = {
@@ -44,43 +77,23 @@ RELAYOOOR_SLOTS = {
     6126366,
     6130893,
 }
+RELAYOOOR_EXTRA_DATA = re.compile("^Viva relayooor.wtf$")
 
+# Call types that transfer value to the callee
+VALUE_TRANSFER_CALL_TYPES = {"CALL", "CREATE", "CREATE2", "SELFDESTRUCT"}
 
-class ManualInspectionRequired(ValueError):
-    pass
-
+# How fee recipient balance changes are computed:
+# legacy - from archive balances, corrected for distributions, outgoing txs, withdrawals and spam
+# trace - from a single block trace (debug_traceBlockByNumber)
+# compare - legacy, while also computing and comparing the traced balance change
+BALANCE_ACCOUNTING = os.getenv("BLOCK_REWARDS_BALANCE_ACCOUNTING", "legacy")
 
-def _extra_data_indicates_mev(extra_data: str | None) -> bool:
-    if extra_data is not None and any(s.match(extra_data) for s in (
-            re.compile("^Manifold$"),
-            re.compile("^Viva relayooor.wtf$"),
-            re.compile("^Made on the moon by Blocknative$"),
-            re.compile("^Powered by bloXroute$"),
-    )):
-        return True
-    return False
-
-
-async def _contains_call_to_mev_bot_contract(block_number: int, execution_node: ExecutionNode) -> bool:
-    full_block = await execution_node.get_block(block_number, verbose=True)
 
-    if any(tx["to"] in SMART_CONTRACTS_MEV_BOTS for tx in full_block["transactions"]):
-        logger.warning(f"Found call to MEV Bot contract in {block_number}")
-        return True
-    return False
-
-
-async def _contains_tx_from_builder_to_fee_recipient(block_number: int, fee_recipient: str, execution_node: ExecutionNode) -> bool:
-    full_block = await execution_node.get_block(block_number, verbose=True)
-
-    for tx in full_block["transactions"]:
-        if tx["from"] in BUILDER_FEE_RECIPIENTS and tx["to"] == fee_recipient:
-            logger.warning(f"Found tx from builder in {block_number} in unexpected location")
-            return True
-    return False
+class ManualInspectionRequired(ValueError):
+    pass
 
 
-async def _get_balance_change_adjusted(
+async def _get_balance_change_from_balances(
         address: str, block_number: int, slot: int,
         block_priority_tx_fees: int, execution_node: ExecutionNode, db_provider: DbProvider
 ) -> int:
@@ -115,35 +128,88 @@ async def _get_balance_change_adjusted(
 
     # Account for withdrawal state change
     # (the address may receive withdrawals from the beacon chain)
-    balance_change -= sum(1_000_000_000 * w.amount_gwei for w in db_provider.withdrawals_to_address(address, slot=slot) if w.slot == slot)
+    balance_change -= sum(1_000_000_000 * w.amount_gwei for w in await db_provider.withdrawals_to_address(address, slot=slot) if w.slot == slot)
 
     # Discard spammy 1 wei transactions
+    labels = address_labels.registry()
     for tx in full_block["transactions"]:
-        _spam_sender_addresses = (
-            "0x994e092C13aa50d312643B5caa0273317B664f5d",
-            "0x7b9d4D8772b8705dDc7456Daf821c3022DDa0504",
-            "0xd840d5f2b38662d8acde3b2beae6ff664f584843",
-            "0xc5c9f6dda68422984a06a66a3d1aebd7d979a158",
-            "0x35432a10EF42cc7FbF1aFf2e5F3508cb6ff61e44",
-            "0x2f448caad2fc3994bd2de4f59114c86fea9ae68f",
-            "0x3511f837687Ff7272A39a231Cac1452Ad71141Fa",
-            "0x459BbF3c1e0f3829bf91eF4f6d0D865d60ab6B87",
-            "0x451D118dBB2AbF9d83cfC04FbdbF3640Fd18d1d3",
-            "0x06d9ca334a8a74474e9b6ee31280c494321ae759",
-            "0x2f448caad2fc3994bd2de4f59114c86fea9ae68f",
-            "0x248475c0e9810a4f558bce4c718ae50a989dd55e",
-        )
         tx_value = int(tx["value"], base=16)
         if tx_value != 1:
             continue
         if tx["to"] is None or tx["to"].lower() != address.lower():
             continue
-        if tx["from"].lower() in (a.lower() for a in _spam_sender_addresses):
+        if labels.has_label(tx["from"], SPAM_SENDER):
             balance_change -= tx_value
 
     return balance_change
 
 
+def _traced_value_received(frame: dict, address: str, top_level: bool, labels: AddressLabelRegistry) -> int:
+    if frame.get("error") is not None:
+        # Reverted, along with all of its nested calls
+        return 0
+
+    value_received = 0
+    if frame["type"] in VALUE_TRANSFER_CALL_TYPES and frame.get("to") is not None and frame["to"].lower() == address:
+        value_received = int(frame.get("value", "0x0"), base=16)
+        if top_level and value_received == 1 and labels.has_label(frame["from"], SPAM_SENDER):
+            # Discard spammy 1 wei transactions
+            value_received = 0
+
+    return value_received + sum(
+        _traced_value_received(call, address, top_level=False, labels=labels) for call in frame.get("calls", ())
+    )
+
+
+async def _get_balance_change_from_trace(
+        address: str, block_number: int, block_priority_tx_fees: int, execution_node: ExecutionNode
+) -> int:
+    # All value transferred to the address during the block, including internal transactions.
+    # Outgoing transfers (reward distributions, regular txs from the address) and beacon chain withdrawals
+    # do not show up here, so there is nothing to offset.
+    address = address.lower()
+    block = await execution_node.get_block(block_number)
+    traces = await execution_node.trace_block(block_number)
+
+    labels = address_labels.registry()
+    balance_change = sum(_traced_value_received(trace, address, top_level=True, labels=labels) for trace in traces)
+    if block["miner"].lower() == address:
+        balance_change += block_priority_tx_fees
+    return balance_change
+
+
+async def _get_balance_change_adjusted(
+        address: str, block_number: int, slot: int,
+        block_priority_tx_fees: int, execution_node: ExecutionNode, db_provider: DbProvider
+) -> int:
+    if BALANCE_ACCOUNTING == "trace":
+        return await _get_balance_change_from_trace(address, block_number, block_priority_tx_fees, execution_node)
+
+    balance_change = await _get_balance_change_from_balances(
+        address=address, block_number=block_number, slot=slot,
+        block_priority_tx_fees=block_priority_tx_fees,
+        execution_node=execution_node, db_provider=db_provider,
+    )
+
+    if BALANCE_ACCOUNTING == "compare":
+        try:
+            traced_balance_change = await _get_balance_change_from_trace(
+                address, block_number, block_priority_tx_fees, execution_node
+            )
+        except Exception as e:
+            logger.exception(f"Failed to trace {block_number}: {e}")
+            BLOCK_REWARD_ACCOUNTING_COMPARISONS.labels("error").inc()
+        else:
+            if traced_balance_change == balance_change:
+                BLOCK_REWARD_ACCOUNTING_COMPARISONS.labels("match").inc()
+            else:
+                logger.warning(f"Traced balance change of {address} in {block_number} ({traced_balance_change})"
+                               f" != balance change ({balance_change})")
+                BLOCK_REWARD_ACCOUNTING_COMPARISONS.labels("mismatch").inc()
+
+    return balance_change
+
+
 async def _mev_return_value(
         block_number: int,
         slot: int,
@@ -165,7 +231,7 @@ async def _mev_return_value(
         db_provider=db_provider,
     )
 
-    if mev_recipient.lower() in SMART_CONTRACT_FORWARDER_RECIPIENTS:
+    if address_labels.registry().has_label(mev_recipient, FORWARDER):
         # Skip verification - may need to implement logic for every forwarder contract...
         mev_recipient_balance_change = expected_value
 
@@ -187,54 +253,50 @@ async def _mev_return_value(
     )
 
 
+async def _provisional_mev_return_value(
+        block_number: int,
+        mev_recipient: str,
+        execution_node: ExecutionNode,
+        expected_value: int,
+) -> BlockRewardValue:
+    # Skips the (expensive) verification of the relay-reported value against
+    # the MEV recipient's balance change - it is verified later on.
+    miner_data = await execution_node.get_miner_data(block_number=block_number)
+    block_priority_tx_fees = await execution_node.get_block_priority_tx_fees(block_number, miner_data.tx_fee)
+
+    return BlockRewardValue(
+        block_priority_tx_fees=block_priority_tx_fees,
+        contains_mev=True,
+        mev_recipient=mev_recipient,
+        mev_recipient_balance_change=expected_value,
+        verified=False,
+    )
+
+
 async def _get_fee_recipient_distribution_balance_change(fee_recipient: str, block_number: int, execution_node: ExecutionNode) -> int:
     # Account for frequently occurring fee recipient smart contract operations - reward distributions.
     # If the reward distribution occurs in a block that also pays out to this address,
     # the balance change will not match and the block reward may be off.
-    if fee_recipient in SMART_CONTRACTS_ROCKETPOOL:
+    labels = address_labels.labels_for(fee_recipient)
+    if ROCKETPOOL_DISTRIBUTOR in labels:
         return await _get_rocketpool_rewards_distribution_value(block_number, fee_recipient, execution_node=execution_node)
-    elif fee_recipient == SMART_CONTRACT_LIDO_EXEC_LAYER_REWARDS_VAULT:
+    elif LIDO_REWARDS_VAULT in labels:
         return await _get_lido_rewards_distribution_value(block_number, execution_node=execution_node)
-    elif fee_recipient in SMART_CONTRACTS_STAKEFISH:
+    elif STAKEFISH_FEE_POOL in labels:
         return await _get_stakefish_rewards_distribution_value(block_number, fee_recipient, execution_node=execution_node)
-    elif fee_recipient in SMART_CONTRACTS_KRAKEN:
+    elif KRAKEN_DISTRIBUTOR in labels:
         return await _get_kraken_rewards_distribution_value(block_number, fee_recipient, execution_node=execution_node)
     else:
         return 0
 
 
-async def get_block_reward_value(
-        slot_proposer_data: SlotProposerData,
-        execution_node: ExecutionNode,
-        db_provider: DbProvider,
-) -> BlockRewardValue:
+async def get_relay_payload(block_hash: str) -> DeliveredPayloadsResponse | None:
     """
-    Returns the block's priority tx fees, a bool indicating whether the block contains MEV, the MEV reward recipient
-    and the MEV reward value.
+    Returns the payload delivered by one of the MEV relays for the block, None if no relay delivered it.
     """
-    block_number = slot_proposer_data.block_number
-    fee_recipient = slot_proposer_data.fee_recipient
-
-    # Check MEV relays for the block
-    relays: list[MevRelay] = [
-        MevRelay(api_url=api_url)
-        for api_url in [
-            # see https://ethstaker.cc/mev-relay-list/
-            "https://boost-relay.flashbots.net",
-            "https://relay-analytics.ultrasound.money",
-            "https://agnostic-relay.net",
-            "https://bloxroute.max-profit.blxrbdn.com",
-            "https://bloxroute.regulated.blxrbdn.com",
-            "https://mainnet-relay.securerpc.com",
-            "https://relay.wenmerge.com",
-            "https://aestus.live",
-            "https://titanrelay.xyz",
-            "https://eu-relay.ethgas.com",
-        ]
-    ]
-
     relay_fetch_payload_tasks = [
-        asyncio.create_task(relay.get_payload(block_hash=slot_proposer_data.block_hash)) for relay in relays
+        asyncio.create_task(MevRelay(api_url=api_url).get_payload(block_hash=block_hash))
+        for api_url in MEV_RELAY_API_URLS
     ]
 
     for coro in asyncio.as_completed(relay_fetch_payload_tasks):
@@ -248,158 +310,288 @@ async def get_block_reward_value(
             raise e
         else:
             if payload is not None:
-                # MEV! Block hash matches with payload delivered by MEV relay
+                # Block hash matches with payload delivered by MEV relay
                 for task in relay_fetch_payload_tasks:
                     task.cancel()
+                return payload
+    return None
 
-                logger.info(f"MEV found in {slot_proposer_data.slot}")
-                return await _mev_return_value(
-                    block_number=block_number,
-                    slot=slot_proposer_data.slot,
-                    mev_recipient=payload.proposer_fee_recipient.lower(),
-                    execution_node=execution_node,
-                    db_provider=db_provider,
-                    expected_value=payload.value,
-                )
-
-    # No MEV detected based on relays
-    miner_data = await execution_node.get_miner_data(block_number=block_number)
-    block_extra_data_decoded = bytes.fromhex(miner_data.extra_data[2:]).decode(
-        errors="ignore") if len(
-        miner_data.extra_data) > 2 else None
-    block_priority_tx_fees = await execution_node.get_block_priority_tx_fees(
-        block_number, miner_data.tx_fee)
-
-    # Relayooor.wtf relay is down - cannot get data about it, identify based on
-    # block extra data
-    if block_extra_data_decoded in ("Viva relayooor.wtf",) or slot_proposer_data.slot in RELAYOOOR_SLOTS:
-        return await _mev_return_value(
-            block_number=block_number,
-            slot=slot_proposer_data.slot,
-            mev_recipient=fee_recipient,
-            execution_node=execution_node,
-            db_provider=db_provider,
-            expected_value=None,
-        )
 
-    # Check if fee recipient's balance change is equal to tx fees
-    # -> should be the case when there is no MEV transferred in a tx
-    fee_rec_bal_change = await _get_balance_change_adjusted(
-        address=fee_recipient, block_number=block_number, slot=slot_proposer_data.slot,
-        block_priority_tx_fees=block_priority_tx_fees,
-        execution_node=execution_node,
-        db_provider=db_provider,
-    )
-    if fee_rec_bal_change != block_priority_tx_fees or fee_recipient.lower() in BUILDER_FEE_RECIPIENTS:
-        # Check for MEV transfer tx in last tx in block (from fee recipient)
-        tx_count = await execution_node.get_block_tx_count(block_number=block_number)
-
-        if tx_count > 0:
-            last_tx = await execution_node.get_tx_data(block_number=block_number,
-                                                       tx_index=tx_count - 1)
-            if fee_recipient.lower() in BUILDER_FEE_RECIPIENTS:
-                # MEV reward recipient = recipient of last tx in block
-                assert last_tx.from_.lower() == fee_recipient.lower(), \
-                    f"Expected MEV distribution in last tx, but not found in slot {slot_proposer_data.slot}"
-
-                logger.info(f"MEV found in {slot_proposer_data.slot} - last tx from {last_tx.from_}")
-                return await _mev_return_value(block_number=block_number,
-                                               slot=slot_proposer_data.slot,
-                                               mev_recipient=last_tx.to,
-                                               execution_node=execution_node,
-                                               db_provider=db_provider,
-                                               expected_value=last_tx.value)
-
-            full_block = await execution_node.get_block(block_number, verbose=True)
-            if any(
-                    tx["to"].lower() in SMART_CONTRACTS_MEV_BOTS for tx in full_block["transactions"] if tx["to"] is not None
-            ) and fee_rec_bal_change > block_priority_tx_fees:
-                logger.info(f"Fee recipient's balance change > tx fees."
-                            f" MEV Bot contract call found in slot {slot_proposer_data.slot}")
-                return await _mev_return_value(
-                    block_number=block_number,
-                    slot=slot_proposer_data.slot,
-                    mev_recipient=fee_recipient,
-                    execution_node=execution_node,
-                    db_provider=db_provider,
-                    expected_value=fee_rec_bal_change,
-                )
+class BlockRewardContext:
+    """
+    Data about a block that detectors may need. Every piece of data is fetched
+    at most once, and only when a detector actually asks for it.
+    """
+    def __init__(
+            self,
+            slot_proposer_data: SlotProposerData,
+            execution_node: ExecutionNode,
+            db_provider: DbProvider,
+            relay_payload_source: RelayPayloadSource = get_relay_payload,
+    ):
+        self.slot_proposer_data = slot_proposer_data
+        self.execution_node = execution_node
+        self.db_provider = db_provider
+        self.relay_payload_source = relay_payload_source
+        self.labels = address_labels.registry()
+
+        self._data: dict[str, Any] = {}
+
+    @property
+    def slot(self) -> int:
+        return self.slot_proposer_data.slot
+
+    @property
+    def block_number(self) -> int:
+        return self.slot_proposer_data.block_number
+
+    @property
+    def fee_recipient(self) -> str:
+        return self.slot_proposer_data.fee_recipient
+
+    async def _get(self, name: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        if name not in self._data:
+            self._data[name] = await fetch()
+        return self._data[name]
+
+    async def block(self) -> dict:
+        return await self._get("block", lambda: self.execution_node.get_block(self.block_number))
+
+    async def extra_data_decoded(self) -> str | None:
+        extra_data = (await self.block())["extraData"]
+        return bytes.fromhex(extra_data[2:]).decode(errors="ignore") if len(extra_data) > 2 else None
+
+    async def last_tx(self) -> TxData | None:
+        async def _fetch() -> TxData | None:
+            tx_count = len((await self.block())["transactions"])
+            if tx_count == 0:
+                return None
+            return await self.execution_node.get_tx_data(block_number=self.block_number, tx_index=tx_count - 1)
+        return await self._get("last_tx", _fetch)
+
+    async def full_block(self) -> dict:
+        return await self._get("full_block", lambda: self.execution_node.get_block(self.block_number, verbose=True))
+
+    async def block_priority_tx_fees(self) -> int:
+        async def _fetch() -> int:
+            miner_data = await self.execution_node.get_miner_data(block_number=self.block_number)
+            return await self.execution_node.get_block_priority_tx_fees(self.block_number, miner_data.tx_fee)
+        return await self._get("block_priority_tx_fees", _fetch)
+
+    async def fee_recipient_balance_change(self) -> int:
+        async def _fetch() -> int:
+            return await _get_balance_change_adjusted(
+                address=self.fee_recipient, block_number=self.block_number, slot=self.slot,
+                block_priority_tx_fees=await self.block_priority_tx_fees(),
+                execution_node=self.execution_node,
+                db_provider=self.db_provider,
+            )
+        return await self._get("fee_recipient_balance_change", _fetch)
+
+    async def relay_payload(self) -> DeliveredPayloadsResponse | None:
+        return await self._get("relay_payload", lambda: self.relay_payload_source(self.slot_proposer_data.block_hash))
+
+
+# Rough cost of fetching each piece of context data - in RPC / HTTP requests
+CONTEXT_DATA_COSTS = {
+    "block": 1,
+    "last_tx": 2,
+    "full_block": 1,
+    "block_priority_tx_fees": 3,
+    # Two archive node balance lookups, priority tx fees, the full block and reward distribution lookups
+    "fee_recipient_balance_change": 8,
+    "relay_payload": len(MEV_RELAY_API_URLS),
+}
 
-        raise ManualInspectionRequired(
-            f"No MEV but fee recipient's balance change ({fee_rec_bal_change})"
-            f" not equal to tx fees ({block_priority_tx_fees}) - MEV in {slot_proposer_data.slot}?"
-        )
 
-    logger.info(f"No MEV found in {slot_proposer_data.slot}")
-    return BlockRewardValue(
-        block_priority_tx_fees=block_priority_tx_fees,
-        contains_mev=False,
-        mev_recipient=None,
-        mev_recipient_balance_change=None,
-    )
+class BlockRewardDetector(abc.ABC):
+    """
+    Detects MEV in a block. Detectors run in order of precedence, cheapest first
+    among those of the same precedence - the first detection wins.
+    """
+    name: str
+    # Detectors whose detections are more reliable run first, regardless of their cost.
+    # The MEV reward reported by a relay is authoritative - a builder's last tx or the fee
+    # recipient's balance change are only used for blocks no relay delivered.
+    precedence: int = 0
+    # Context data the detector needs
+    requires: tuple[str, ...] = ()
+    # Whether the detected expected value was reported by a third party
+    # and can be stored as a provisional value without verifying it
+    provisional_ok: bool = False
+
+    @property
+    def cost(self) -> int:
+        return sum(CONTEXT_DATA_COSTS[data] for data in self.requires)
+
+    @abc.abstractmethod
+    async def detect(self, ctx: BlockRewardContext) -> MevDetection | None:
+        ...
+
+
+class RelayooorSlotDetector(BlockRewardDetector):
+    # Relayooor.wtf relay is down - cannot get delivered payloads for these slots
+    name = "relayooor_slot"
+
+    async def detect(self, ctx: BlockRewardContext) -> MevDetection | None:
+        if ctx.slot in RELAYOOOR_SLOTS:
+            return MevDetection(mev_recipient=ctx.fee_recipient, expected_value=None)
+        return None
+
+
+class RelayooorExtraDataDetector(BlockRewardDetector):
+    # Relayooor.wtf relay is down - identify its blocks based on block extra data
+    name = "relayooor_extra_data"
+    requires = ("block",)
+
+    async def detect(self, ctx: BlockRewardContext) -> MevDetection | None:
+        extra_data = await ctx.extra_data_decoded()
+        if extra_data is not None and RELAYOOOR_EXTRA_DATA.match(extra_data):
+            return MevDetection(mev_recipient=ctx.fee_recipient, expected_value=None)
+        return None
+
+
+class BuilderFeeRecipientDetector(BlockRewardDetector):
+    # Builder is the fee recipient -> MEV reward recipient = recipient of last tx in block
+    name = "builder_fee_recipient"
+    requires = ("last_tx",)
+    precedence = 1
+    provisional_ok = True
+
+    async def detect(self, ctx: BlockRewardContext) -> MevDetection | None:
+        if not ctx.labels.has_label(ctx.fee_recipient, BUILDER):
+            return None
+        last_tx = await ctx.last_tx()
+        if last_tx is None or last_tx.from_.lower() != ctx.fee_recipient.lower():
+            return None
+        logger.info(f"MEV found in {ctx.slot} - last tx from {last_tx.from_}")
+        return MevDetection(mev_recipient=last_tx.to, expected_value=last_tx.value)
+
+
+class RelayPayloadDetector(BlockRewardDetector):
+    name = "relay_payload"
+    requires = ("relay_payload",)
+    provisional_ok = True
+
+    async def detect(self, ctx: BlockRewardContext) -> MevDetection | None:
+        payload = await ctx.relay_payload()
+        if payload is None:
+            return None
+        return MevDetection(mev_recipient=payload.proposer_fee_recipient.lower(), expected_value=payload.value)
+
+
+class MevBotContractDetector(BlockRewardDetector):
+    name = "mev_bot_contract"
+    requires = ("fee_recipient_balance_change", "block_priority_tx_fees", "full_block")
+    precedence = 1
+
+    async def detect(self, ctx: BlockRewardContext) -> MevDetection | None:
+        if ctx.labels.has_label(ctx.fee_recipient, BUILDER):
+            # Builders distribute MEV in the last tx
+            return None
+        fee_rec_bal_change = await ctx.fee_recipient_balance_change()
+        if fee_rec_bal_change <= await ctx.block_priority_tx_fees():
+            return None
+        full_block = await ctx.full_block()
+        if not any(
+                ctx.labels.has_label(tx["to"], MEV_BOT) for tx in full_block["transactions"]
+        ):
+            return None
+        logger.info(f"Fee recipient's balance change > tx fees."
+                    f" MEV Bot contract call found in slot {ctx.slot}")
+        return MevDetection(mev_recipient=ctx.fee_recipient, expected_value=fee_rec_bal_change)
+
+
+DETECTORS: list[BlockRewardDetector] = sorted(
+    (
+        RelayooorSlotDetector(),
+        RelayooorExtraDataDetector(),
+        BuilderFeeRecipientDetector(),
+        RelayPayloadDetector(),
+        MevBotContractDetector(),
+    ),
+    key=lambda detector: (detector.precedence, detector.cost),
+)
 
-    # TODO remove below
-    #  (the old, too expensive and complicated, way of calculation below this line)
-
-    # Check for MEV distribution in last tx
-    last_tx = None
-    tx_count = await execution_node.get_block_tx_count(block_number=block_number)
-    if tx_count > 0:
-        last_tx = await execution_node.get_tx_data(block_number=block_number, tx_index=tx_count - 1)
-    if fee_recipient in BUILDER_FEE_RECIPIENTS:
-        # MEV reward recipient = recipient of last tx in block
-        assert last_tx.from_ == fee_recipient, \
-            f"Expected MEV distribution in last tx, but not found in block {block_number}"
-        return await _mev_return_value(block_number=block_number, mev_recipient=last_tx.to, execution_node=execution_node)
-    # If the sender of the last tx is the fee recipient, assume it's a MEV reward distribution
-    elif last_tx is not None and last_tx.from_ == fee_recipient and last_tx.value > 0:
-        logger.warning("Assuming MEV because of last tx in block.\n"
-                       f"Block number: {block_number}, "
-                       f"Fee recipient: {fee_recipient}")
-        return await _mev_return_value(block_number=block_number, mev_recipient=last_tx.to, execution_node=execution_node)
-    # Sometimes the MEV reward is not sent from the fee recipient address, but from one of these
-    elif last_tx is not None and last_tx.from_ in (
-        "0xc13ced137e90bc695cb77288962280516a2f9b8b",  # MevRefunder, e.g. block 15712761
-    ):
-        logger.warning(f"Last tx from {last_tx.from_} -> assuming MEV in block {block_number}")
-        return await _mev_return_value(block_number=block_number, mev_recipient=last_tx.to, execution_node=execution_node)
 
-    # Check for missed MEV distribution by comparing the fee recipient balance change
-    # to the block priority tx fees
-    miner_data = await execution_node.get_miner_data(block_number=block_number)
-    block_extra_data_decoded = bytes.fromhex(miner_data.extra_data[2:]).decode(errors="ignore") if len(
-        miner_data.extra_data) > 2 else None
-    block_priority_tx_fees = await execution_node.get_block_priority_tx_fees(block_number, miner_data.tx_fee)
-    fee_rec_bal_change = await _get_balance_change_adjusted(
-        address=fee_recipient, block_number=block_number, block_priority_tx_fees=block_priority_tx_fees,
-        execution_node=execution_node
-    )
+async def _run_detectors(ctx: BlockRewardContext, detectors: list[BlockRewardDetector]) -> tuple[BlockRewardDetector, MevDetection] | None:
+    for detector in detectors:
+        with BLOCK_REWARD_DETECTOR_SECONDS.labels(detector.name).time():
+            try:
+                detection = await detector.detect(ctx)
+            except Exception:
+                BLOCK_REWARD_DETECTOR_RESULTS.labels(detector.name, "error").inc()
+                raise
+        BLOCK_REWARD_DETECTOR_RESULTS.labels(detector.name, "miss" if detection is None else "hit").inc()
+        if detection is not None:
+            return detector, detection
+    return None
 
-    if _extra_data_indicates_mev(block_extra_data_decoded):
-        return await _mev_return_value(block_number=block_number, mev_recipient=fee_recipient, execution_node=execution_node)
 
-    if fee_rec_bal_change != block_priority_tx_fees:
-        if await _contains_call_to_mev_bot_contract(block_number=block_number, execution_node=execution_node):
-            return await _mev_return_value(block_number=block_number, mev_recipient=fee_recipient, execution_node=execution_node)
+async def get_block_reward_value(
+        slot_proposer_data: SlotProposerData,
+        execution_node: ExecutionNode,
+        db_provider: DbProvider,
+        verify: bool = True,
+        relay_payload_source: RelayPayloadSource = get_relay_payload,
+) -> BlockRewardValue:
+    """
+    Returns the block's priority tx fees, a bool indicating whether the block contains MEV, the MEV reward recipient
+    and the MEV reward value, along with the version of the address labels used to classify the block.
 
-        if await _contains_tx_from_builder_to_fee_recipient(block_number=block_number, fee_recipient=fee_recipient, execution_node=execution_node):
-            return await _mev_return_value(block_number=block_number, mev_recipient=fee_recipient, execution_node=execution_node)
+    If verify is False, MEV reward values reported by relays or builders are returned as provisional values,
+    without verifying them against the MEV reward recipient's balance change.
 
-        if fee_recipient in (
-                "0x7d00a2bc1370b9005eb100004da500924600a2e1",
-        ) and last_tx.from_ == "0xac7ea48093b61f2e217b9d077d69d9d55ca1b106":
-            # a2e1 smart contract, somehow distributes the earnings...
-            # Right now I assume it contains MEV and the
-            # contract is the MEV recipient
-            return await _mev_return_value(block_number=block_number, mev_recipient=fee_recipient,
-                                           execution_node=execution_node)
+    relay_payload_source returns the payload delivered by MEV relays for a block hash - by default,
+    the relays are queried.
+    """
+    ctx = BlockRewardContext(
+        slot_proposer_data,
+        execution_node=execution_node,
+        db_provider=db_provider,
+        relay_payload_source=relay_payload_source,
+    )
 
-        raise ManualInspectionRequired(f"fee_rec_bal_change != block_priority_tx_fees in block {block_number}")
+    result = await _run_detectors(ctx, DETECTORS)
+    if result is not None:
+        detector, detection = result
+        logger.info(f"MEV found in {ctx.slot} by {detector.name}")
+        if not verify and detector.provisional_ok:
+            block_reward_value = await _provisional_mev_return_value(
+                block_number=ctx.block_number,
+                mev_recipient=detection.mev_recipient,
+                execution_node=execution_node,
+                expected_value=detection.expected_value,
+            )
+        else:
+            block_reward_value = await _mev_return_value(
+                block_number=ctx.block_number,
+                slot=ctx.slot,
+                mev_recipient=detection.mev_recipient,
+                execution_node=execution_node,
+                db_provider=db_provider,
+                expected_value=detection.expected_value,
+            )
+        return block_reward_value._replace(label_registry_version=ctx.labels.version)
 
     # No MEV detected
+    if ctx.labels.has_label(ctx.fee_recipient, BUILDER) and await ctx.last_tx() is not None:
+        raise AssertionError(f"Expected MEV distribution in last tx, but not found in slot {ctx.slot}")
+
+    # Fee recipient's balance change should be equal to tx fees when there is no MEV transferred in a tx
+    block_priority_tx_fees = await ctx.block_priority_tx_fees()
+    fee_rec_bal_change = await ctx.fee_recipient_balance_change()
+    if fee_rec_bal_change != block_priority_tx_fees or ctx.labels.has_label(ctx.fee_recipient, BUILDER):
+        raise ManualInspectionRequired(
+            f"No MEV but fee recipient's balance change ({fee_rec_bal_change})"
+            f" not equal to tx fees ({block_priority_tx_fees}) - MEV in {ctx.slot}?"
+        )
+
+    logger.info(f"No MEV found in {ctx.slot}")
     return BlockRewardValue(
         block_priority_tx_fees=block_priority_tx_fees,
         contains_mev=False,
         mev_recipient=None,
         mev_recipient_balance_change=None,
+        label_registry_version=ctx.labels.version,
     )
@@ -0,0 +1,135 @@
+"""
+DB-backed leases of slot ranges for the block rewards indexer.
+
+Any number of indexer processes (on any number of hosts) can claim a lease,
+keep it alive using heartbeats while they are processing its slots and
+release it once they are done. Leases that are not kept alive expire
+and are reclaimed by other processes.
+"""
+import datetime
+import logging
+import os
+import socket
+from typing import Iterable, Optional
+
+import pytz
+from sqlalchemy import case, or_, text
+
+from db.db_helpers import session_scope
+from db.tables import BlockRewardLease
+
+logger = logging.getLogger(__name__)
+
+LEASE_DURATION = datetime.timedelta(minutes=5)
+
+
+def lease_owner() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def ensure_leases(run: str, start_slot: int, end_slot: int, range_size: int) -> None:
+    """
+    Creates leases covering the slots between start_slot and end_slot.
+    Ranges are aligned to range_size, existing leases are left untouched.
+    """
+    first_range_start = start_slot - (start_slot % range_size)
+    with session_scope() as session:
+        session.execute(
+            text(
+                f"INSERT INTO {BlockRewardLease.__tablename__}(run, range_start, range_end, completed)"
+                " VALUES(:run, :range_start, :range_end, false)"
+                f" ON CONFLICT ON CONSTRAINT {BlockRewardLease.__tablename__}_pkey DO NOTHING"
+            ),
+            [
+                {
+                    "run": run,
+                    "range_start": range_start,
+                    "range_end": range_start + range_size - 1,
+                }
+                for range_start in range(first_range_start, end_slot + 1, range_size)
+            ]
+        )
+
+
+def claim_lease(
+    run: str,
+    owner: str,
+    prefer_from_slot: int | None = None,
+    skip_range_starts: Iterable[int] = (),
+    from_slot: int | None = None,
+    to_slot: int | None = None,
+) -> Optional[tuple[int, int]]:
+    """
+    Claims the oldest lease that is neither completed nor held by another process.
+    Leases reaching prefer_from_slot or later (e.g. the recently finalized slots) are claimed first.
+    Leases starting at any of skip_range_starts are not claimed, neither are leases
+    ending before from_slot or starting after to_slot.
+    Returns the (inclusive) slot range of the claimed lease or None if there is nothing to claim.
+    """
+    now = datetime.datetime.now(tz=pytz.UTC)
+    order_by = [BlockRewardLease.range_start.asc()]
+    if prefer_from_slot is not None:
+        order_by.insert(0, case((BlockRewardLease.range_end >= prefer_from_slot, 0), else_=1))
+
+    with session_scope() as session:
+        lease = session.query(BlockRewardLease).filter(
+            BlockRewardLease.run == run
+        ).filter(
+            BlockRewardLease.completed.is_(False)
+        ).filter(
+            or_(
+                BlockRewardLease.owner.is_(None),
+                BlockRewardLease.expires_at < now,
+            )
+        ).filter(
+            BlockRewardLease.range_start.not_in(list(skip_range_starts))
+        )
+        if from_slot is not None:
+            lease = lease.filter(BlockRewardLease.range_end >= from_slot)
+        if to_slot is not None:
+            lease = lease.filter(BlockRewardLease.range_start <= to_slot)
+        lease = lease.order_by(
+            *order_by
+        ).with_for_update(skip_locked=True).first()
+
+        if lease is None:
+            return None
+
+        if lease.owner is not None:
+            logger.warning(f"Reclaiming expired lease {lease.range_start} - {lease.range_end} from {lease.owner}")
+
+        lease.owner = owner
+        lease.expires_at = now + LEASE_DURATION
+        return lease.range_start, lease.range_end
+
+
+def heartbeat_lease(run: str, range_start: int, owner: str) -> bool:
+    """
+    Extends the lease. Returns False if the lease is no longer held by the owner.
+    """
+    with session_scope() as session:
+        updated = session.query(BlockRewardLease).filter(
+            BlockRewardLease.run == run
+        ).filter(
+            BlockRewardLease.range_start == range_start
+        ).filter(
+            BlockRewardLease.owner == owner
+        ).update({
+            BlockRewardLease.expires_at: datetime.datetime.now(tz=pytz.UTC) + LEASE_DURATION,
+        })
+    return updated == 1
+
+
+def release_lease(run: str, range_start: int, owner: str, completed: bool) -> None:
+    with session_scope() as session:
+        session.query(BlockRewardLease).filter(
+            BlockRewardLease.run == run
+        ).filter(
+            BlockRewardLease.range_start == range_start
+        ).filter(
+            BlockRewardLease.owner == owner
+        ).update({
+            BlockRewardLease.owner: None,
+            BlockRewardLease.expires_at: None,
+            BlockRewardLease.completed: completed,
+        })
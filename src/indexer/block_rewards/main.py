@@ -1,21 +1,55 @@
+import datetime
 import logging
 import asyncio
 import os
 
-from prometheus_client import start_http_server, Gauge
+import pytz
+from prometheus_client import start_http_server, Counter, Gauge
+from sqlalchemy import or_
 
 from shared.setup_logging import setup_logging
-from providers.beacon_node import BeaconNode
+from providers.beacon_node import BeaconNode, SlotProposerData, SLOT_TIME, SLOTS_PER_EPOCH
 from providers.db_provider import DbProvider
 from providers.execution_node import ExecutionNode
-from db.tables import BlockReward
+from db.tables import BlockReward, BlockRewardInput
 from db.db_helpers import session_scope
-from indexer.block_rewards.block_rewards_mev_simple import get_block_reward_value
+from indexer.block_rewards.block_rewards_mev_simple import get_block_reward_value, get_relay_payload
+from indexer.block_rewards.block_inputs import RecordingExecutionNode
+from indexer.block_rewards.leases import LEASE_DURATION, lease_owner, ensure_leases, \
+    claim_lease, heartbeat_lease, release_lease
+from indexer.lanes import IndexingLane
 
 logger = logging.getLogger(__name__)
 
 START_SLOT = 4700013  # First PoS slot
 
+# Failed slots are retried with an exponential backoff, up to a maximum amount of attempts.
+# After that they need to be looked at manually (or reprocessed using INDEX_ALL).
+RETRY_MAX_ATTEMPTS = 8
+RETRY_BASE_DELAY = datetime.timedelta(minutes=10)
+# Failed slots picked up by the retry lane of one indexer process are hidden from
+# other processes for this long
+RETRY_CLAIM_DURATION = datetime.timedelta(minutes=30)
+
+# Fast mode stores relay-reported MEV reward values as provisional values,
+# the verification lane verifies (and corrects) them afterwards
+FAST_MODE = os.getenv("BLOCK_REWARDS_FAST_MODE") == "true"
+
+# Keeps a compact copy of the data each block was classified from,
+# to be able to re-classify blocks offline (see reclassify.py)
+RECORD_INPUTS = os.getenv("BLOCK_REWARDS_RECORD_INPUTS") == "true"
+
+# Leases are used to run multiple indexer processes side by side
+USE_LEASES = os.getenv("BLOCK_REWARDS_USE_LEASES") == "true"
+LEASE_RUN = os.getenv("BLOCK_REWARDS_LEASE_RUN", "live")
+LEASE_RANGE_SIZE = int(os.getenv("BLOCK_REWARDS_LEASE_RANGE_SIZE", "1000"))
+
+# Slots finalized within this window are processed by the head lane, which has its
+# own concurrency budget so that recent block rewards do not wait behind the backlog
+HEAD_LANE_SLOTS = 2 * 7200  # ~2 days
+HEAD_LANE_CONCURRENCY = 3
+BACKFILL_LANE_CONCURRENCY = 7
+
 ALREADY_INDEXED_SLOTS = set()
 
 SLOTS_WITH_MISSING_BLOCK_REWARDS = Gauge(
@@ -26,19 +60,153 @@ SLOTS_INDEXING_FAILURES = Gauge(
     "slots_indexing_failures",
     "Slots where indexing failed"
 )
+SLOTS_INDEXING_FAILURES_RETRIES_EXHAUSTED = Gauge(
+    "slots_indexing_failures_retries_exhausted",
+    "Slots where indexing failed and which will not be retried automatically anymore",
+)
+SLOTS_INDEXING_RETRIES = Counter(
+    "slots_indexing_retries",
+    "Retries of slots where indexing previously failed",
+    labelnames=("outcome",),
+)
 SLOT_BEING_INDEXED = Gauge(
     "slot_being_indexed",
     "The slot that is currently being indexed",
 )
+SLOTS_PROVISIONAL = Gauge(
+    "slots_provisional",
+    "Slots with provisional block reward values that still need to be verified",
+)
+SLOTS_VERIFICATIONS = Counter(
+    "slots_verifications",
+    "Verifications of provisional block reward values",
+    labelnames=("outcome",),
+)
+BLOCK_REWARD_LEASES_COMPLETED = Counter(
+    "block_reward_leases_completed",
+    "Slot range leases completed by this indexer process",
+)
+BLOCK_REWARD_LEASES_LOST = Counter(
+    "block_reward_leases_lost",
+    "Slot range leases that expired while this indexer process was working on them",
+)
+
+
+# Lanes control max concurrent requests
+HEAD_LANE = None
+BACKFILL_LANE = None
+# Separate semaphores for the retry and verification lanes - these should not starve regular indexing
+RETRY_SEM = None
+VERIFY_SEM = None
+
+
+def _next_attempt_at(attempts: int) -> datetime.datetime:
+    return datetime.datetime.now(tz=pytz.UTC) + RETRY_BASE_DELAY * 2 ** (attempts - 1)
 
 
-# Semaphore to control max concurrent requests
-SEM = None
+async def _index_slot(
+    slot_proposer_data: SlotProposerData,
+    execution_node: ExecutionNode,
+    db_provider: DbProvider,
+    previous_attempts: int = 0,
+    verify: bool = True,
+    verifying: bool = False,
+) -> bool:
+    """
+    Classifies the block in the slot and upserts its BlockReward row.
+    If verify is False, relay-reported MEV reward values are stored as provisional values.
+    If verifying is True, the slot has a provisional row already - it is kept as is if this fails.
+
+    Returns True if the block reward was processed successfully, False otherwise.
+    """
+    slot = slot_proposer_data.slot
+
+    with session_scope() as session:
+        if slot_proposer_data.block_number is None:
+            # No block in this slot
+            session.merge(
+                BlockReward(
+                    slot=slot,
+                    reward_processed_ok=True,
+                    reward_processing_error=None,
+                    reward_processing_attempts=previous_attempts + 1,
+                    reward_processing_next_attempt=None,
+                ),
+            )
+            return True
+
+        relay_payload_source = get_relay_payload
+        if RECORD_INPUTS:
+            execution_node = RecordingExecutionNode(execution_node)
+            execution_node.inputs.slot_proposer_data = slot_proposer_data
+            relay_payload_source = execution_node.get_relay_payload
+
+        try:
+            block_reward_value = await get_block_reward_value(
+                slot_proposer_data=slot_proposer_data,
+                execution_node=execution_node,
+                db_provider=db_provider,
+                verify=verify,
+                relay_payload_source=relay_payload_source,
+            )
+        except Exception as e:
+            logger.exception(e)
+            logger.error(f"Failed to process slot {slot} -> {str(e)}")
+            if RECORD_INPUTS:
+                # Slots needing manual inspection may be classified correctly by new rules later on
+                session.merge(BlockRewardInput(slot=slot, data=execution_node.inputs.encode()))
+            attempts = previous_attempts + 1
+            next_attempt = _next_attempt_at(attempts) if attempts < RETRY_MAX_ATTEMPTS else None
+            if verifying:
+                # The provisional values remain usable, the verification lane tries again later on
+                block_reward = session.get(BlockReward, slot)
+                block_reward.reward_processing_error = f"{type(e).__name__}: {e}"
+                block_reward.reward_processing_attempts = attempts
+                block_reward.reward_processing_next_attempt = next_attempt
+                return False
+            session.merge(
+                BlockReward(
+                    slot=slot,
+                    proposer_index=slot_proposer_data.proposer_index,
+                    fee_recipient=slot_proposer_data.fee_recipient,
+                    reward_processed_ok=False,
+                    reward_processing_error=f"{type(e).__name__}: {e}",
+                    reward_processing_attempts=attempts,
+                    reward_processing_next_attempt=next_attempt,
+                ),
+            )
+            return False
+
+        block = await execution_node.get_block(block_number=slot_proposer_data.block_number)
+        block_extra_data = block["extraData"]
+        if RECORD_INPUTS:
+            session.merge(BlockRewardInput(slot=slot, data=execution_node.inputs.encode()))
+        session.merge(
+            BlockReward(
+                slot=slot,
+                block_number=slot_proposer_data.block_number,
+                proposer_index=slot_proposer_data.proposer_index,
+                fee_recipient=slot_proposer_data.fee_recipient,
+                priority_fees_wei=block_reward_value.block_priority_tx_fees,
+                block_extra_data=bytes.fromhex(block_extra_data[2:]) if block_extra_data else None,
+                mev=block_reward_value.contains_mev,
+                mev_reward_recipient=block_reward_value.mev_recipient,
+                mev_reward_value_wei=block_reward_value.mev_recipient_balance_change,
+                reward_processed_ok=True,
+                reward_verified=block_reward_value.verified,
+                label_registry_version=block_reward_value.label_registry_version,
+                reward_processing_error=None,
+                reward_processing_attempts=previous_attempts + 1,
+                reward_processing_next_attempt=None,
+            ),
+        )
+        if not block_reward_value.verified:
+            SLOTS_PROVISIONAL.inc(1)
+        return True
 
 
-async def process_slot(slot: int) -> None:
-    global SEM
-    async with SEM:
+async def process_slot(slot: int, lane: IndexingLane) -> None:
+    async with lane.semaphore:
         beacon_node = BeaconNode()
         execution_node = ExecutionNode()
         db_provider = DbProvider()
@@ -46,6 +214,7 @@ async def process_slot(slot: int) -> None:
         # Wait for slot to be finalized
         if not await beacon_node.is_slot_finalized(slot):
             SLOTS_WITH_MISSING_BLOCK_REWARDS.dec(1)
+            lane.done(slot)
             logger.info(f"Waiting for slot {slot} to be finalized")
             return
 
@@ -55,72 +224,348 @@ async def process_slot(slot: int) -> None:
         # Retrieve block info
         slot_proposer_data = await beacon_node.get_slot_proposer_data(slot)
 
+        processed_ok = await _index_slot(
+            slot_proposer_data=slot_proposer_data,
+            execution_node=execution_node,
+            db_provider=db_provider,
+            verify=not FAST_MODE,
+        )
+        if not processed_ok:
+            SLOTS_INDEXING_FAILURES.inc(1)
+        ALREADY_INDEXED_SLOTS.add(slot)
+        SLOTS_WITH_MISSING_BLOCK_REWARDS.dec(1)
+        lane.done(slot)
+
+
+async def follow_head(slots: list[int], head_finalized: int, backfill: asyncio.Task) -> None:
+    """
+    Head lane - processes the given recent slots and then keeps up with newly
+    finalized slots for as long as the backfill lane is still working.
+    """
+    beacon_node = BeaconNode()
+    while True:
+        await asyncio.gather(*[process_slot(slot, HEAD_LANE) for slot in slots])
+
+        # Wait for the next epoch to be finalized
+        await asyncio.wait([backfill], timeout=SLOTS_PER_EPOCH * SLOT_TIME)
+        if backfill.done():
+            return
+
+        new_head_finalized = await beacon_node.head_finalized()
+        slots = [s for s in range(head_finalized, new_head_finalized) if s not in ALREADY_INDEXED_SLOTS]
+        head_finalized = new_head_finalized
+        HEAD_LANE.add(slots)
+        SLOTS_WITH_MISSING_BLOCK_REWARDS.inc(len(slots))
+
+
+async def retry_failed_slot(slot: int, previous_attempts: int) -> None:
+    global RETRY_SEM
+    async with RETRY_SEM:
+        beacon_node = BeaconNode()
+        execution_node = ExecutionNode()
+        db_provider = DbProvider()
+
+        logger.info(f"Retrying block rewards for slot {slot} (attempt {previous_attempts + 1})")
+        slot_proposer_data = await beacon_node.get_slot_proposer_data(slot)
+
+        processed_ok = await _index_slot(
+            slot_proposer_data=slot_proposer_data,
+            execution_node=execution_node,
+            db_provider=db_provider,
+            previous_attempts=previous_attempts,
+        )
+        if processed_ok:
+            SLOTS_INDEXING_FAILURES.dec(1)
+            SLOTS_INDEXING_RETRIES.labels("ok").inc()
+        else:
+            SLOTS_INDEXING_RETRIES.labels("failed").inc()
+            if previous_attempts + 1 >= RETRY_MAX_ATTEMPTS:
+                logger.warning(f"Giving up on slot {slot} after {previous_attempts + 1} attempts")
+                SLOTS_INDEXING_FAILURES_RETRIES_EXHAUSTED.inc(1)
+
+
+async def retry_failed_slots():
+    """
+    Retry lane - only picks up slots where reward processing previously failed
+    and whose backoff period has passed.
+    """
+    global RETRY_SEM
+    RETRY_SEM = asyncio.Semaphore(2)
+
+    now = datetime.datetime.now(tz=pytz.UTC)
+    with session_scope() as session:
+        SLOTS_INDEXING_FAILURES_RETRIES_EXHAUSTED.set(
+            session.query(BlockReward.slot)
+            .filter(BlockReward.reward_processed_ok.is_(False))
+            .filter(BlockReward.reward_processing_attempts >= RETRY_MAX_ATTEMPTS)
+            .count()
+        )
+        slots_to_retry = session.query(
+            BlockReward.slot,
+            BlockReward.reward_processing_attempts,
+        ).filter(
+            BlockReward.reward_processed_ok.is_(False)
+        ).filter(
+            BlockReward.reward_processing_attempts < RETRY_MAX_ATTEMPTS
+        ).filter(
+            or_(
+                BlockReward.reward_processing_next_attempt.is_(None),
+                BlockReward.reward_processing_next_attempt <= now,
+            )
+        ).order_by(BlockReward.slot.asc()).with_for_update(skip_locked=True).all()
+
+        # Claim the slots so that retry lanes of other indexer processes skip them
+        session.query(BlockReward).filter(
+            BlockReward.slot.in_([slot for slot, _ in slots_to_retry])
+        ).update({
+            BlockReward.reward_processing_next_attempt: now + RETRY_CLAIM_DURATION,
+        })
+
+    logger.info(f"Retrying block rewards for {len(slots_to_retry)} failed slots")
+
+    await asyncio.gather(*[retry_failed_slot(slot, attempts) for slot, attempts in slots_to_retry])
+
+
+async def verify_provisional_slot(slot: int, provisional_value: int, previous_attempts: int) -> None:
+    global VERIFY_SEM
+    async with VERIFY_SEM:
+        beacon_node = BeaconNode()
+        execution_node = ExecutionNode()
+        db_provider = DbProvider()
+
+        slot_proposer_data = await beacon_node.get_slot_proposer_data(slot)
+
+        processed_ok = await _index_slot(
+            slot_proposer_data=slot_proposer_data,
+            execution_node=execution_node,
+            db_provider=db_provider,
+            previous_attempts=previous_attempts,
+            verifying=True,
+        )
+        if not processed_ok:
+            # The provisional values are kept, the slot is verified again after a backoff period
+            SLOTS_VERIFICATIONS.labels("failed").inc()
+            if previous_attempts + 1 >= RETRY_MAX_ATTEMPTS:
+                logger.warning(f"Giving up on verifying slot {slot} after {previous_attempts + 1} attempts")
+            return
+        SLOTS_PROVISIONAL.dec(1)
+
         with session_scope() as session:
-            if slot_proposer_data.block_number is None:
-                # No block in this slot
-                session.merge(
-                    BlockReward(
-                        slot=slot,
-                        reward_processed_ok=True,
-                    ),
-                )
-                ALREADY_INDEXED_SLOTS.add(slot)
-                SLOTS_WITH_MISSING_BLOCK_REWARDS.dec(1)
-                session.commit()
-                return
-
-            try:
-                block_reward_value = await get_block_reward_value(
-                    slot_proposer_data=slot_proposer_data,
-                    execution_node=execution_node,
-                    db_provider=db_provider,
-                )
-            except Exception as e:
-                logger.exception(e)
-                logger.error(f"Failed to process slot {slot} -> {str(e)}")
-                session.merge(
-                    BlockReward(
-                        slot=slot,
-                        proposer_index=slot_proposer_data.proposer_index,
-                        fee_recipient=slot_proposer_data.fee_recipient,
-                        reward_processed_ok=False,
-                    ),
-                )
-                session.commit()
-                ALREADY_INDEXED_SLOTS.add(slot)
-                SLOTS_WITH_MISSING_BLOCK_REWARDS.dec(1)
-                return
-
-            block = await execution_node.get_block(block_number=slot_proposer_data.block_number)
-            block_extra_data = block["extraData"]
-            session.merge(
-                BlockReward(
-                    slot=slot,
-                    block_number=slot_proposer_data.block_number,
-                    proposer_index=slot_proposer_data.proposer_index,
-                    fee_recipient=slot_proposer_data.fee_recipient,
-                    priority_fees_wei=block_reward_value.block_priority_tx_fees,
-                    block_extra_data=bytes.fromhex(block_extra_data[2:]) if block_extra_data else None,
-                    mev=block_reward_value.contains_mev,
-                    mev_reward_recipient=block_reward_value.mev_recipient,
-                    mev_reward_value_wei=block_reward_value.mev_recipient_balance_change,
-                    reward_processed_ok=True,
-                ),
+            verified_value = session.get(BlockReward, slot).mev_reward_value_wei
+        if verified_value == provisional_value:
+            SLOTS_VERIFICATIONS.labels("confirmed").inc()
+        else:
+            logger.warning(f"Corrected provisional MEV reward value for slot {slot}:"
+                           f" {provisional_value} -> {verified_value}")
+            SLOTS_VERIFICATIONS.labels("corrected").inc()
+
+
+async def verify_provisional_slots():
+    """
+    Verification lane - verifies provisional block reward values
+    stored by the indexer in fast mode.
+    """
+    global VERIFY_SEM
+    VERIFY_SEM = asyncio.Semaphore(2)
+
+    now = datetime.datetime.now(tz=pytz.UTC)
+    with session_scope() as session:
+        SLOTS_PROVISIONAL.set(
+            session.query(BlockReward.slot).filter(BlockReward.reward_verified.is_(False)).count()
+        )
+        slots_to_verify = session.query(
+            BlockReward.slot,
+            BlockReward.mev_reward_value_wei,
+            BlockReward.reward_processing_attempts,
+        ).filter(
+            BlockReward.reward_processed_ok.is_(True)
+        ).filter(
+            BlockReward.reward_verified.is_(False)
+        ).filter(
+            BlockReward.reward_processing_attempts < RETRY_MAX_ATTEMPTS
+        ).filter(
+            or_(
+                BlockReward.reward_processing_next_attempt.is_(None),
+                BlockReward.reward_processing_next_attempt <= now,
             )
-            ALREADY_INDEXED_SLOTS.add(slot)
-            SLOTS_WITH_MISSING_BLOCK_REWARDS.dec(1)
+        ).order_by(BlockReward.slot.asc()).with_for_update(skip_locked=True).all()
+
+        # Claim the slots so that verification lanes of other indexer processes skip them
+        session.query(BlockReward).filter(
+            BlockReward.slot.in_([slot for slot, _, _ in slots_to_verify])
+        ).update({
+            BlockReward.reward_processing_next_attempt: now + RETRY_CLAIM_DURATION,
+        })
+
+    logger.info(f"Verifying provisional block rewards for {len(slots_to_verify)} slots")
+
+    await asyncio.gather(*[
+        verify_provisional_slot(slot, value, attempts) for slot, value, attempts in slots_to_verify
+    ])
+
+
+async def _keep_lease_alive(range_start: int, owner: str, work: asyncio.Future) -> bool:
+    """
+    Sends heartbeats for the lease while work is running. If the lease is lost,
+    work is cancelled and True is returned.
+    """
+    while not work.done():
+        await asyncio.sleep(LEASE_DURATION.total_seconds() / 3)
+        if not heartbeat_lease(run=LEASE_RUN, range_start=range_start, owner=owner):
+            logger.warning(f"Lost lease for slots starting at {range_start}, stopping work on it")
+            BLOCK_REWARD_LEASES_LOST.inc()
+            work.cancel()
+            return True
+    return False
+
+
+async def _process_lease(
+    range_start: int,
+    range_end: int,
+    owner: str,
+    head_finalized: int,
+    lane: IndexingLane,
+    index_all: bool,
+) -> bool:
+    """
+    Processes the finalized slots of a claimed lease and releases it - completed if the
+    whole range is finalized. Returns False if the lease was lost while working on it.
+    """
+    logger.info(f"Claimed lease for slots {range_start} - {range_end}")
+
+    slots_needed = {s for s in range(max(range_start, START_SLOT), min(range_end, head_finalized) + 1)}
+    if not index_all:
+        with session_scope() as session:
+            slots_needed = slots_needed.difference(
+                s for s, in session.query(BlockReward.slot).filter(BlockReward.slot.between(range_start, range_end)).all()
+            )
+    SLOTS_WITH_MISSING_BLOCK_REWARDS.inc(len(slots_needed))
+
+    # Lanes are shared with the head following task - only add this lease's slots
+    lane.add(slots_needed)
+    work = asyncio.ensure_future(asyncio.gather(*[process_slot(slot, lane) for slot in sorted(slots_needed)]))
+    keep_alive = asyncio.create_task(_keep_lease_alive(range_start=range_start, owner=owner, work=work))
+    try:
+        await work
+    except asyncio.CancelledError:
+        if keep_alive.done() and not keep_alive.cancelled() and keep_alive.result():
+            # Lease was lost, another process will take care of the range
+            return False
+        # The indexer itself is being cancelled
+        raise
+    finally:
+        keep_alive.cancel()
+
+    # The range containing the finalized head is released without being completed,
+    # it is picked up again once more slots are finalized
+    completed = range_end <= head_finalized
+    release_lease(run=LEASE_RUN, range_start=range_start, owner=owner, completed=completed)
+    if completed:
+        BLOCK_REWARD_LEASES_COMPLETED.inc()
+    return True
+
+
+async def follow_head_leased(owner: str, head_finalized: int, leases: asyncio.Task, index_all: bool) -> None:
+    """
+    Head lane for leased indexing - on every newly finalized epoch, claims the leases
+    of the newly finalized slots (including the one handed back with the previous head)
+    for as long as the lease loop is still working.
+    """
+    beacon_node = BeaconNode()
+    while True:
+        # Wait for the next epoch to be finalized
+        await asyncio.wait([leases], timeout=SLOTS_PER_EPOCH * SLOT_TIME)
+        if leases.done():
+            return
+
+        new_head_finalized = await beacon_node.head_finalized()
+        if new_head_finalized <= head_finalized:
+            continue
+        ensure_leases(run=LEASE_RUN, start_slot=head_finalized, end_slot=new_head_finalized, range_size=LEASE_RANGE_SIZE)
+        # Leases held by another process are skipped - that process indexes their new slots
+        handed_back_range_starts = set()
+        while (lease := claim_lease(
+            run=LEASE_RUN,
+            owner=owner,
+            skip_range_starts=handed_back_range_starts,
+            from_slot=head_finalized,
+            to_slot=new_head_finalized,
+        )) is not None:
+            range_start, range_end = lease
+            if await _process_lease(range_start, range_end, owner, new_head_finalized, HEAD_LANE, index_all) \
+                    and range_end > new_head_finalized:
+                handed_back_range_starts.add(range_start)
+        head_finalized = new_head_finalized
+
+
+async def index_block_rewards_leased():
+    """
+    Indexes block rewards for slot ranges claimed from the lease table.
+    Multiple processes can run this concurrently without doing the same work twice.
+    """
+    global HEAD_LANE, BACKFILL_LANE
+    HEAD_LANE = IndexingLane(indexer="block_rewards", name="head", concurrency=HEAD_LANE_CONCURRENCY)
+    BACKFILL_LANE = IndexingLane(indexer="block_rewards", name="backfill", concurrency=BACKFILL_LANE_CONCURRENCY)
+    beacon_node = BeaconNode()
+    owner = lease_owner()
+
+    head_finalized = await beacon_node.head_finalized()
+    ensure_leases(run=LEASE_RUN, start_slot=START_SLOT, end_slot=head_finalized, range_size=LEASE_RANGE_SIZE)
+
+    with session_scope() as session:
+        SLOTS_INDEXING_FAILURES.set(session.query(BlockReward.slot).filter(BlockReward.reward_processed_ok.is_(False)).count())
+    SLOTS_WITH_MISSING_BLOCK_REWARDS.set(0)
+
+    index_all = os.getenv("INDEX_ALL") == "true"
+    retry_lane = asyncio.create_task(asyncio.sleep(0) if index_all else retry_failed_slots())
+    verification_lane = asyncio.create_task(verify_provisional_slots())
+
+    async def _process_leases() -> None:
+        head_lane_start = head_finalized - HEAD_LANE_SLOTS
+        # The lease containing the finalized head is handed back once its finalized slots are processed.
+        # The head following task picks it up again once more slots are finalized.
+        handed_back_range_starts = set()
+        while (lease := claim_lease(
+            run=LEASE_RUN,
+            owner=owner,
+            prefer_from_slot=head_lane_start,
+            skip_range_starts=handed_back_range_starts,
+            # Leases of slots finalized after this run started are left to the head following task
+            to_slot=head_finalized,
+        )) is not None:
+            range_start, range_end = lease
+            # Leases within the head window are claimed first, use the head lane's budget for them
+            lane = HEAD_LANE if range_end >= head_lane_start else BACKFILL_LANE
+            if await _process_lease(range_start, range_end, owner, head_finalized, lane, index_all) \
+                    and range_end > head_finalized:
+                handed_back_range_starts.add(range_start)
+
+    leases = asyncio.create_task(_process_leases())
+    await asyncio.gather(
+        leases,
+        follow_head_leased(owner=owner, head_finalized=head_finalized, leases=leases, index_all=index_all),
+    )
+
+    await retry_lane
+    await verification_lane
 
 
 async def index_block_rewards():
+    if USE_LEASES:
+        return await index_block_rewards_leased()
+
     global ALREADY_INDEXED_SLOTS
-    global SEM
-    SEM = asyncio.Semaphore(10)
+    global HEAD_LANE, BACKFILL_LANE
+    HEAD_LANE = IndexingLane(indexer="block_rewards", name="head", concurrency=HEAD_LANE_CONCURRENCY)
+    BACKFILL_LANE = IndexingLane(indexer="block_rewards", name="backfill", concurrency=BACKFILL_LANE_CONCURRENCY)
     beacon_node = BeaconNode()
 
-    slots_needed = {s for s in range(START_SLOT, await beacon_node.head_finalized())}
+    head_finalized = await beacon_node.head_finalized()
+    slots_needed = {s for s in range(START_SLOT, head_finalized)}
 
     # Remove slots that have already been indexed previously
-    if not os.getenv("INDEX_ALL") == "true":
+    index_all = os.getenv("INDEX_ALL") == "true"
+    if not index_all:
         logger.info("Removing previously indexed slots")
         if len(ALREADY_INDEXED_SLOTS) == 0:
             with session_scope() as session:
@@ -133,7 +578,22 @@ async def index_block_rewards():
     logger.info(f"Indexing block rewards for {len(slots_needed)} slots")
     SLOTS_WITH_MISSING_BLOCK_REWARDS.set(len(slots_needed))
 
-    await asyncio.gather(*[process_slot(slot) for slot in sorted(slots_needed, reverse=False)])
+    head_lane_start = head_finalized - HEAD_LANE_SLOTS
+    HEAD_LANE.reset(s for s in slots_needed if s >= head_lane_start)
+    BACKFILL_LANE.reset(s for s in slots_needed if s < head_lane_start)
+    logger.info(f"Head lane: {len(HEAD_LANE)} slots, backfill lane: {len(BACKFILL_LANE)} slots")
+
+    # gather() returns a future, not a coroutine - it cannot be passed to create_task()
+    backfill = asyncio.ensure_future(
+        asyncio.gather(*[process_slot(slot, BACKFILL_LANE) for slot in BACKFILL_LANE.pending_slots()])
+    )
+    # INDEX_ALL reprocesses every slot anyway, no need for the retry lane
+    await asyncio.gather(
+        follow_head(slots=HEAD_LANE.pending_slots(), head_finalized=head_finalized, backfill=backfill),
+        backfill,
+        *([] if index_all else [retry_failed_slots()]),
+        verify_provisional_slots(),
+    )
 
 
 if __name__ == "__main__":
@@ -152,4 +612,3 @@ if __name__ == "__main__":
             logger.exception(e)
         logger.info("Sleeping for a while now")
         sleep(60)
-
@@ -1,85 +0,0 @@
-SMART_CONTRACTS_MEV_BOTS = (
-    "0x4083d4ef32631ed3394cc1b11efb03ceebcd2f6c",
-    "0x7f9a1c279e8bdbb326e453aebb3abba140458362",
-    "0x0000000000a84d1a9b0063a910315c7ffa9cd248",
-    "0xeeaa83b2d581a3a790774d4dae7bf354fffe3376",
-    "0x5050e08626c499411b5d0e0b5af0e83d3fd82edf",
-    "0xa69babef1ca67a37ffaf7a485dfff3382056e78c",
-    "0x2f1d79860cf6ea3f4b3b734153b52815773c0638",
-    "0x87d9da48db6e1f925cb67d3b7d2a292846c24cf7",
-    "0xf71530c1f043703085b42608ff9dcccc43210a8e",
-    "0x98c3d3183c4b8a650614ad179a1a98be0a8d6b8e",
-    "0x653f7caebf1a4cabdf05f21a8dfd40ef8720712f",  # USDC to Ether swapper? maybe can do more
-    "0x4ddbf6140cedfcb2bd75874f9d82d60715e44086",  # Otherdeed MEV contract?
-    "0x0000000000007f150bd6f54c40a34d7c3d5e9f56",
-    "0xce8d3a87f00dda094ac4322f6a5009d244e16ea1",
-    "0xe8c060f8052e07423f71d445277c61ac5138a2e5",
-    "0x81153f0889ab398c4acb42cb58b565a5392bba95",
-    "0x7efd91c8ca31e7452c5c4de00a8ca1c18910a35f",
-    "0x0c3de458b51a11da7d4616f42f66c861e3859d3e",
-    "0x4a137fd5e7a256ef08a7de531a17d0be0cc7b6b6",
-    "0x80d4230c0a68fc59cb264329d3a717fcaa472a13",
-    "0xf2bdcb1ec8810c35bf9b947371820c199bd775db",
-    "0xede2fafba9e23418485f49f052d0e1d332853e0f",
-    "0xa57bd00134b2850b2a1c55860c9e9ea100fdd6cf",
-    "0x57c1e0c2adf6eecdb135bcf9ec5f23b319be2c94",
-    "0x43cc953fb952d10c8f810267092fb12145d56d40",
-    "0xdac3d422753959e85418ba0662168207f150446f",
-    "0x6c6b87d44d239b3750bf9badce26a9a0a3d2364e",
-    "0x52ca1cb9fc6fbd1cfe5630e74de8738b517a367a",
-    "0x0055ae46f700bcc53b1b00483d64000d47007200",
-    "0x499ac6f42c3d92a381437b63735ef7b547c31022",
-    "0x00000007f7a9056880d057f611e80c419f9b20c8",
-    "0x00000000174b0ba12b89da994258020837ad8818",
-    "0x0000000023191c8382251c0a1ae2f4db983d414c",
-    "0x0352086e5ce73fc2ec4c41fef56361f7def6ea91",
-    "0x000000000035b5e5ad9019092c665357240f594e",
-    "0x0000000000590b74eb97457bf7b3ff6d63c6fde2",
-    "0x7719494eb8f3ca261f5c806d754853dc5ce2edf7",
-    "0xe1f08d771fb7b248b3266b7f79a9eafba3147c2d",
-    "0xd050e0a4838d74769228b49dff97241b4ef3805d",
-    "0x000000591f843e0bcd61a4a7442ee722248d23a5",
-    "0x3c005ba2000f0000ba000d69000ac8ec003800bc",
-    "0x07bae765074790b76c791834ab873be27493c163",
-    "0x0000e0ca771e21bd00057f54a68c30d400000000",
-    "0xbb552d1c03268594b673112009cdd46de0d3a02c",
-    "0x6d660980b00c3405c2dec173cf2259b15572b9b5",
-    "0x903d6f3f62224c0c67c4eafb41cbf515c08eeeb4",
-    "0xd8c07491caa1edf960db3ceff387426d53942ea0",
-    "0x48802e0ce5045beb5f00e19dab7174384c7e5b35",
-    "0x9f6551f1bfc4ee578801af5f7d778949ab0b507a",
-    "0x000000000005af2ddc1a93a03e9b7014064d3b8d",
-    "0x9ea3cda5c2adf0370454b9ee28786a068227b1a4",
-    "0x000000000dfde7deaf24138722987c9a6991e2d4",
-    "0x0c69310e9882cf35ee8fe01e14c609bff6dfb28f",
-    "0xa3274568f95c628d2a2383fac9de1fac220fad48",
-    "0x0000000000a4aa168eba2883c1bf06775996e75f",
-    "0xc1374db508b7a3e0cdf061c8d8c1f7a260f231cd",
-    "0x11ccbbfbc13eeba73b2c62fe92dee097f716897a",
-    "0xb704fea77d9d7cbb3230284d46af9af6b54fe07f",
-    "0x3de8eb830000f1d914294d000051000031a81d00",
-    "0xeb50e91ff0f658c284e329b05248ba256132cd93",
-    "0x5df6434986b285143b060c0e07e1a8d79f5d1b8b",
-    "0x43F2Dfc9F99Eba7a52FDFfE7f3eA2182324E8896",
-    "0xf8b721bFf6Bf7095a0E10791cE8f998baa254Fd0",
-    "0xb4262e8560f874ddb0a508fb5c13b5cdb673acee",
-    "0x5a2227c3Da137CF47A91d0b9dF81570fA33CFBe2",
-    "0xA7ebA8a2156EE2AF1B66012358fB0910463c0da3",
-    "0x30A5180350e0489D5F7d8780Dd551a317864cA99",
-    "0x585C3d4Da9b533C7e3dF8AC7356C882859298cEe",
-    "0x00000000000747D525E898424E8774F7Eb317d00",
-    "0x11546014529F85F2C0873cC8c2d5B45cDF98edD3",
-    "0x9f6b509ea9E47ADF9A9a43C8B9fc55054d26bBCC",
-    "0x9dd29b46f37c0dd325e4580f6ffd498812d998f0",
-    "0x1fb421310ceacd0afb2a429bbb4682e522b38ecb",
-    "0x79ebcc229aca8cb33684376d32502a0c06ebd40b",
-    "0x5c3be76d59d476193e0eb3aa19fcc2ac6a1efe08",
-    "0x000000E1fDDF4fE15DB5f23aE3eE83C6A11E8Dd1",
-    "0x738e79fbc9010521763944ddf13aad7f61502221",
-    "0x63c16ce0911dc9c4950733990778e9a995650c27",
-    "0xAFeDdCB298a1Cb2f93B9D0484a7dc4c43f9fd519",
-    "0x9070dde2b682204a878e5775e48566f876871a83",
-    "0xC46fcd651Bd6AC11255886FEAbDceBd58b870C86",
-)
-# Force lowercase for these
-SMART_CONTRACTS_MEV_BOTS = [b.lower() for b in SMART_CONTRACTS_MEV_BOTS]
@@ -0,0 +1,136 @@
+"""
+Re-classifies block rewards offline, from the inputs recorded by the block rewards indexer
+(BLOCK_REWARDS_RECORD_INPUTS=true), and reports where the result differs from the stored block rewards.
+Useful after adding a builder, a MEV bot or a classification rule.
+
+Usage: python ./src/indexer/block_rewards/reclassify.py START_SLOT END_SLOT [--processes N] [--chunk-size N]
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+from collections import namedtuple
+from typing import Any
+
+from db.db_helpers import session_scope
+from db.tables import BlockReward, BlockRewardInput
+from indexer.block_rewards.block_inputs import BlockInputs, MissingBlockInput, ReplayExecutionNode
+from indexer.block_rewards.block_rewards_mev_simple import get_block_reward_value
+from providers.db_provider import DbProvider
+from shared.setup_logging import setup_logging
+
+logger = logging.getLogger(__name__)
+
+ClassificationDiff = namedtuple("ClassificationDiff", ["slot", "field", "stored", "reclassified"])
+
+# BlockReward column -> BlockRewardValue field
+_COMPARED_FIELDS = (
+    ("priority_fees_wei", "block_priority_tx_fees"),
+    ("mev", "contains_mev"),
+    ("mev_reward_recipient", "mev_recipient"),
+    ("mev_reward_value_wei", "mev_recipient_balance_change"),
+)
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return value.lower()
+    if value is None or isinstance(value, bool):
+        return value
+    return int(value)
+
+
+async def _reclassify_slots(start_slot: int, end_slot: int) -> tuple[int, list[ClassificationDiff]]:
+    db_provider = DbProvider()
+
+    with session_scope() as session:
+        recorded_inputs = {
+            row.slot: row.data for row in session.query(BlockRewardInput).filter(
+                BlockRewardInput.slot.between(start_slot, end_slot)
+            )
+        }
+        stored_block_rewards = {
+            br.slot: br for br in session.query(BlockReward).filter(
+                BlockReward.slot.between(start_slot, end_slot)
+            )
+        }
+        session.expunge_all()
+
+    diffs = []
+    for slot in sorted(recorded_inputs):
+        inputs = BlockInputs.decode(recorded_inputs[slot])
+        replay_node = ReplayExecutionNode(inputs)
+        stored = stored_block_rewards.get(slot)
+        if stored is None:
+            stored_error = "No stored block reward"
+        elif not stored.reward_processed_ok:
+            stored_error = stored.reward_processing_error
+        else:
+            stored_error = None
+
+        try:
+            block_reward_value = await get_block_reward_value(
+                slot_proposer_data=inputs.slot_proposer_data,
+                execution_node=replay_node,
+                db_provider=db_provider,
+                relay_payload_source=replay_node.get_relay_payload,
+            )
+        except MissingBlockInput as e:
+            diffs.append(ClassificationDiff(slot, "input", None, str(e)))
+            continue
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if stored_error is None:
+                diffs.append(ClassificationDiff(slot, "error", None, error))
+            continue
+
+        if stored_error is not None:
+            diffs.append(ClassificationDiff(slot, "error", stored_error, None))
+            continue
+
+        for column, field in _COMPARED_FIELDS:
+            stored_value = _normalize(getattr(stored, column))
+            reclassified_value = _normalize(getattr(block_reward_value, field))
+            if stored_value != reclassified_value:
+                diffs.append(ClassificationDiff(slot, column, stored_value, reclassified_value))
+
+    return len(recorded_inputs), diffs
+
+
+def _reclassify_range(slot_range: tuple[int, int]) -> tuple[int, list[ClassificationDiff]]:
+    return asyncio.run(_reclassify_slots(*slot_range))
+
+
+def reclassify(start_slot: int, end_slot: int, processes: int, chunk_size: int) -> list[ClassificationDiff]:
+    slot_ranges = [
+        (range_start, min(range_start + chunk_size - 1, end_slot))
+        for range_start in range(start_slot, end_slot + 1, chunk_size)
+    ]
+
+    all_diffs = []
+    slots_reclassified = 0
+    # Spawn fresh processes - they each need their own DB connections
+    with multiprocessing.get_context("spawn").Pool(processes=processes) as pool:
+        for slot_count, diffs in pool.imap(_reclassify_range, slot_ranges):
+            slots_reclassified += slot_count
+            for diff in diffs:
+                print(f"{diff.slot}\t{diff.field}\t{diff.stored}\t{diff.reclassified}", flush=True)
+            all_diffs.extend(diffs)
+
+    logger.info(f"Re-classified {slots_reclassified} slots,"
+                f" {len({diff.slot for diff in all_diffs})} differ from the stored block rewards")
+    return all_diffs
+
+
+if __name__ == "__main__":
+    setup_logging()
+
+    parser = argparse.ArgumentParser(description="Re-classify block rewards from recorded inputs")
+    parser.add_argument("start_slot", type=int)
+    parser.add_argument("end_slot", type=int)
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    reclassify(args.start_slot, args.end_slot, processes=args.processes, chunk_size=args.chunk_size)
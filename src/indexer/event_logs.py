@@ -0,0 +1,76 @@
+import asyncio
+import logging
+
+from prometheus_client import start_http_server, Gauge
+
+from db.db_helpers import session_scope
+from providers.event_log_store import SUBSCRIPTIONS, get_next_block_number, store_logs
+from providers.execution_node import ExecutionNode
+from shared.setup_logging import setup_logging
+
+logger = logging.getLogger(__name__)
+
+# Block range whose logs are fetched (in MAX_BLOCK_RANGE-sized requests) and stored in a single transaction
+FILL_RANGE_SIZE = 10_000
+
+EVENT_LOG_STORE_LAST_BLOCK_NUMBER = Gauge(
+    "event_log_store_last_block_number",
+    "Last block number whose logs are in the event log store, per subscription",
+    labelnames=("subscription",),
+)
+
+
+async def index_event_logs():
+    execution_node = ExecutionNode()
+
+    # Logs of finalized blocks are never removed by a reorg
+    to_block_number = await execution_node.get_finalized_block_number()
+
+    with session_scope() as session:
+        next_block_numbers = {s: get_next_block_number(session, s) for s in SUBSCRIPTIONS}
+
+        while True:
+            from_block_number = min(next_block_numbers.values())
+            if from_block_number > to_block_number:
+                break
+
+            # Subscriptions that are at the same block are filled using the same requests.
+            # Subscriptions that are behind (e.g. newly added ones) catch up with the rest first.
+            subscriptions = [s for s, n in next_block_numbers.items() if n == from_block_number]
+            fill_to_block_number = min(
+                from_block_number + FILL_RANGE_SIZE - 1,
+                to_block_number,
+                *(n - 1 for n in next_block_numbers.values() if n > from_block_number),
+            )
+            logger.info(f"Storing logs of {[s.name for s in subscriptions]} for blocks {from_block_number}-{fill_to_block_number}")
+
+            logs = await execution_node.get_logs(
+                address=None,
+                block_number_range=(from_block_number, fill_to_block_number),
+                topics=[[s.topic0 for s in subscriptions]],
+                use_infura=True,
+            )
+            store_logs(session, subscriptions, logs, last_block_number=fill_to_block_number)
+            session.commit()
+
+            for s in subscriptions:
+                next_block_numbers[s] = fill_to_block_number + 1
+                EVENT_LOG_STORE_LAST_BLOCK_NUMBER.labels(s.name).set(fill_to_block_number)
+
+
+if __name__ == "__main__":
+    # Start metrics server
+    start_http_server(8000)
+
+    setup_logging()
+
+    from time import sleep
+
+    while True:
+        try:
+            asyncio.run(index_event_logs())
+        except Exception as e:
+            logger.error(f"Error occurred while indexing event logs: {e}")
+            logger.exception(e)
+        # A new block is finalized every 12 seconds
+        sleep(12)
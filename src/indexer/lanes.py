@@ -0,0 +1,82 @@
+"""
+Scheduling lanes for the slot-based indexers.
+
+Indexers split the slots they need to process into a head lane (recently
+finalized slots) and a backfill lane (everything older). Each lane has its
+own concurrency budget, so that newly finalized slots do not have to wait
+behind the whole backlog, and reports its own lag.
+"""
+import asyncio
+import datetime
+import heapq
+from typing import Iterable
+
+import pytz
+from prometheus_client import Gauge
+
+from providers.beacon_node import BeaconNode
+
+INDEXER_LANE_PENDING_SLOTS = Gauge(
+    "indexer_lane_pending_slots",
+    "Slots that still need to be processed in an indexer lane",
+    labelnames=("indexer", "lane"),
+)
+INDEXER_LANE_LAG_SECONDS = Gauge(
+    "indexer_lane_lag_seconds",
+    "Age of the oldest slot that still needs to be processed in an indexer lane",
+    labelnames=("indexer", "lane"),
+)
+
+
+class IndexingLane:
+    def __init__(self, indexer: str, name: str, concurrency: int = 1) -> None:
+        self.indexer = indexer
+        self.name = name
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+        self._pending: set[int] = set()
+        # Min-heap of pending slots, entries for done slots are removed lazily
+        self._heap: list[int] = []
+
+    def reset(self, slots: Iterable[int]) -> None:
+        self._pending = set(slots)
+        self._heap = list(self._pending)
+        heapq.heapify(self._heap)
+        self._update_metrics()
+
+    def add(self, slots: Iterable[int]) -> None:
+        for slot in slots:
+            if slot not in self._pending:
+                self._pending.add(slot)
+                heapq.heappush(self._heap, slot)
+        self._update_metrics()
+
+    def done(self, slot: int) -> None:
+        self._pending.discard(slot)
+        self._update_metrics()
+
+    def __contains__(self, slot: int) -> bool:
+        return slot in self._pending
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def pending_slots(self) -> list[int]:
+        return sorted(self._pending)
+
+    def oldest_pending_slot(self) -> int | None:
+        while self._heap and self._heap[0] not in self._pending:
+            heapq.heappop(self._heap)
+        return self._heap[0] if self._heap else None
+
+    def _update_metrics(self) -> None:
+        INDEXER_LANE_PENDING_SLOTS.labels(self.indexer, self.name).set(len(self._pending))
+
+        oldest = self.oldest_pending_slot()
+        if oldest is None:
+            lag = 0
+        else:
+            lag = max(0.0, (
+                datetime.datetime.now(tz=pytz.UTC) - BeaconNode.datetime_for_slot(oldest, pytz.UTC)
+            ).total_seconds())
+        INDEXER_LANE_LAG_SECONDS.labels(self.indexer, self.name).set(lag)
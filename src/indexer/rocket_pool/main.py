@@ -1,16 +1,25 @@
 import asyncio
+import datetime
 import logging
 from time import sleep
 
+import pytz
 from prometheus_client import Counter, Gauge, start_http_server
 
 from db.db_helpers import session_scope
 from db.tables import RocketPoolRewardPeriod, RocketPoolReward, RocketPoolNode, \
-    RocketPoolMinipool, RocketPoolBondReduction
+    RocketPoolMinipool, RocketPoolBondReduction, RocketPoolContractAddress, RocketPoolUnresolvedMinipool, \
+    IndexerCursor
+from indexer.rocket_pool.shares import index_proposal_shares, index_withdrawal_shares, \
+    MAX_CONCURRENT_SHARE_COMPUTATIONS
+from providers.beacon_node import BeaconNode
 from providers.execution_node import ExecutionNode
-from providers.rocket_pool import RocketPoolDataProvider
+from providers.rocket_pool import CONTRACT_STORAGE_KEYS, ContractAddressHistory, NewMinipool, \
+    RocketPoolDataProvider
+from providers.rocket_pool_rewards_trees import iter_rewards_tree
 from shared.setup_logging import setup_logging
-from sqlalchemy import func
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 
@@ -34,27 +43,242 @@ ROCKET_POOL_BOND_REDUCTIONS = Gauge(
     "rocket_pool_bond_reductions",
     "Number of indexed RP bond reductions",
 )
+ROCKET_POOL_UNRESOLVED_MINIPOOLS = Gauge(
+    "rocket_pool_unresolved_minipools",
+    "Number of RP minipools that could not be indexed yet",
+)
+ROCKET_POOL_UNRESOLVED_MINIPOOLS_RETRIES_EXHAUSTED = Gauge(
+    "rocket_pool_unresolved_minipools_retries_exhausted",
+    "Number of RP minipools that could not be indexed within MAX_MINIPOOL_ATTEMPTS attempts",
+)
 ROCKET_POOL_LAST_BLOCK_NUMBER_INDEXED = Gauge(
     "rocket_pool_last_block_number_indexed",
     "Number of last block indexed by the RP indexer",
 )
 
 
-LAST_BLOCK_NUMBER_INDEXED = 24_290_000
+# Event streams are indexed from here on if there is no cursor for them yet
+INITIAL_BLOCK_NUMBER = 24_290_000
+REWARDS_INSERT_BATCH_SIZE = 5_000
+# Unresolved minipools are retried in every run until this many attempts were made
+MAX_MINIPOOL_ATTEMPTS = 10
 
+CURSOR_MINIPOOLS = "rocket_pool_minipool_created"
+CURSOR_BOND_REDUCTIONS = "rocket_pool_bond_reduced"
+CURSOR_REWARD_SNAPSHOTS = "rocket_pool_reward_snapshot"
+CURSOR_CONTRACT_ADDRESS_PREFIX = "rocket_pool_contract_address_"
+
+
+def _get_next_block_number(session: Session, stream: str) -> int:
+    cursor = session.get(IndexerCursor, stream)
+    if cursor is None:
+        return INITIAL_BLOCK_NUMBER
+    return cursor.last_block_number + 1
+
+
+def _advance_cursor(session: Session, stream: str, last_block_number: int) -> None:
+    # Not committed here - the cursor is committed together with the indexed data
+    session.merge(IndexerCursor(stream=stream, last_block_number=last_block_number))
+
+
+async def _index_contract_addresses(
+    session: Session,
+    rocket_pool_data: RocketPoolDataProvider,
+    to_block_number: int,
+) -> dict[str, ContractAddressHistory]:
+    contract_addresses = {}
+    for contract_name in CONTRACT_STORAGE_KEYS:
+        stream = f"{CURSOR_CONTRACT_ADDRESS_PREFIX}{contract_name}"
+        cursor = session.get(IndexerCursor, stream)
+        known_history = None
+        if cursor is not None:
+            known_history = ContractAddressHistory(
+                changes=[
+                    (row.start_block_number, row.address)
+                    for row in session.query(RocketPoolContractAddress).filter(
+                        RocketPoolContractAddress.contract_name == contract_name
+                    )
+                ],
+                checked_up_to_block=cursor.last_block_number,
+            )
+
+        history = await rocket_pool_data.get_contract_address_history(
+            contract_name, to_block_number, known_history=known_history,
+        )
+        for start_block_number, address in history.changes:
+            session.merge(RocketPoolContractAddress(
+                contract_name=contract_name,
+                start_block_number=start_block_number,
+                address=address,
+            ))
+        _advance_cursor(session, stream, to_block_number)
+        session.commit()
+        contract_addresses[contract_name] = history
+    return contract_addresses
 
-async def run():
-    global LAST_BLOCK_NUMBER_INDEXED
 
+async def _index_minipools_and_bond_reductions(
+    session: Session,
+    rocket_pool_data: RocketPoolDataProvider,
+    known_node_addresses: set[str],
+    to_block_number: int,
+) -> None:
+    # Minipools
+    # Skip indexing minipools we already have indexed
+    indexed_mp_addresses = {a for a, in session.query(RocketPoolMinipool.minipool_address)}
+    ROCKET_POOL_MINIPOOLS.set(len(indexed_mp_addresses))
+
+    # Minipools that could not be indexed in previous runs
+    unresolved_attempts = {}
+    retried_minipools = []
+    for row in session.query(RocketPoolUnresolvedMinipool):
+        unresolved_attempts[row.minipool_address] = row.attempts
+        if row.attempts < MAX_MINIPOOL_ATTEMPTS:
+            retried_minipools.append(NewMinipool(
+                node_address=row.node_address,
+                minipool_address=row.minipool_address,
+                minipool_manager_address=row.minipool_manager_address,
+                creation_block_number=row.creation_block_number,
+            ))
+
+    logger.info("Indexing minipools")
+    new_minipools = await rocket_pool_data.get_new_minipools(
+        known_minipool_addresses=indexed_mp_addresses | unresolved_attempts.keys(),
+        from_block_number=_get_next_block_number(session, CURSOR_MINIPOOLS),
+        to_block_number=to_block_number,
+    )
+    minipools_per_node, unresolved_minipools = await rocket_pool_data.get_minipools(
+        known_node_addresses=known_node_addresses,
+        new_minipools=retried_minipools + new_minipools,
+    )
+    for node_address, minipool_list in minipools_per_node.items():
+        for minipool_address, pubkey, initial_bond_value, initial_fee_value in minipool_list:
+            indexed_mp_addresses.add(minipool_address)
+            session.add(
+                RocketPoolMinipool(
+                    minipool_address=minipool_address,
+                    validator_pubkey=pubkey,
+                    initial_bond_value=initial_bond_value,
+                    initial_fee_value=initial_fee_value,
+                    node_address=node_address,
+                )
+            )
+    for unresolved_minipool in unresolved_minipools:
+        attempts = unresolved_attempts.get(unresolved_minipool.minipool_address, 0) + 1
+        unresolved_attempts[unresolved_minipool.minipool_address] = attempts
+        if attempts == MAX_MINIPOOL_ATTEMPTS:
+            logger.warning(f"Giving up on minipool {unresolved_minipool.minipool_address}"
+                           f" after {attempts} attempts")
+        session.merge(RocketPoolUnresolvedMinipool(**unresolved_minipool._asdict(), attempts=attempts))
+    resolved_minipools = [m for m in retried_minipools if m.minipool_address in indexed_mp_addresses]
+    for resolved_minipool in resolved_minipools:
+        del unresolved_attempts[resolved_minipool.minipool_address]
+        session.query(RocketPoolUnresolvedMinipool).filter(
+            RocketPoolUnresolvedMinipool.minipool_address == resolved_minipool.minipool_address
+        ).delete()
+    # Minipools that could not be indexed are retried from RocketPoolUnresolvedMinipool,
+    # so the cursor never waits for them
+    _advance_cursor(session, CURSOR_MINIPOOLS, to_block_number)
+    session.commit()
+    ROCKET_POOL_MINIPOOLS.set(len(indexed_mp_addresses))
+    ROCKET_POOL_UNRESOLVED_MINIPOOLS.set(len(unresolved_attempts))
+    ROCKET_POOL_UNRESOLVED_MINIPOOLS_RETRIES_EXHAUSTED.set(
+        sum(1 for attempts in unresolved_attempts.values() if attempts >= MAX_MINIPOOL_ATTEMPTS)
+    )
+
+    # Index bond reduction events for every minipool. Bond reductions of minipools that are not
+    # indexed by then are skipped - for minipools that were unresolved until now they are
+    # fetched separately, from their creation up to where bond reductions are indexed already.
+    logger.info("Indexing bond reductions")
+    from_block_number = _get_next_block_number(session, CURSOR_BOND_REDUCTIONS)
+    bond_reductions = []
+    for resolved_minipool in resolved_minipools:
+        if resolved_minipool.creation_block_number >= from_block_number:
+            continue
+        bond_reductions.extend(await rocket_pool_data.get_bond_reductions(
+            from_block_number=resolved_minipool.creation_block_number,
+            to_block_number=from_block_number - 1,
+            minipool_address=resolved_minipool.minipool_address,
+        ))
+    if from_block_number <= to_block_number:
+        bond_reductions.extend(await rocket_pool_data.get_bond_reductions(
+            from_block_number=from_block_number,
+            to_block_number=to_block_number,
+        ))
+    for minipool_address, br_event_datetime, new_bond_amount, new_fee in bond_reductions:
+        if minipool_address not in indexed_mp_addresses:
+            continue
+        session.merge(
+            RocketPoolBondReduction(
+                minipool_address=minipool_address,
+                timestamp=br_event_datetime,
+                new_bond_amount=new_bond_amount,
+                new_fee=new_fee
+            )
+        )
+    _advance_cursor(session, CURSOR_BOND_REDUCTIONS, max(to_block_number, from_block_number - 1))
+    session.commit()
+    ROCKET_POOL_BOND_REDUCTIONS.set(session.query(RocketPoolBondReduction).count())
+
+
+def _index_reward_period(session: Session, reward_period_index: int, tree_path: str) -> None:
+    # endTime is only known once it was read - until then (all in the same transaction)
+    # the period has a placeholder end time
+    reward_period = RocketPoolRewardPeriod(
+        reward_period_index=reward_period_index,
+        reward_period_end_time=datetime.datetime.fromtimestamp(0, tz=pytz.UTC),
+    )
+    session.add(reward_period)
+    session.flush()
+
+    period_end_time = None
+    rewards = []
+    rewards_count = 0
+    with open(tree_path) as f:
+        for key, value in iter_rewards_tree(f):
+            if key == ("endTime",):
+                period_end_time = value
+            elif key[0] == "nodeRewards":
+                rewards.append({
+                    "reward_period_index": reward_period_index,
+                    "node_address": key[1],
+                    "reward_collateral_rpl": int(value["collateralRpl"]),
+                    "reward_smoothing_pool_wei": int(value["smoothingPoolEth"]),
+                })
+                if len(rewards) == REWARDS_INSERT_BATCH_SIZE:
+                    session.execute(insert(RocketPoolReward), rewards)
+                    rewards_count += len(rewards)
+                    rewards = []
+    if rewards:
+        session.execute(insert(RocketPoolReward), rewards)
+        rewards_count += len(rewards)
+
+    if period_end_time is None:
+        raise ValueError(f"No endTime in rewards tree for reward period {reward_period_index}")
+    reward_period.reward_period_end_time = period_end_time
+    session.flush()
+    logger.info(f"Indexed reward period {reward_period_index} - {rewards_count} node rewards")
+
+
+async def run():
     execution_node = ExecutionNode()
+    beacon_node = BeaconNode()
     rocket_pool_data = RocketPoolDataProvider(execution_node=execution_node)
 
+    # Node operator shares are computed up to here - bond reductions until then are indexed below
+    max_share_slot = BeaconNode.slot_for_datetime(datetime.datetime.now(tz=pytz.UTC))
     current_exec_block_number = await execution_node.get_block_number()
 
     with session_scope() as session:
+        logger.info("Indexing contract addresses")
+        # Upgradeable contract addresses by block range, used instead of RocketStorage lookups
+        rocket_pool_data.contract_addresses = await _index_contract_addresses(
+            session, rocket_pool_data, current_exec_block_number,
+        )
+
         logger.info("Indexing nodes")
         # Nodes and their respective fee distributor contract addresses
-        known_node_addresses = [a for a, in session.query(RocketPoolNode.node_address).all()]
+        known_node_addresses = {a for a, in session.query(RocketPoolNode.node_address)}
         rp_nodes = await rocket_pool_data.get_nodes(known_node_addresses=known_node_addresses, block_number=current_exec_block_number)
         for node_address, fee_distributor in rp_nodes:
             if node_address in known_node_addresses:
@@ -65,55 +289,13 @@ async def run():
                     fee_distributor=fee_distributor,
                 )
             )
-            known_node_addresses.append(node_address)
+            known_node_addresses.add(node_address)
         session.commit()
         ROCKET_POOL_NODES.set(len(known_node_addresses))
 
-        # Minipools
-        # Skip indexing minipools we already have indexed
-        indexed_mp_addresses = [a for a, in session.query(RocketPoolMinipool.minipool_address).all()]
-        ROCKET_POOL_MINIPOOLS.set(len(indexed_mp_addresses))
-
-        logger.info("Indexing minipools")
-        for node_address, minipool_list in (await rocket_pool_data.get_minipools(
-            known_node_addresses=known_node_addresses,
-            known_minipool_addresses=indexed_mp_addresses,
-            from_block_number=LAST_BLOCK_NUMBER_INDEXED,
-            to_block_number=current_exec_block_number,
-        )).items():
-            for minipool_address, pubkey, initial_bond_value, initial_fee_value in minipool_list:
-                indexed_mp_addresses.append(minipool_address)
-                session.add(
-                    RocketPoolMinipool(
-                        minipool_address=minipool_address,
-                        validator_pubkey=pubkey,
-                        initial_bond_value=initial_bond_value,
-                        initial_fee_value=initial_fee_value,
-                        node_address=node_address,
-                    )
-                )
-        session.commit()
-
-        # Index bond reduction events for every minipool
-        logger.info("Indexing bond reductions")
-        bond_reductions = await rocket_pool_data.get_bond_reductions(
-            from_block_number=LAST_BLOCK_NUMBER_INDEXED,
-            to_block_number=current_exec_block_number
+        await _index_minipools_and_bond_reductions(
+            session, rocket_pool_data, known_node_addresses, current_exec_block_number,
         )
-        for minipool_address, br_event_datetime, new_bond_amount, new_fee in bond_reductions:
-            # TODO tmp remove this check
-            if minipool_address not in indexed_mp_addresses:
-                continue
-            session.merge(
-                RocketPoolBondReduction(
-                    minipool_address=minipool_address,
-                    timestamp=br_event_datetime,
-                    new_bond_amount=new_bond_amount,
-                    new_fee=new_fee
-                )
-            )
-        session.commit()
-        ROCKET_POOL_BOND_REDUCTIONS.set(session.query(RocketPoolBondReduction).count())
 
         # Rewards trees
         last_indexed_reward_period, = session.query(func.max(RocketPoolRewardPeriod.reward_period_index)).one_or_none()
@@ -123,25 +305,30 @@ async def run():
         logger.info("Indexing reward snapshots")
         new_reward_trees = await rocket_pool_data.get_reward_snapshots(
             start_at_period=last_indexed_reward_period+1 if last_indexed_reward_period else 0,
-            from_block_number=LAST_BLOCK_NUMBER_INDEXED
+            from_block_number=_get_next_block_number(session, CURSOR_REWARD_SNAPSHOTS),
+            to_block_number=current_exec_block_number,
         )
-        for reward_period_index, node_rewards, period_end_time in new_reward_trees:
-            session.add(RocketPoolRewardPeriod(
-                reward_period_index=reward_period_index,
-                reward_period_end_time=period_end_time,
-                rewards=[
-                    RocketPoolReward(
-                        node_address=node_address,
-                        reward_collateral_rpl=node_rewards_data["collateralRpl"],
-                        reward_smoothing_pool_wei=node_rewards_data["smoothingPoolEth"],
-                    )
-                    for node_address, node_rewards_data in node_rewards.items()
-                ]
-            ))
+        for reward_period_index, tree_path in new_reward_trees:
+            _index_reward_period(session, reward_period_index, tree_path)
+            session.commit()
+            ROCKET_POOL_LAST_REWARD_PERIOD_INDEXED.set(reward_period_index)
+        # Periods that were already indexed are skipped if this is interrupted before the cursor is advanced
+        _advance_cursor(session, CURSOR_REWARD_SNAPSHOTS, current_exec_block_number)
         session.commit()
 
-    LAST_BLOCK_NUMBER_INDEXED = current_exec_block_number
-    ROCKET_POOL_LAST_BLOCK_NUMBER_INDEXED.set(LAST_BLOCK_NUMBER_INDEXED)
+    # Node operator shares of withdrawals and proposals - independent, so both are indexed at the
+    # same time (using a session each), sharing a budget for the archive node lookups they make
+    logger.info("Indexing node operator shares")
+    share_computation_budget = asyncio.Semaphore(MAX_CONCURRENT_SHARE_COMPUTATIONS)
+    with session_scope() as withdrawal_shares_session, session_scope() as proposal_shares_session:
+        await asyncio.gather(
+            index_withdrawal_shares(withdrawal_shares_session, rocket_pool_data, beacon_node,
+                                    max_slot=max_share_slot, budget=share_computation_budget),
+            index_proposal_shares(proposal_shares_session, rocket_pool_data, beacon_node,
+                                  max_slot=max_share_slot, budget=share_computation_budget),
+        )
+
+    ROCKET_POOL_LAST_BLOCK_NUMBER_INDEXED.set(current_exec_block_number)
 
 
 if __name__ == '__main__':
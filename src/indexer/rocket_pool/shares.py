@@ -0,0 +1,430 @@
+"""
+Node operator shares of Rocket Pool minipool withdrawals and of block rewards paid to node fee distributors.
+
+These need archive node calls (minipool capital at the time of full withdrawals, fee distributor
+node shares around proposals), so the Rocket Pool indexer computes them once and stores them -
+the Rocket Pool rewards endpoint only reads the stored shares.
+"""
+import asyncio
+import datetime
+import logging
+import os
+from decimal import Decimal
+from math import floor
+from typing import Awaitable, TypeVar
+
+import pytz
+from prometheus_client import Counter
+from sqlalchemy import case, func, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, selectinload
+
+from db.tables import BlockReward, RocketPoolMinipool, RocketPoolNode, RocketPoolProposalShare, \
+    RocketPoolWithdrawalShare, Validator, Withdrawal
+from providers.beacon_node import BeaconNode
+from providers.rocket_pool import RocketPoolDataProvider
+
+logger = logging.getLogger(__name__)
+
+ROCKET_POOL_SHARES_INDEXED = Counter(
+    "rocket_pool_shares_indexed",
+    "Node operator shares of RP withdrawals and proposals computed by the RP indexer",
+    labelnames=("kind", "outcome"),
+)
+
+_FULL_MINIPOOL_BOND = 32 * Decimal(1e18)
+# Shares to look up per query / store per transaction
+_SHARES_BATCH_SIZE = 1_000
+# Shares computed concurrently per batch - their contract reads end up in the same Multicall3 calls
+_CONCURRENT_SHARE_COMPUTATIONS = 100
+# Share computations in flight across all batches (withdrawal and proposal shares are indexed concurrently)
+MAX_CONCURRENT_SHARE_COMPUTATIONS = int(os.getenv("ROCKET_POOL_MAX_CONCURRENT_SHARE_COMPUTATIONS") or 150)
+# Failed share computations are retried with exponential backoff, up to this many attempts
+_RETRY_MAX_ATTEMPTS = 8
+_RETRY_BASE_DELAY = datetime.timedelta(minutes=10)
+
+T = TypeVar("T")
+
+
+class NodeOperatorShareUnavailable(ValueError):
+    pass
+
+
+async def _get_withdrawal_node_operator_share_for_bond_fee(
+    withdrawal: Withdrawal,
+    bond: Decimal,
+    fee: Decimal,
+    minipool_address: str,
+    rocket_pool_data: RocketPoolDataProvider,
+    beacon_node: BeaconNode,
+) -> int:
+    if withdrawal.amount_gwei > 8 * Decimal(1e9):
+        # Consider this a full withdrawal
+        # TODO
+        # We need to take into account "penalties",
+        # see _distributeBalance
+
+        # uint256 nodeAmount = 0;
+        #         uint256 userCapital = getUserDepositBalance();
+        #         // Check if node operator was slashed
+        #         if (_balance < userCapital) {
+        #             // Only slash on first call to distribute
+        #             if (withdrawalBlock == 0) {
+        #                 // Record shortfall for slashing
+        #                 nodeSlashBalance = userCapital.sub(_balance);
+        #             }
+
+        block_number = (await beacon_node.get_slot_proposer_data(withdrawal.slot)).block_number
+        # Both reads end up in the same Multicall3 call
+        user_capital, node_capital = await asyncio.gather(
+            rocket_pool_data.get_minipool_user_deposit_balance(
+                minipool_address=minipool_address,
+                block_number=block_number
+            ),
+            rocket_pool_data.get_minipool_node_deposit_balance(
+                minipool_address=minipool_address,
+                block_number=block_number
+            ),
+        )
+        capital = user_capital + node_capital
+
+        # Work with wei from here
+        withdrawal_amount_wei = withdrawal.amount_gwei * Decimal(1e9)
+
+        # First check - if the withdrawal amount is less than the "user" part
+        # the node operator gets nothing (likely due to being slashed)
+        # -> they will actually lose RPL from their node's RPL collateral
+        # -> that will not be part of the output, not supported for now
+        if withdrawal_amount_wei < user_capital:
+            # TODO not supported yet
+            raise NodeOperatorShareUnavailable("Full withdrawal, balance < user_capital!")
+
+        # nodeAmount = _calculateNodeShare(_balance);
+        #     function _calculateNodeShare(uint256 _balance) internal view returns (uint256) {
+        #         uint256 userCapital = getUserDepositBalance();
+        #         uint256 nodeCapital = nodeDepositBalance;
+        #         uint256 nodeShare = 0;
+        #         // Calculate the total capital (node + user)
+        #         uint256 capital = userCapital.add(nodeCapital);
+        #         if (_balance > capital) {
+        #             // Total rewards to share
+        #             uint256 rewards = _balance.sub(capital);
+        #             nodeShare = nodeCapital.add(calculateNodeRewards(nodeCapital, userCapital, rewards));
+        #         } else if (_balance > userCapital) {
+        #             nodeShare = _balance.sub(userCapital);
+        #         }
+        #         // Check if node has an ETH penalty
+        #         uint256 penaltyRate = RocketMinipoolPenaltyInterface(rocketMinipoolPenalty).getPenaltyRate(address(this));
+        #         if (penaltyRate > 0) {
+        #             uint256 penaltyAmount = nodeShare.mul(penaltyRate).div(calcBase);
+        #             if (penaltyAmount > nodeShare) {
+        #                 penaltyAmount = nodeShare;
+        #             }
+        #             nodeShare = nodeShare.sub(penaltyAmount);
+        #         }
+        #         return nodeShare;
+
+        if withdrawal_amount_wei >= capital:
+            # Total rewards to share
+            total_reward_wei = withdrawal_amount_wei - capital
+            # --> calculate node's share by current bond, fee... per usual
+            return floor(total_reward_wei * (
+                # NO bond part
+                (bond / _FULL_MINIPOOL_BOND)
+                # User bond part - commission
+                + ((_FULL_MINIPOOL_BOND - bond) / _FULL_MINIPOOL_BOND) * (fee / Decimal(1e18))
+            ))
+        # TODO rest of branches?
+        # TODO handle ETH penalties!
+        raise NodeOperatorShareUnavailable(
+            f"Full withdrawal detected where withdrawal value ({withdrawal_amount_wei})"
+            f" is less than minipool capital ({capital}) for minipool {minipool_address}"
+            f" - unable to determine node operator share"
+        )
+
+    return floor(Decimal(1e9) * withdrawal.amount_gwei * (
+        # NO bond part
+        (bond / _FULL_MINIPOOL_BOND)
+        # User bond part - commission
+        + ((_FULL_MINIPOOL_BOND - bond) / _FULL_MINIPOOL_BOND) * (fee / Decimal(1e18))
+    ))
+
+
+async def get_withdrawal_node_operator_share(
+    withdrawal: Withdrawal,
+    minipool: RocketPoolMinipool,
+    rocket_pool_data: RocketPoolDataProvider,
+    beacon_node: BeaconNode,
+) -> int:
+    # Figure out correct bond & fee for this withdrawal
+    withdrawal_dt = BeaconNode.datetime_for_slot(
+        slot=withdrawal.slot,
+        timezone=pytz.UTC
+    )
+
+    # Go over bond reductions in reverse order - most recent to least recent
+    # If the withdrawal occurred after a given bond reduction, its value
+    # will be split among the node and user based on the bond/fee at
+    # that time
+    for bond_reduction in sorted(minipool.bond_reductions,
+                                 key=lambda x: x.timestamp, reverse=True):
+        if withdrawal_dt > bond_reduction.timestamp:
+            return await _get_withdrawal_node_operator_share_for_bond_fee(
+                withdrawal=withdrawal,
+                bond=bond_reduction.new_bond_amount,
+                fee=bond_reduction.new_fee,
+                minipool_address=minipool.minipool_address,
+                rocket_pool_data=rocket_pool_data,
+                beacon_node=beacon_node,
+            )
+
+    # The withdrawal occurred before any bond reductions
+    # => apply minipool's initial bond & fee
+    return await _get_withdrawal_node_operator_share_for_bond_fee(
+        withdrawal=withdrawal,
+        bond=minipool.initial_bond_value,
+        fee=minipool.initial_fee_value,
+        minipool_address=minipool.minipool_address,
+        rocket_pool_data=rocket_pool_data,
+        beacon_node=beacon_node,
+    )
+
+
+async def get_proposal_node_operator_share(
+    node_address: str,
+    fee_distributor: str,
+    slot: int,
+    beacon_node: BeaconNode,
+    rocket_pool_data: RocketPoolDataProvider,
+    block_number: int | None = None,
+) -> int:
+    logger.info(f"Getting reward share for proposal in slot {slot}, FD {fee_distributor}...")
+
+    if block_number is None:
+        block_number = (await beacon_node.get_slot_proposer_data(slot)).block_number
+
+    try:
+        node_share_before_proposal = await rocket_pool_data.get_node_fee_distributor_share(
+            node_fee_distributor_address=fee_distributor,
+            block_number=block_number-1,
+        )
+        node_share_after_proposal = await rocket_pool_data.get_node_fee_distributor_share(
+            node_fee_distributor_address=fee_distributor,
+            block_number=block_number,
+        )
+        # TODO check if units correct here
+        return node_share_after_proposal - node_share_before_proposal
+    except ValueError:
+        # getNodeShare only available in post-Atlas distributor delegate...
+        # We have to calculate the shares manually here
+        avg_node_fee = await rocket_pool_data.get_node_average_fee(
+            node_address=node_address,
+            block_number=block_number,
+        )
+        # assume the collateralization ratio is half in this case
+        # see e.g. https://github.com/rocket-pool/rocketpool/commit/f50109be11d68043446528c25c015a060475e6ca#diff-67701dbf2e859026c6c26c91b5e6e87f63a74de84093b0b98e08e92ade041cc5
+        # "// Fallback for backwards compatibility before ETH matched was recorded (all minipools matched 16 ETH from protocol)"
+        # "// All legacy minipools had a 1:1 ratio"
+        # Verify if this value is ok (in terms of order of magnitude too)
+        collateralization_ratio = 2 * Decimal(1e18)
+
+        fee_distributor_balance_change = await rocket_pool_data.execution_node.get_balance(
+            address=fee_distributor, block_number=block_number,
+            use_infura=True) - await rocket_pool_data.execution_node.get_balance(
+            address=fee_distributor, block_number=block_number - 1, use_infura=True)
+        # Note - no need to adjust this balance change for withdrawal operations since all RP
+        # withdrawal operations go to the minipool smart contracts
+        node_balance_change = fee_distributor_balance_change * Decimal(1e18) / collateralization_ratio
+        user_balance_change = fee_distributor_balance_change - node_balance_change
+        node_share = node_balance_change + user_balance_change * avg_node_fee / Decimal(1e18)
+
+        # TODO check if units correct here
+        # Round down like SafeMath does, which is used in RP smart contracts
+        return floor(node_share)
+
+
+async def _gather_within_budget(awaitables: list[Awaitable[T]], budget: asyncio.Semaphore) -> list[T]:
+    """
+    Like asyncio.gather, with at most _CONCURRENT_SHARE_COMPUTATIONS of the awaitables in flight,
+    and only as long as the shared budget allows. Results are in the order of the awaitables.
+    """
+    batch_budget = asyncio.Semaphore(_CONCURRENT_SHARE_COMPUTATIONS)
+
+    async def _run(awaitable: Awaitable[T]) -> T:
+        async with batch_budget, budget:
+            return await awaitable
+
+    return await asyncio.gather(*[_run(awaitable) for awaitable in awaitables])
+
+
+def _failed_share(share: dict, e: Exception, attempts: int, retry: bool) -> dict:
+    share["error"] = f"{type(e).__name__}: {e}"
+    share["attempts"] = attempts
+    if retry and attempts < _RETRY_MAX_ATTEMPTS:
+        share["next_attempt"] = datetime.datetime.now(tz=pytz.UTC) + _RETRY_BASE_DELAY * 2 ** (attempts - 1)
+    return share
+
+
+async def _withdrawal_share(
+    withdrawal: Withdrawal,
+    minipool: RocketPoolMinipool,
+    rocket_pool_data: RocketPoolDataProvider,
+    beacon_node: BeaconNode,
+    previous_attempts: int,
+) -> dict:
+    share = {
+        "withdrawal_id": withdrawal.id,
+        "minipool_address": minipool.minipool_address,
+        "node_operator_share_wei": None,
+        "error": None,
+        "attempts": previous_attempts + 1,
+        "next_attempt": None,
+    }
+    try:
+        share["node_operator_share_wei"] = await get_withdrawal_node_operator_share(
+            withdrawal=withdrawal,
+            minipool=minipool,
+            rocket_pool_data=rocket_pool_data,
+            beacon_node=beacon_node,
+        )
+        ROCKET_POOL_SHARES_INDEXED.labels("withdrawal", "ok").inc()
+    except NodeOperatorShareUnavailable as e:
+        logger.error(f"Unable to determine node operator share of withdrawal {withdrawal.id}: {e}")
+        ROCKET_POOL_SHARES_INDEXED.labels("withdrawal", "unavailable").inc()
+        return _failed_share(share, e, previous_attempts + 1, retry=False)
+    except Exception as e:
+        logger.exception(f"Failed to compute node operator share of withdrawal {withdrawal.id}: {e}")
+        ROCKET_POOL_SHARES_INDEXED.labels("withdrawal", "failed").inc()
+        return _failed_share(share, e, previous_attempts + 1, retry=True)
+    return share
+
+
+async def _proposal_share(
+    slot: int,
+    block_number: int,
+    node_address: str,
+    fee_distributor: str,
+    rocket_pool_data: RocketPoolDataProvider,
+    beacon_node: BeaconNode,
+    previous_attempts: int,
+) -> dict:
+    share = {
+        "slot": slot,
+        "fee_distributor": fee_distributor,
+        "node_operator_share_wei": None,
+        "error": None,
+        "attempts": previous_attempts + 1,
+        "next_attempt": None,
+    }
+    try:
+        share["node_operator_share_wei"] = await get_proposal_node_operator_share(
+            node_address=node_address,
+            fee_distributor=fee_distributor,
+            slot=slot,
+            beacon_node=beacon_node,
+            rocket_pool_data=rocket_pool_data,
+            block_number=block_number,
+        )
+        ROCKET_POOL_SHARES_INDEXED.labels("proposal", "ok").inc()
+    except Exception as e:
+        logger.exception(f"Failed to compute node operator share of proposal in slot {slot}: {e}")
+        ROCKET_POOL_SHARES_INDEXED.labels("proposal", "failed").inc()
+        return _failed_share(share, e, previous_attempts + 1, retry=True)
+    return share
+
+
+def _store_shares(session: Session, table, shares: list[dict]) -> None:
+    # Retried shares replace the failed ones
+    statement = insert(table)
+    session.execute(statement.on_conflict_do_update(
+        index_elements=[c.name for c in table.__table__.primary_key],
+        set_={name: statement.excluded[name] for name in shares[0]},
+    ), shares)
+    session.commit()
+
+
+async def index_withdrawal_shares(
+    session: Session,
+    rocket_pool_data: RocketPoolDataProvider,
+    beacon_node: BeaconNode,
+    max_slot: int,
+    budget: asyncio.Semaphore,
+) -> int:
+    """
+    Stores node operator shares of minipool withdrawals up to max_slot that do not have one yet,
+    or whose failed computation is due to be retried. Commits after every batch.
+    Returns the number of shares stored.
+    """
+    shares_indexed = 0
+    while True:
+        rows = session.query(Withdrawal, RocketPoolMinipool, RocketPoolWithdrawalShare.attempts) \
+            .join(Validator, Validator.validator_index == Withdrawal.validator_index) \
+            .join(RocketPoolMinipool, RocketPoolMinipool.validator_pubkey == Validator.pubkey) \
+            .outerjoin(RocketPoolWithdrawalShare, RocketPoolWithdrawalShare.withdrawal_id == Withdrawal.id) \
+            .filter(or_(
+                RocketPoolWithdrawalShare.withdrawal_id.is_(None),
+                RocketPoolWithdrawalShare.next_attempt <= datetime.datetime.now(tz=pytz.UTC),
+            )) \
+            .filter(Withdrawal.slot <= max_slot) \
+            .order_by(Withdrawal.id) \
+            .options(selectinload(RocketPoolMinipool.bond_reductions)) \
+            .limit(_SHARES_BATCH_SIZE) \
+            .all()
+        if not rows:
+            return shares_indexed
+
+        shares = await _gather_within_budget([
+            _withdrawal_share(withdrawal, minipool, rocket_pool_data, beacon_node, previous_attempts or 0)
+            for withdrawal, minipool, previous_attempts in rows
+        ], budget)
+        _store_shares(session, RocketPoolWithdrawalShare, shares)
+        shares_indexed += len(shares)
+        logger.info(f"Indexed {shares_indexed} withdrawal shares")
+
+
+async def index_proposal_shares(
+    session: Session,
+    rocket_pool_data: RocketPoolDataProvider,
+    beacon_node: BeaconNode,
+    max_slot: int,
+    budget: asyncio.Semaphore,
+) -> int:
+    """
+    Stores node operator shares of minipool block rewards paid to the node's fee distributor
+    up to max_slot that do not have one yet, or whose failed computation is due to be retried.
+    Commits after every batch. Returns the number of shares stored.
+    """
+    reward_recipient = func.lower(case(
+        (BlockReward.mev, BlockReward.mev_reward_recipient),
+        else_=BlockReward.fee_recipient,
+    ))
+
+    shares_indexed = 0
+    while True:
+        rows = session.query(BlockReward.slot, BlockReward.block_number, RocketPoolNode.node_address, RocketPoolNode.fee_distributor,
+                             RocketPoolProposalShare.attempts) \
+            .join(Validator, Validator.validator_index == BlockReward.proposer_index) \
+            .join(RocketPoolMinipool, RocketPoolMinipool.validator_pubkey == Validator.pubkey) \
+            .join(RocketPoolNode) \
+            .outerjoin(RocketPoolProposalShare, RocketPoolProposalShare.slot == BlockReward.slot) \
+            .filter(or_(
+                RocketPoolProposalShare.slot.is_(None),
+                RocketPoolProposalShare.next_attempt <= datetime.datetime.now(tz=pytz.UTC),
+            )) \
+            .filter(BlockReward.reward_processed_ok) \
+            .filter(BlockReward.slot <= max_slot) \
+            .filter(reward_recipient == RocketPoolNode.fee_distributor) \
+            .order_by(BlockReward.slot) \
+            .limit(_SHARES_BATCH_SIZE) \
+            .all()
+        if not rows:
+            return shares_indexed
+
+        shares = await _gather_within_budget([
+            _proposal_share(slot, block_number, node_address, fee_distributor, rocket_pool_data, beacon_node,
+                            previous_attempts or 0)
+            for slot, block_number, node_address, fee_distributor, previous_attempts in rows
+        ], budget)
+        _store_shares(session, RocketPoolProposalShare, shares)
+        shares_indexed += len(shares)
+        logger.info(f"Indexed {shares_indexed} proposal shares")
@@ -1,20 +1,25 @@
 import datetime
+import functools
 import logging
 from decimal import Decimal
-from typing import Any, Iterable, List, Type
-from contextlib import contextmanager
+from typing import Any, AsyncIterator, Iterable, List, Sequence, Type
+from contextlib import asynccontextmanager
 
 import starlette.requests
 from fastapi import FastAPI
-from sqlalchemy.engine import Engine
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import BigInteger, ColumnElement, Integer, Select, and_, any_, bindparam, cast, func, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import joinedload
 
 from db.tables import Balance, BlockReward, Withdrawal, RocketPoolMinipool, \
-    RocketPoolReward, RocketPoolRewardPeriod, Validator, RocketPoolNode, Price
-from db.db_helpers import _get_engine
+    RocketPoolReward, RocketPoolRewardPeriod, Validator, RocketPoolNode, Price, \
+    RocketPoolProposalShare, RocketPoolWithdrawalShare
+from db.db_helpers import _get_async_engine
 from prometheus_client.metrics import Histogram
 
 from providers.coin_gecko import SupportedToken
+from providers.price_cache import PriceCache
 
 DB_REQUESTS_SECONDS = Histogram("db_requests_seconds",
                                 "Time it takes to pull data from the database",
@@ -23,19 +28,80 @@ DB_REQUESTS_SECONDS = Histogram("db_requests_seconds",
 
 logger = logging.getLogger(__name__)
 
+# Lists of at least this many values are sent as a single array parameter
+ARRAY_PARAMETER_MIN_LENGTH = 100
+# Rows fetched from a server-side cursor at a time
+STREAM_PARTITION_SIZE = 50_000
 
-@contextmanager
-def session_scope(engine: Engine) -> Session:
+
+@asynccontextmanager
+async def session_scope(engine: AsyncEngine) -> AsyncSession:
     """Provide a transactional scope around a series of operations."""
-    session = Session(bind=engine)
+    session = AsyncSession(bind=engine)
     try:
         yield session
-        session.commit()
+        await session.commit()
     except Exception:
-        session.rollback()
+        await session.rollback()
         raise
     finally:
-        session.close()
+        await session.close()
+
+
+def _timed(method):
+    # Histogram.time() used as a decorator would only time the creation of the coroutine
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        with DB_REQUESTS_SECONDS.time():
+            return await method(*args, **kwargs)
+    return wrapper
+
+
+def _in(column: ColumnElement, values: Iterable) -> ColumnElement[bool]:
+    """
+    column IN (values). Long lists are compared using column = ANY(:array) - a single bind parameter
+    instead of one per value, which keeps the bind and planning overhead of big requests low.
+    """
+    values = list(values)
+    if len(values) < ARRAY_PARAMETER_MIN_LENGTH:
+        return column.in_(values)
+    return column == any_(bindparam(None, values, type_=ARRAY(column.type)))
+
+
+def balances_query(slots: Iterable[int], validator_indexes: Iterable[int]) -> Select:
+    return select(Balance) \
+        .filter(_in(Balance.slot, slots)) \
+        .filter(_in(Balance.validator_index, validator_indexes)) \
+        .order_by(Balance.slot.asc())
+
+
+def balances_gwei_query(slots: Iterable[int], validator_indexes: Iterable[int]) -> Select:
+    return select(
+        Balance.validator_index,
+        Balance.slot,
+        # Balances are stored in ETH, as whole amounts of gwei
+        cast(func.round(Balance.balance * 1_000_000_000), BigInteger),
+    ) \
+        .filter(_in(Balance.slot, slots)) \
+        .filter(_in(Balance.validator_index, validator_indexes))
+
+
+def block_rewards_query(min_slot: int, max_slot: int, proposer_indexes: Iterable[int], limit: int | None = None) -> Select:
+    query = select(BlockReward) \
+        .filter(BlockReward.slot.between(min_slot, max_slot)) \
+        .order_by(BlockReward.slot.desc()) \
+        .limit(limit)
+
+    proposer_indexes = list(proposer_indexes)
+    if proposer_indexes:
+        query = query.filter(_in(BlockReward.proposer_index, proposer_indexes))
+    return query
+
+
+def withdrawals_query(min_slot: int, max_slot: int, validator_indexes: Iterable[int]) -> Select:
+    return select(Withdrawal) \
+        .filter(Withdrawal.slot.between(min_slot, max_slot)) \
+        .filter(_in(Withdrawal.validator_index, validator_indexes))
 
 
 class DbProvider:
@@ -43,83 +109,111 @@ class DbProvider:
         return self
 
     async def init_app(self, app: FastAPI) -> None:
-        self.engine = _get_engine()
-
         app.state.DB_PROVIDER = self
 
     def __init__(self) -> None:
-        self.engine = _get_engine()
-
-    @DB_REQUESTS_SECONDS.time()
-    def balances(self,
-                 slots: Iterable[int],
-                 validator_indexes: Iterable[int],
-                 ) -> List[Balance]:
-
-        with session_scope(self.engine) as session:
-            balances = session\
-                .query(Balance) \
-                .filter(Balance.slot.in_(slots))\
-                .filter(Balance.validator_index.in_(validator_indexes))\
-                .order_by(Balance.slot.asc())\
-                .all()
+        # Loaded on first use, separately in each API worker process
+        self.price_cache = PriceCache()
+
+    @property
+    def engine(self) -> AsyncEngine:
+        # Pooled connections of the current event loop
+        return _get_async_engine()
+
+    @_timed
+    async def balances(self,
+                       slots: Iterable[int],
+                       validator_indexes: Iterable[int],
+                       ) -> List[Balance]:
+
+        async with session_scope(self.engine) as session:
+            balances = (await session.scalars(balances_query(slots, validator_indexes))).all()
             session.expunge_all()
 
         return balances
 
-    @DB_REQUESTS_SECONDS.time()
-    def block_rewards(self, min_slot: int, max_slot: int, proposer_indexes: Iterable[int], limit: int | None = None) -> List[BlockReward]:
-        with session_scope(self.engine) as session:
-            query = session\
-                .query(BlockReward) \
-                .filter(BlockReward.slot.between(min_slot, max_slot))\
-                .order_by(BlockReward.slot.desc())\
-                .limit(limit)
-
-            if proposer_indexes:
-                query = query.filter(BlockReward.proposer_index.in_(proposer_indexes))
-
-            block_rewards = query.all()
+    @_timed
+    async def balances_gwei(self,
+                            slots: Iterable[int],
+                            validator_indexes: Iterable[int],
+                            ) -> list[tuple[int, int, int]]:
+        """
+        Returns (validator_index, slot, balance in gwei) rows, without creating ORM objects.
+        """
+        async with session_scope(self.engine) as session:
+            return (await session.execute(balances_gwei_query(slots, validator_indexes))).all()
+
+    @_timed
+    async def balances_gwei_at_slots(self, validator_slots: dict[int, int]) -> list[tuple[int, int, int]]:
+        """
+        Returns (validator_index, slot, balance in gwei) rows for a different slot per validator
+        (e.g. each validator's initial balance) using a single query.
+        """
+        requested = func.unnest(
+            # Typed explicitly - asyncpg does not tell the database the type of the arrays
+            cast(bindparam("requested_validator_indexes", list(validator_slots.keys())), ARRAY(Integer)),
+            cast(bindparam("requested_slots", list(validator_slots.values())), ARRAY(Integer)),
+        ).table_valued("validator_index", "slot").render_derived(name="requested")
+
+        async with session_scope(self.engine) as session:
+            return (await session.execute(
+                select(
+                    Balance.validator_index,
+                    Balance.slot,
+                    cast(func.round(Balance.balance * 1_000_000_000), BigInteger),
+                )
+                .join(requested, and_(
+                    Balance.validator_index == requested.c.validator_index,
+                    Balance.slot == requested.c.slot,
+                ))
+            )).all()
+
+    @_timed
+    async def block_rewards(self, min_slot: int, max_slot: int, proposer_indexes: Iterable[int], limit: int | None = None) -> List[BlockReward]:
+        async with session_scope(self.engine) as session:
+            block_rewards = (await session.scalars(
+                block_rewards_query(min_slot, max_slot, proposer_indexes, limit=limit)
+            )).all()
             session.expunge_all()
 
         return block_rewards
 
-    @DB_REQUESTS_SECONDS.time()
-    def fee_distributor_addresses_for_validator_indexes(self, validator_indexes: list[int]) -> dict[int, str]:
-        with (session_scope(self.engine) as session):
-            rows = session.query(
+    @_timed
+    async def fee_distributor_addresses_for_validator_indexes(self, validator_indexes: list[int]) -> dict[int, str]:
+        async with session_scope(self.engine) as session:
+            rows = (await session.execute(select(
                 Validator.validator_index,
                 RocketPoolNode.fee_distributor,
             ).select_from(Validator).join(
                 RocketPoolMinipool, onclause=RocketPoolMinipool.validator_pubkey==Validator.pubkey
             ).join(
                 RocketPoolNode
-            ).filter(Validator.validator_index.in_(validator_indexes)).all()
+            ).filter(_in(Validator.validator_index, validator_indexes)))).all()
 
             session.expunge_all()
         return {
             row[0]: row[1] for row in rows
         }
 
-    @DB_REQUESTS_SECONDS.time()
-    def indexes_for_rp_node_address(self, node_address: str) -> List[int]:
-        with session_scope(self.engine) as session:
-            pubkeys = [pk for pk, in session.query(RocketPoolMinipool.validator_pubkey).filter(RocketPoolMinipool.node_address == node_address).all()]
-            indexes = session.query(
+    @_timed
+    async def indexes_for_rp_node_address(self, node_address: str) -> List[int]:
+        async with session_scope(self.engine) as session:
+            pubkeys = (await session.scalars(select(RocketPoolMinipool.validator_pubkey).filter(RocketPoolMinipool.node_address == node_address))).all()
+            indexes = (await session.scalars(select(
                 Validator.validator_index
             ).filter(
-                Validator.pubkey.in_(pubkeys)
-            ).all()
+                _in(Validator.pubkey, pubkeys)
+            ))).all()
             session.expunge_all()
-        return [i for i, in indexes]
+        return list(indexes)
 
-    @DB_REQUESTS_SECONDS.time()
-    def minipools_for_validators(self, validator_indexes: list[int]) -> dict[int, Type[RocketPoolMinipool]]:
+    @_timed
+    async def minipools_for_validators(self, validator_indexes: list[int]) -> dict[int, Type[RocketPoolMinipool]]:
         return_data = {}
-        with session_scope(self.engine) as session:
-            validators = session.query(Validator).filter(Validator.validator_index.in_(validator_indexes)).all()
+        async with session_scope(self.engine) as session:
+            validators = (await session.scalars(select(Validator).filter(_in(Validator.validator_index, validator_indexes)))).all()
             validator_pubkeys = [v.pubkey for v in validators]
-            minipools = session.query(RocketPoolMinipool).filter(RocketPoolMinipool.validator_pubkey.in_(validator_pubkeys)).options(joinedload(RocketPoolMinipool.bond_reductions)).all()
+            minipools = (await session.scalars(select(RocketPoolMinipool).filter(_in(RocketPoolMinipool.validator_pubkey, validator_pubkeys)).options(joinedload(RocketPoolMinipool.bond_reductions)))).unique().all()
             session.expunge_all()
 
             for v in validators:
@@ -132,64 +226,117 @@ class DbProvider:
 
         return return_data
 
-    @DB_REQUESTS_SECONDS.time()
-    def close_price_for_date(
+    @_timed
+    async def close_price_for_date(
         self,
         token: SupportedToken,
         currency: str,
         date: datetime.date,
     ) -> Decimal:
-        with session_scope(self.engine) as session:
-            return session.get(Price, dict(
+        async with session_scope(self.engine) as session:
+            return (await session.get(Price, dict(
                 token=token.value,
                 currency=currency.lower(),
                 timestamp=datetime.datetime.combine(date=date, time=datetime.time(23, 59, 59))
-            )).value
-
-    @DB_REQUESTS_SECONDS.time()
-    def rocket_pool_node_rewards_for_minipools(self, minipool_addresses: Iterable[str], from_datetime: datetime.datetime, to_datetime: datetime.datetime) -> list[Type[RocketPoolReward]]:
-        with session_scope(self.engine) as session:
-            node_addresses = [na for na, in session.query(RocketPoolMinipool.node_address).filter(RocketPoolMinipool.minipool_address.in_(minipool_addresses)).distinct().all()]
-            node_rewards = session \
-                .query(RocketPoolReward) \
-                .filter(RocketPoolReward.node_address.in_(node_addresses)) \
-                .join(RocketPoolRewardPeriod) \
-                .filter(RocketPoolRewardPeriod.reward_period_end_time.between(from_datetime, to_datetime)) \
-                .options(joinedload(RocketPoolReward.reward_period)) \
-                .all()
+            ))).value
+
+    async def close_prices(
+        self,
+        token: SupportedToken,
+        currency: str,
+        start_date: datetime.date,
+        end_date: datetime.date,
+    ) -> list[float]:
+        """
+        Returns the close price for every date from start_date to end_date (inclusive), using the price cache.
+        Raises MissingPriceError if the price for any of the dates is not available.
+        """
+        return (await self.price_cache.close_prices(
+            token=token,
+            currency=currency,
+            start_date=start_date,
+            end_date=end_date,
+        )).tolist()
+
+    @_timed
+    async def rocket_pool_node_rewards_for_minipools(self, minipool_addresses: Iterable[str], from_datetime: datetime.datetime, to_datetime: datetime.datetime) -> list[Type[RocketPoolReward]]:
+        async with session_scope(self.engine) as session:
+            node_addresses = (await session.scalars(select(RocketPoolMinipool.node_address).filter(_in(RocketPoolMinipool.minipool_address, minipool_addresses)).distinct())).all()
+            node_rewards = (await session.scalars(
+                select(RocketPoolReward)
+                .filter(_in(RocketPoolReward.node_address, node_addresses))
+                .join(RocketPoolRewardPeriod)
+                .filter(RocketPoolRewardPeriod.reward_period_end_time.between(from_datetime, to_datetime))
+                .options(joinedload(RocketPoolReward.reward_period))
+            )).all()
             session.expunge_all()
 
         return node_rewards
 
-    @DB_REQUESTS_SECONDS.time()
-    def validators_by_pubkeys(self, pubkeys: Iterable[str]) -> List[Validator]:
-        with session_scope(self.engine) as session:
-            validators = session.query(Validator).filter(Validator.pubkey.in_(pubkeys)).all()
+    @_timed
+    async def rocket_pool_proposal_shares(self, slots: Iterable[int]) -> dict[int, RocketPoolProposalShare]:
+        async with session_scope(self.engine) as session:
+            shares = (await session.scalars(select(RocketPoolProposalShare).filter(_in(RocketPoolProposalShare.slot, slots)))).all()
+            session.expunge_all()
+        return {share.slot: share for share in shares}
+
+    @_timed
+    async def rocket_pool_withdrawal_shares(self, withdrawal_ids: Iterable[int]) -> dict[int, RocketPoolWithdrawalShare]:
+        async with session_scope(self.engine) as session:
+            shares = (await session.scalars(select(RocketPoolWithdrawalShare).filter(_in(RocketPoolWithdrawalShare.withdrawal_id, withdrawal_ids)))).all()
+            session.expunge_all()
+        return {share.withdrawal_id: share for share in shares}
+
+    @_timed
+    async def validators_by_pubkeys(self, pubkeys: Iterable[str]) -> List[Validator]:
+        async with session_scope(self.engine) as session:
+            validators = (await session.scalars(select(Validator).filter(_in(Validator.pubkey, pubkeys)))).all()
             session.expunge_all()
         return validators
 
-    @DB_REQUESTS_SECONDS.time()
-    def withdrawals_to_address(self, address: str, slot: int = None) -> List[Withdrawal]:
-        with session_scope(self.engine) as session:
-            query = session.query(Withdrawal).filter(Withdrawal.withdrawal_address.has(address=address))
+    @_timed
+    async def withdrawals_to_address(self, address: str, slot: int = None) -> List[Withdrawal]:
+        async with session_scope(self.engine) as session:
+            query = select(Withdrawal).filter(Withdrawal.withdrawal_address.has(address=address))
             if slot:
                 query = query.filter(Withdrawal.slot==slot)
-            withdrawals = query.all()
+            withdrawals = (await session.scalars(query)).all()
             session.expunge_all()
         return withdrawals
 
-    @DB_REQUESTS_SECONDS.time()
-    def withdrawals(self, min_slot: int, max_slot: int, validator_indexes: Iterable[int]) -> List[Withdrawal]:
-        with session_scope(self.engine) as session:
-            withdrawals = session\
-                .query(Withdrawal) \
-                .filter(Withdrawal.slot.between(min_slot, max_slot))\
-                .filter(Withdrawal.validator_index.in_(validator_indexes))\
-                .all()
+    @_timed
+    async def withdrawals(self, min_slot: int, max_slot: int, validator_indexes: Iterable[int]) -> List[Withdrawal]:
+        async with session_scope(self.engine) as session:
+            withdrawals = (await session.scalars(withdrawals_query(min_slot, max_slot, validator_indexes))).all()
             session.expunge_all()
 
         return withdrawals
 
+    async def _stream(self, query) -> AsyncIterator[Sequence[Any]]:
+        # Reads the rows through a server-side cursor - only one partition is in memory at a time
+        async with session_scope(self.engine) as session:
+            result = await session.stream(query, execution_options={"yield_per": STREAM_PARTITION_SIZE})
+            async for partition in result.partitions():
+                yield partition
+
+    def stream_balances_gwei(self, slots: Iterable[int], validator_indexes: Iterable[int]) -> AsyncIterator[Sequence[Any]]:
+        """
+        Yields partitions of (validator_index, slot, balance in gwei) rows, ordered by (validator_index, slot).
+        """
+        return self._stream(
+            balances_gwei_query(slots, validator_indexes).order_by(Balance.validator_index, Balance.slot)
+        )
+
+    def stream_withdrawals(self, min_slot: int, max_slot: int, validator_indexes: Iterable[int]) -> AsyncIterator[Sequence[Any]]:
+        """
+        Yields partitions of (validator_index, slot, amount_gwei) rows, ordered by (validator_index, slot).
+        """
+        return self._stream(
+            withdrawals_query(min_slot, max_slot, validator_indexes)
+            .with_only_columns(Withdrawal.validator_index, Withdrawal.slot, Withdrawal.amount_gwei)
+            .order_by(Withdrawal.validator_index, Withdrawal.slot)
+        )
+
 
 db_plugin = DbProvider()
 
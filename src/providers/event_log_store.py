@@ -0,0 +1,188 @@
+"""
+Local store of the execution layer logs of event topics that are scanned over and over again
+(Rocket Pool events, staking pool reward distributions).
+
+indexer/event_logs.py copies the logs of the subscribed topics into the event_log table in bulk
+and keeps them current up to the finalized block. The last block stored for each subscription is
+tracked in indexer_cursor. ExecutionNode.get_logs answers the covered part of a requested block
+range from the table and only asks the execution node for the rest.
+"""
+import logging
+import time
+from collections import namedtuple
+
+from prometheus_client import Counter
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from db.db_helpers import session_scope
+from db.tables import EventLog, IndexerCursor
+
+logger = logging.getLogger(__name__)
+
+EVENT_LOGS_STORED = Counter(
+    "event_logs_stored",
+    "Logs added to the local event log store",
+    labelnames=("subscription",),
+)
+EVENT_LOG_STORE_LOOKUPS = Counter(
+    "event_log_store_lookups",
+    "get_logs calls for subscribed topics, by whether the block range was covered by the local event log store",
+    labelnames=("covered",),
+)
+
+# Logs of a topic, emitted by a single contract (address) or by any contract (address None),
+# are stored from start_block_number on
+LogSubscription = namedtuple("LogSubscription", ["name", "topic0", "address", "start_block_number"])
+
+_ROCKET_POOL_DEPLOYMENT_BLOCK = 13_300_000
+_MERGE_BLOCK = 15_537_394
+
+SUBSCRIPTIONS = [
+    LogSubscription("rocket_pool_minipool_created", "0x08b4b91bafaf992145c5dd7e098dfcdb32f879714c154c651c2758a44c7aeae4",
+                    None, _ROCKET_POOL_DEPLOYMENT_BLOCK),
+    LogSubscription("rocket_pool_bond_reduced", "0x90e131460b9acb17565f1719b9ebc49998aec6b07a4743a09b1b700545769eb6",
+                    None, _ROCKET_POOL_DEPLOYMENT_BLOCK),
+    LogSubscription("rocket_pool_reward_snapshot", "0x61caab0be2a0f10d869a5f437dab4535eb8e9c868b8c1fc68f3e5c10d0cd8f66",
+                    None, _ROCKET_POOL_DEPLOYMENT_BLOCK),
+    # Reward distributions of the staking pool fee recipients (see smart_contract_fee_recipients.py)
+    LogSubscription("rocket_pool_distributor", "0x4c41dd034da8150bccdeba2e484837eb447e0a3840b3e02a54e9bd6eb883210e",
+                    None, _MERGE_BLOCK),
+    LogSubscription("lido_el_rewards_received", "0xd27f9b0c98bdee27044afa149eadcd2047d6399cb6613a45c5b87e6aca76e6b5",
+                    "0xae7ab96520de3a18e5e111b5eaab095312d7fe84", _MERGE_BLOCK),
+    LogSubscription("stakefish_distribution", "0x7916d844d976746a43b9efc42cf4339ebe50001364a8790d4aec7bbd9a2b599e",
+                    None, _MERGE_BLOCK),
+    LogSubscription("kraken_distribution", "0x1bb9fb49058794ee4e0f88f3c95c10019922d0b1c6f27da1ee2a98ad19d9b308",
+                    None, _MERGE_BLOCK),
+]
+_SUBSCRIPTIONS_BY_TOPIC = {s.topic0: s for s in SUBSCRIPTIONS}
+
+CURSOR_PREFIX = "event_log_"
+# Coverage only grows - reading it again every once in a while is enough
+COVERAGE_RELOAD_INTERVAL = 30  # seconds
+
+
+def cursor_stream(subscription: LogSubscription) -> str:
+    return f"{CURSOR_PREFIX}{subscription.name}"
+
+
+def get_next_block_number(session: Session, subscription: LogSubscription) -> int:
+    cursor = session.get(IndexerCursor, cursor_stream(subscription))
+    if cursor is None:
+        return subscription.start_block_number
+    return cursor.last_block_number + 1
+
+
+def store_logs(session: Session, subscriptions: list[LogSubscription], logs: list[dict], last_block_number: int) -> None:
+    """
+    Stores the logs of the subscriptions (fetched for all of their topics at once) and marks the subscriptions
+    as covered up to last_block_number. Not committed here.
+    """
+    by_topic = {s.topic0: s for s in subscriptions}
+    rows = []
+    for log_item in logs:
+        if log_item["removed"] is True or not log_item["topics"]:
+            continue
+        subscription = by_topic.get(log_item["topics"][0])
+        if subscription is None:
+            continue
+        if subscription.address is not None and log_item["address"].lower() != subscription.address:
+            continue
+        rows.append({
+            "block_number": int(log_item["blockNumber"], base=16),
+            "log_index": int(log_item["logIndex"], base=16),
+            "address": log_item["address"].lower(),
+            "topic0": log_item["topics"][0],
+            "topics": ",".join(log_item["topics"][1:]),
+            "data": log_item["data"],
+            "transaction_hash": log_item["transactionHash"],
+        })
+        EVENT_LOGS_STORED.labels(subscription.name).inc()
+
+    if rows:
+        # Logs can be returned twice when the execution node request is split up
+        session.execute(insert(EventLog).on_conflict_do_nothing(), rows)
+    for subscription in subscriptions:
+        session.merge(IndexerCursor(stream=cursor_stream(subscription), last_block_number=last_block_number))
+
+
+def _to_rpc_log(row: EventLog) -> dict:
+    # Same fields as returned by eth_getLogs, apart from blockHash and transactionIndex
+    return {
+        "address": row.address,
+        "topics": [row.topic0, *(row.topics.split(",") if row.topics else [])],
+        "data": row.data,
+        "blockNumber": hex(row.block_number),
+        "logIndex": hex(row.log_index),
+        "transactionHash": row.transaction_hash,
+        "removed": False,
+    }
+
+
+class EventLogStore:
+    def __init__(self) -> None:
+        # Subscription name -> last stored block number
+        self._covered_up_to: dict[str, int] = {}
+        self._coverage_loaded_at: float | None = None
+
+    def _last_covered_block_number(self, subscription: LogSubscription) -> int | None:
+        now = time.monotonic()
+        if self._coverage_loaded_at is None or now - self._coverage_loaded_at > COVERAGE_RELOAD_INTERVAL:
+            with session_scope() as session:
+                self._covered_up_to = {
+                    stream[len(CURSOR_PREFIX):]: last_block_number
+                    for stream, last_block_number in session.query(
+                        IndexerCursor.stream, IndexerCursor.last_block_number
+                    ).filter(IndexerCursor.stream.startswith(CURSOR_PREFIX))
+                }
+            self._coverage_loaded_at = now
+        return self._covered_up_to.get(subscription.name)
+
+    def covered_range(self, address: str | None, block_number_range: tuple[int, int], topics: list) -> tuple[int, int] | None:
+        """
+        Returns the part of the block range, starting at its first block, whose logs
+        matching address and topics are in the store. None if there is no such part.
+        """
+        if len(topics) != 1 or not isinstance(topics[0], str):
+            return None
+        subscription = _SUBSCRIPTIONS_BY_TOPIC.get(topics[0])
+        if subscription is None:
+            return None
+        if subscription.address is not None and (address is None or address.lower() != subscription.address):
+            return None
+
+        from_block, to_block = block_number_range
+        last_covered_block_number = self._last_covered_block_number(subscription)
+        if from_block < subscription.start_block_number or last_covered_block_number is None \
+                or from_block > last_covered_block_number:
+            EVENT_LOG_STORE_LOOKUPS.labels("false").inc()
+            return None
+        EVENT_LOG_STORE_LOOKUPS.labels("true").inc()
+        return from_block, min(to_block, last_covered_block_number)
+
+    def get_logs(self, address: str | None, block_number_range: tuple[int, int], topic0: str) -> list[dict]:
+        from_block, to_block = block_number_range
+        with session_scope() as session:
+            query = session.query(EventLog).filter(
+                EventLog.topic0 == topic0,
+                EventLog.block_number >= from_block,
+                EventLog.block_number <= to_block,
+            )
+            if address is not None:
+                query = query.filter(EventLog.address == address.lower())
+            return [_to_rpc_log(row) for row in query.order_by(EventLog.block_number, EventLog.log_index)]
+
+
+_SHARED_STORE: EventLogStore | None = None
+
+
+def shared_store() -> EventLogStore:
+    """
+    Returns the store shared by all execution nodes of the process, so that the
+    stored block ranges are loaded once per process rather than once per node.
+    """
+    global _SHARED_STORE
+
+    if _SHARED_STORE is None:
+        _SHARED_STORE = EventLogStore()
+    return _SHARED_STORE
@@ -5,6 +5,7 @@ import os
 from collections import namedtuple
 from typing import Any
 
+from providers.event_log_store import shared_store
 from providers.http_client_w_backoff import AsyncClientWithBackoff
 from prometheus_client.metrics import Counter
 
@@ -50,6 +51,8 @@ class ExecutionNode:
         self.client = self._get_http_client()
         self._last_infura_request_dt = datetime.datetime.now()
         self._get_miner_data_rpc_supported = True
+        # Logs of subscribed topics are read from the local event log store where possible
+        self.log_store = shared_store() if os.getenv("EVENT_LOG_STORE_ENABLED") == "true" else None
 
     async def get_block_number(self) -> int:
         url = f"{self.BASE_URL}"
@@ -63,6 +66,18 @@ class ExecutionNode:
 
         return int(resp.json()["result"], base=16)
 
+    async def get_finalized_block_number(self) -> int:
+        url = f"{self.BASE_URL}"
+        resp = await self.client.post_w_backoff(url=url, json={
+            "jsonrpc": "2.0",
+            "method": "eth_getBlockByNumber",
+            "params": ["finalized", False],
+            "id": 1
+        }, headers=self.HEADERS)
+        EXEC_NODE_REQUEST_COUNT.labels("eth_getBlockByNumber", "get_finalized_block_number").inc()
+
+        return int(resp.json()["result"]["number"], base=16)
+
     async def eth_call(self, params: list[dict], use_infura=True) -> Any:
         """
         If a block number is specified as part of params, the method will
@@ -165,6 +180,27 @@ class ExecutionNode:
 
         return resp.json()["result"]
 
+    async def trace_block(self, block_number: int, use_infura: bool = True) -> list[dict]:
+        """
+        Returns the call trace (callTracer) of each transaction in the block.
+        Every call frame contains its type, from, to, value (hex), error (if it reverted) and nested calls.
+        """
+        url = os.getenv("EXECUTION_NODE_INFURA_ARCHIVE_URL") if use_infura else f"{self.BASE_URL}"
+        if use_infura:
+            await self._wait_for_infura_rate_limiter()
+        resp = await self.client.post_w_backoff(url=url, json={
+            "jsonrpc": "2.0",
+            "method": "debug_traceBlockByNumber",
+            "params": [hex(block_number), {"tracer": "callTracer"}],
+            "id": 1
+        }, headers=self.HEADERS)
+        EXEC_NODE_REQUEST_COUNT.labels("debug_traceBlockByNumber", "trace_block").inc()
+
+        if resp.json().get("result") is None:
+            raise ValueError(f"Received null trace for {block_number}: {resp.json().get('error')}")
+
+        return [tx_trace["result"] for tx_trace in resp.json()["result"]]
+
     async def get_tx_receipts(self, tx_ids: list[str]) -> list[dict]:
         url = f"{self.BASE_URL}"
         receipts: list[dict] = []
@@ -201,7 +237,7 @@ class ExecutionNode:
         tx_receipt = (await self.get_tx_receipts([tx_hash]))[0]
         return int(tx_receipt["gasUsed"], base=16) * int(tx_receipt["effectiveGasPrice"], base=16)
 
-    async def _get_logs(self, address: str | None, block_number_range: tuple[int, int], topics: list[str], use_infura: bool) -> list[dict]:
+    async def _get_logs(self, address: str | None, block_number_range: tuple[int, int], topics: list, use_infura: bool) -> list[dict]:
         from_block = block_number_range[0]
         to_block = block_number_range[1]
         assert from_block <= to_block
@@ -266,12 +302,19 @@ class ExecutionNode:
 
         return resp_data["result"]
 
-    async def get_logs(self, address: str | None, block_number_range: tuple[int, int], topics: list[str], use_infura=True) -> list[dict]:
+    async def get_logs(self, address: str | None, block_number_range: tuple[int, int], topics: list, use_infura=True) -> list[dict]:
         all_logs = []
 
         from_block = block_number_range[0]
         to_block = block_number_range[1]
 
+        if self.log_store is not None:
+            # The store is read using blocking database I/O - keep it off the event loop
+            covered_range = await asyncio.to_thread(self.log_store.covered_range, address, block_number_range, topics)
+            if covered_range is not None:
+                all_logs.extend(await asyncio.to_thread(self.log_store.get_logs, address, covered_range, topic0=topics[0]))
+                from_block = covered_range[1] + 1
+
         # Split it up into limited-size block ranges (max range for Alchemy RPC)
         for start_block_number in range(from_block, to_block + 1, self.MAX_BLOCK_RANGE):
             end_block_number = min(start_block_number + (self.MAX_BLOCK_RANGE - 1), to_block)
@@ -0,0 +1,171 @@
+"""
+Aggregates read-only contract calls made at the same block into Multicall3 aggregate3 calls.
+
+Calls are queued and sent together as soon as the caller yields to the event loop
+(or once a batch is full) - concurrent callers (e.g. asyncio.gather) share a single eth_call.
+"""
+import asyncio
+import logging
+
+from prometheus_client import Counter
+
+from providers.execution_node import ExecutionNode
+
+logger = logging.getLogger(__name__)
+
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+# Calls at earlier blocks are made one by one
+MULTICALL3_DEPLOYMENT_BLOCK = 14_353_601
+MAX_CALLS_PER_BATCH = 250
+
+_AGGREGATE3_SELECTOR = "82ad56cb"  # aggregate3((address,bool,bytes)[])
+
+MULTICALL_CALLS = Counter(
+    "multicall_calls",
+    "Contract calls made through Multicall3, by the number of eth_calls they ended up in",
+    labelnames=("batched",),
+)
+
+
+class MulticallError(ValueError):
+    pass
+
+
+def _word(value: int) -> str:
+    return f"{value:064x}"
+
+
+def _encode_bytes(data: str) -> str:
+    # Length-prefixed, right-padded to a multiple of 32 bytes
+    data = data[2:] if data.startswith("0x") else data
+    padded_length = -(-len(data) // 64) * 64
+    return _word(len(data) // 2) + data.ljust(padded_length, "0")
+
+
+def encode_aggregate3(calls: list[tuple[str, str]]) -> str:
+    """
+    Encodes aggregate3 calldata for (target, calldata) pairs, allowing each call to fail.
+    """
+    encoded_calls = []
+    for target, data in calls:
+        encoded_calls.append(
+            _word(int(target, base=16))
+            + _word(1)  # allowFailure
+            + _word(3 * 32)  # offset of callData within the tuple
+            + _encode_bytes(data)
+        )
+
+    offsets = []
+    offset = 32 * len(calls)
+    for encoded_call in encoded_calls:
+        offsets.append(_word(offset))
+        offset += len(encoded_call) // 2
+
+    return "0x" + _AGGREGATE3_SELECTOR + _word(32) + _word(len(calls)) + "".join(offsets) + "".join(encoded_calls)
+
+
+def decode_aggregate3(result: str) -> list[tuple[bool, str]]:
+    """
+    Decodes the aggregate3 (bool success, bytes returnData)[] result into (success, "0x"-prefixed return data) pairs.
+    """
+    data = bytes.fromhex(result[2:])
+
+    def _read_int(position: int) -> int:
+        return int.from_bytes(data[position:position + 32], byteorder="big")
+
+    array_start = _read_int(0)
+    length = _read_int(array_start)
+    items_start = array_start + 32
+
+    results = []
+    for i in range(length):
+        item_start = items_start + _read_int(items_start + 32 * i)
+        success = _read_int(item_start) == 1
+        return_data_start = item_start + _read_int(item_start + 32)
+        return_data_length = _read_int(return_data_start)
+        return_data = data[return_data_start + 32:return_data_start + 32 + return_data_length]
+        results.append((success, "0x" + return_data.hex()))
+    return results
+
+
+class Multicall:
+    def __init__(self, execution_node: ExecutionNode, max_batch_size: int = MAX_CALLS_PER_BATCH) -> None:
+        self.execution_node = execution_node
+        self.max_batch_size = max_batch_size
+        # (block, use_infura) -> queued (target, calldata, future)
+        self._queued: dict[tuple[str, bool], list[tuple[str, str, asyncio.Future]]] = {}
+        # Keep references to the flush tasks until they are done
+        self._flush_tasks: set[asyncio.Task] = set()
+
+    async def call(self, to: str, data: str, block_number: int = None, use_infura: bool = True) -> str:
+        """
+        Returns the call's return data, like eth_call. Raises MulticallError (a ValueError) if the call reverts.
+        """
+        block = hex(block_number) if block_number else "latest"
+        if block_number is not None and block_number < MULTICALL3_DEPLOYMENT_BLOCK:
+            MULTICALL_CALLS.labels("false").inc()
+            return await self.execution_node.eth_call(
+                params=[
+                    {
+                        "from": "0x0000000000000000000000000000000000000000",
+                        "to": to,
+                        "data": data,
+                    },
+                    block,
+                ],
+                use_infura=use_infura,
+            )
+
+        key = (block, use_infura)
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queued.setdefault(key, [])
+        queue.append((to, data, future))
+        if len(queue) >= self.max_batch_size:
+            # Full - send right away, later calls start a new batch
+            self._schedule(self._send(key, self._queued.pop(key)))
+        elif len(queue) == 1:
+            self._schedule(self._flush_soon(key))
+        return await future
+
+    def _schedule(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush_soon(self, key: tuple[str, bool]) -> None:
+        # Give other coroutines the chance to queue their calls
+        await asyncio.sleep(0)
+        queue = self._queued.pop(key, None)
+        if queue:
+            await self._send(key, queue)
+
+    async def _send(self, key: tuple[str, bool], queue: list[tuple[str, str, asyncio.Future]]) -> None:
+        block, use_infura = key
+        MULTICALL_CALLS.labels("true").inc(len(queue))
+
+        try:
+            result = await self.execution_node.eth_call(
+                params=[
+                    {
+                        "from": "0x0000000000000000000000000000000000000000",
+                        "to": MULTICALL3_ADDRESS,
+                        "data": encode_aggregate3([(to, data) for to, data, _ in queue]),
+                    },
+                    block,
+                ],
+                use_infura=use_infura,
+            )
+            results = decode_aggregate3(result)
+        except Exception as e:
+            for _, _, future in queue:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (to, data, future), (success, return_data) in zip(queue, results):
+            if future.done():
+                continue
+            if success:
+                future.set_result(return_data)
+            else:
+                future.set_exception(MulticallError(f"Call to {to} ({data[:10]}) reverted at {block}: {return_data}"))
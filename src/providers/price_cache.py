@@ -0,0 +1,118 @@
+"""
+In-process cache of all close prices, kept in a dense array indexed by (token, currency, day since genesis).
+
+The price table is small (a price per token, currency and day) and only ever appended to by the
+price indexer. It is loaded once per API worker - afterwards, only the prices added since the last
+refresh are queried. Any date range is then served as a slice of the array.
+"""
+import asyncio
+import datetime
+import logging
+import time
+
+import numpy as np
+import pytz
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.db_helpers import _get_async_engine
+from db.tables import Price
+from providers.beacon_node import GENESIS_DATETIME
+from providers.coin_gecko import SupportedToken
+
+logger = logging.getLogger(__name__)
+
+REFRESH_INTERVAL = 60  # seconds
+# Ranges ending after the last cached day trigger a refresh - at most this often
+MISSING_DAYS_REFRESH_INTERVAL = 5  # seconds
+
+
+class MissingPriceError(ValueError):
+    def __init__(self, token: SupportedToken, currency: str, date: datetime.date) -> None:
+        super().__init__(f"No {currency} price for {token.value} on {date}")
+        self.date = date
+
+
+class PriceCache:
+    def __init__(self) -> None:
+        self._first_date = GENESIS_DATETIME.date()
+        self._token_indexes = {token.value: idx for idx, token in enumerate(SupportedToken)}
+        self._currency_indexes: dict[str, int] = {}
+        # NaN for missing prices, the days axis grows in chunks
+        self._prices = np.full((len(self._token_indexes), 0, 0), np.nan)
+        self._day_count = 0
+        self._loaded_up_to: dict[str, datetime.datetime] = {}
+        self._refreshed_at: float | None = None
+        self._lock = asyncio.Lock()
+
+    async def _refresh(self) -> None:
+        rows = []
+        async with AsyncSession(bind=_get_async_engine()) as session:
+            for token in self._token_indexes:
+                query = select(Price.token, Price.currency, Price.timestamp, Price.value) \
+                    .filter(Price.token == token)
+                if token in self._loaded_up_to:
+                    query = query.filter(Price.timestamp > self._loaded_up_to[token])
+                token_rows = (await session.execute(query)).all()
+                if token_rows:
+                    self._loaded_up_to[token] = max(timestamp for _, _, timestamp, _ in token_rows)
+                rows.extend(token_rows)
+        self._refreshed_at = time.monotonic()
+        if not rows:
+            return
+
+        for _, currency, _, _ in rows:
+            if currency not in self._currency_indexes:
+                self._currency_indexes[currency] = len(self._currency_indexes)
+        token_indexes = np.array([self._token_indexes[token] for token, _, _, _ in rows])
+        currency_indexes = np.array([self._currency_indexes[currency] for _, currency, _, _ in rows])
+        day_offsets = np.array([
+            (timestamp.astimezone(pytz.UTC).date() - self._first_date).days for _, _, timestamp, _ in rows
+        ])
+        values = np.array([np.nan if value is None else float(value) for _, _, _, value in rows])
+
+        self._grow(currency_count=len(self._currency_indexes), day_count=int(day_offsets.max()) + 1)
+        self._prices[token_indexes, currency_indexes, day_offsets] = values
+        logger.info(f"Loaded {len(rows)} prices into the price cache")
+
+    def _grow(self, currency_count: int, day_count: int) -> None:
+        token_count, cached_currency_count, day_capacity = self._prices.shape
+        if currency_count > cached_currency_count or day_count > day_capacity:
+            prices = np.full((
+                token_count,
+                max(currency_count, cached_currency_count),
+                # Room for a year's worth of new prices
+                day_count + 365 if day_count > day_capacity else day_capacity,
+            ), np.nan)
+            prices[:, :cached_currency_count, :day_capacity] = self._prices
+            self._prices = prices
+        self._day_count = max(self._day_count, day_count)
+
+    async def close_prices(self, token: SupportedToken, currency: str, start_date: datetime.date, end_date: datetime.date) -> np.ndarray:
+        """
+        Returns the close prices for every date from start_date to end_date (inclusive).
+        Raises MissingPriceError if the price for any of the dates is not available.
+        """
+        start_offset = (start_date - self._first_date).days
+        end_offset = (end_date - self._first_date).days + 1
+        if end_offset <= start_offset:
+            return np.empty(0)
+        if start_offset < 0:
+            raise MissingPriceError(token, currency, start_date)
+
+        async with self._lock:
+            now = time.monotonic()
+            if self._refreshed_at is None or now - self._refreshed_at > REFRESH_INTERVAL \
+                    or (end_offset > self._day_count and now - self._refreshed_at > MISSING_DAYS_REFRESH_INTERVAL):
+                await self._refresh()
+
+            currency_index = self._currency_indexes.get(currency.lower())
+            if currency_index is None:
+                raise MissingPriceError(token, currency, start_date)
+            prices = self._prices[self._token_indexes[token.value], currency_index, start_offset:end_offset].copy()
+
+        missing = np.flatnonzero(np.isnan(prices))
+        if len(prices) < end_offset - start_offset or len(missing) > 0:
+            first_missing_offset = missing[0] if len(missing) > 0 else len(prices)
+            raise MissingPriceError(token, currency, start_date + datetime.timedelta(days=int(first_missing_offset)))
+        return prices
@@ -1,75 +1,99 @@
+import asyncio
+import bisect
 import datetime
-import json
 import logging
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 from decimal import Decimal
 from typing import Any
 
 import pytz
-import requests
 
 from providers.execution_node import ExecutionNode
+from providers.multicall import Multicall
+from providers.rocket_pool_rewards_trees import download_rewards_trees
 
 logger = logging.getLogger(__name__)
 
 
-_MINIPOOL_MANAGER_ADDRESSES = [
-    # v1-v4 are no longer used
-    # {
-    #     # v1 deployed on Nov-02-2021
-    #     "address": "0x6293b8abc1f36afb22406be5f96d893072a8cf3a",
-    # },
-    # {
-    #     # v2 deployed on Aug-14-2022
-    #     "address": "0x84D11B65E026F7aA08F5497dd3593fb083410B71",
-    # },
-    # {
-    #     # v3 deployed on Apr-08-2023
-    #     "address": "0x6d010C43d4e96D74C422f2e27370AF48711B49bF",
-    # },
-    # {
-    #     # v4 deployed on Jun-04-2024
-    #     "address": "0x09fbce43e4021a3f69c4599ff00362b83eda501e",
-    # },
-    {
-        # v5 deployed on Oct-12-2024
-        "address": "0xF82991Bd8976c243eB3b7CDDc52AB0Fc8dc1246C",
-    },
-    {
-        # v6 deployed on Feb-09-2026
-        "address": "0xe54B8C641fd96dE5D6747f47C19964c6b824D62C",
-    },
-    # For future upgrades/reference, you can find the latest RP contract
-    # versions here:
-    # https://docs.rocketpool.net/protocol/contracts-integrations#all-active-deployed-protocol-contracts
-]
 _NODE_MANAGER_ADDRESS = "0x89f478e6cc24f052103628f36598d4c14da3d287"
 _MINIPOOL_BOND_REDUCER_ADDRESS = "0xf7ab34c74c02407ed653ac9128731947187575c0"
 _NODE_DISTRIBUTOR_FACTORY_ADDRESS = "0xe228017f77b3e0785e794e4c0a8a6b935bb4037c"
 _STORAGE_ADDRESS = "0x1d8f8f00cfa6758d7bE78336684788Fb0ee0Fa46"
+# keccak256("contract.address" + contract name)
 _STORAGE_ROCKET_NODE_MANAGER_KEY = "af00be55c9fb8f543c04e0aa0d70351b880c1bfafffd15b60065a4a50c85ec94"
+_STORAGE_ROCKET_MINIPOOL_MANAGER_KEY = "e9dfec9339b94a131861a58f1bb4ac4c1ce55c7ffe8550e0b6ebcfde87bb012f"
+# Upgradeable contracts whose address history is tracked, by their RocketStorage name
+CONTRACT_STORAGE_KEYS = {
+    "rocketNodeManager": _STORAGE_ROCKET_NODE_MANAGER_KEY,
+    "rocketMinipoolManager": _STORAGE_ROCKET_MINIPOOL_MANAGER_KEY,
+}
+# Before the Rocket Pool mainnet deployment
+CONTRACT_ADDRESS_HISTORY_START_BLOCK = 13_300_000
+# Contract reads for this many minipools / nodes are made concurrently,
+# so that they end up in the same Multicall3 calls
+_CONTRACT_READS_CHUNK_SIZE = 100
 SMOOTHING_POOL_ADDRESS = "0xd4e96ef8eee8678dbff4d535e033ed1a4f7605b7"
 
+# Minipool found in a MinipoolCreated event
+NewMinipool = namedtuple(
+    "NewMinipool", ["node_address", "minipool_address", "minipool_manager_address", "creation_block_number"],
+)
+
+
+def _is_unset_address(address: str) -> bool:
+    # Before a contract is registered in RocketStorage (or deployed), getAddress returns nothing / 0x0
+    return address == "0x" or int(address, base=16) == 0
+
+
+class ContractAddressHistory:
+    """
+    The addresses a RocketStorage contract name resolved to, by the block they took effect at.
+    Covers blocks up to checked_up_to_block - the contract may have been upgraded since.
+    """
+    def __init__(self, changes: list[tuple[int, str]], checked_up_to_block: int) -> None:
+        self.changes = sorted(changes)
+        self._start_blocks = [start_block for start_block, _ in self.changes]
+        self.checked_up_to_block = checked_up_to_block
+
+    def covers(self, block_number: int) -> bool:
+        return block_number <= self.checked_up_to_block
+
+    def address_at(self, block_number: int) -> str | None:
+        i = bisect.bisect_right(self._start_blocks, block_number) - 1
+        if i < 0 or _is_unset_address(self.changes[i][1]):
+            return None
+        return self.changes[i][1]
+
+    def addresses_between(self, from_block_number: int, to_block_number: int) -> list[str]:
+        first = max(bisect.bisect_right(self._start_blocks, from_block_number) - 1, 0)
+        last = bisect.bisect_right(self._start_blocks, to_block_number)
+        return [address for _, address in self.changes[first:last] if not _is_unset_address(address)]
+
 
 class RocketPoolDataProvider:
-    def __init__(self, execution_node: ExecutionNode) -> None:
+    def __init__(
+        self,
+        execution_node: ExecutionNode,
+        contract_addresses: dict[str, ContractAddressHistory] | None = None,
+    ) -> None:
         self.execution_node = execution_node
+        self.multicall = Multicall(execution_node=execution_node)
+        # Contract name -> address history, as indexed by the Rocket Pool indexer
+        self.contract_addresses = contract_addresses if contract_addresses is not None else {}
+
+    async def _call(self, to: str, data: str, block_number: int = None, use_infura: bool = True) -> str:
+        # Concurrent calls at the same block are aggregated into a single Multicall3 call
+        return await self.multicall.call(to=to, data=data, block_number=block_number, use_infura=use_infura)
 
     async def get_minipool_node_fee(
             self,
             minipool_address: str,
             block_number: int = None
     ) -> int:
-        result = await self.execution_node.eth_call(
-            params=[
-                {
-                    "from": "0x0000000000000000000000000000000000000000",
-                    "to": minipool_address,
-                    "data": "0xe7150134",  # getNodeFee()
-                },
-                hex(block_number) if block_number else "latest",
-            ],
-            use_infura=True,
+        result = await self._call(
+            to=minipool_address,
+            data="0xe7150134",  # getNodeFee()
+            block_number=block_number,
         )
         return int(result, base=16)
 
@@ -78,16 +102,10 @@ class RocketPoolDataProvider:
         minipool_address: str,
         block_number: int = None
     ) -> int:
-        result = await self.execution_node.eth_call(
-            params=[
-                {
-                    "from": "0x0000000000000000000000000000000000000000",
-                    "to": minipool_address,
-                    "data": "0x74ca6bf2",  # getNodeDepositBalance()
-                },
-                hex(block_number) if block_number else "latest",
-            ],
-            use_infura=True,
+        result = await self._call(
+            to=minipool_address,
+            data="0x74ca6bf2",  # getNodeDepositBalance()
+            block_number=block_number,
         )
         return int(result, base=16)
 
@@ -97,40 +115,92 @@ class RocketPoolDataProvider:
         minipool_address: str,
     ) -> str:
         # getMinipoolPubkey(address _minipoolAddress)
-        resp = await self.execution_node.eth_call(
-            params=[
-                {
-                    "from": "0x0000000000000000000000000000000000000000",
-                    "to": minipool_manager_address,
-                    "data": f"0x3eb535e9000000000000000000000000{minipool_address[2:]}",
-                },
-                "latest"
-            ],
-            use_infura=True,
+        resp = await self._call(
+            to=minipool_manager_address,
+            data=f"0x3eb535e9000000000000000000000000{minipool_address[2:]}",
         )
         pubkey = resp[130:130 + 96]
         return f"0x{pubkey}"
 
     async def get_rocket_storage_value(self, key: str, block_number: int = None) -> Any:
-        raw = await self.execution_node.eth_call(
-            params=[
-                {
-                    "from": "0x0000000000000000000000000000000000000000",
-                    "to": _STORAGE_ADDRESS,
-                    "data": f"0x21f8a721{key}",  # getAddress(bytes32)
-                },
-                hex(block_number) if block_number else "latest",
-            ],
-            use_infura=True,
+        raw = await self._call(
+            to=_STORAGE_ADDRESS,
+            data=f"0x21f8a721{key}",  # getAddress(bytes32)
+            block_number=block_number,
         )
         return f"0x{raw[26:]}"
 
-    async def get_node_manager_for_block(self, block_number: int):
-        # TODO we could hardcode these for block ranges to save some RPC calls, at least for the
-        # no-longer-active contract addresses
-        return await self.get_rocket_storage_value(key=_STORAGE_ROCKET_NODE_MANAGER_KEY,
+    async def _find_address_changes(
+        self,
+        key: str,
+        from_block_number: int,
+        from_address: str,
+        to_block_number: int,
+        to_address: str,
+    ) -> list[tuple[int, str]]:
+        # Bisects the block range until the blocks the address changed at are found.
+        # Returns (block number, new address) for changes after from_block_number.
+        if from_address == to_address:
+            return []
+        if to_block_number - from_block_number == 1:
+            return [(to_block_number, to_address)]
+        mid_block_number = (from_block_number + to_block_number) // 2
+        mid_address = await self.get_rocket_storage_value(key=key, block_number=mid_block_number)
+        changes_before, changes_after = await asyncio.gather(
+            self._find_address_changes(key, from_block_number, from_address, mid_block_number, mid_address),
+            self._find_address_changes(key, mid_block_number, mid_address, to_block_number, to_address),
+        )
+        return changes_before + changes_after
+
+    async def get_contract_address_history(
+        self,
+        contract_name: str,
+        to_block_number: int,
+        known_history: ContractAddressHistory | None = None,
+    ) -> ContractAddressHistory:
+        """
+        Returns the contract's address history up to to_block_number, extending known_history if given.
+        """
+        key = CONTRACT_STORAGE_KEYS[contract_name]
+        if known_history is not None and known_history.changes:
+            changes = list(known_history.changes)
+            from_block_number = known_history.checked_up_to_block
+            from_address = changes[-1][1]
+        else:
+            from_block_number = CONTRACT_ADDRESS_HISTORY_START_BLOCK
+            from_address = await self.get_rocket_storage_value(key=key, block_number=from_block_number)
+            changes = [(from_block_number, from_address)]
+
+        to_address = await self.get_rocket_storage_value(key=key, block_number=to_block_number)
+        changes.extend(await self._find_address_changes(
+            key, from_block_number, from_address, to_block_number, to_address,
+        ))
+        return ContractAddressHistory(changes=changes, checked_up_to_block=to_block_number)
+
+    async def get_contract_address_for_block(self, contract_name: str, block_number: int) -> str:
+        history = self.contract_addresses.get(contract_name)
+        if history is not None and history.covers(block_number):
+            address = history.address_at(block_number)
+            if address is not None:
+                return address
+        # Not indexed (yet)
+        return await self.get_rocket_storage_value(key=CONTRACT_STORAGE_KEYS[contract_name],
                                                    block_number=block_number)
 
+    async def get_contract_addresses_between(
+        self,
+        contract_name: str,
+        from_block_number: int,
+        to_block_number: int,
+    ) -> list[str]:
+        history = self.contract_addresses.get(contract_name)
+        if history is None or not history.covers(to_block_number):
+            history = await self.get_contract_address_history(contract_name, to_block_number, known_history=history)
+        return history.addresses_between(from_block_number, to_block_number)
+
+    async def get_node_manager_for_block(self, block_number: int):
+        return await self.get_contract_address_for_block("rocketNodeManager", block_number)
+
     async def get_node_average_fee(
         self,
         node_address: str,
@@ -140,16 +210,10 @@ class RocketPoolDataProvider:
         node_manager_address = await self.get_node_manager_for_block(block_number)
 
         # Step 2 - get average fee from node manager address
-        result = await self.execution_node.eth_call(
-            params=[
-                {
-                    "from": "0x0000000000000000000000000000000000000000",
-                    "to": node_manager_address,
-                    "data": f"0x414dd1d2000000000000000000000000{node_address[2:]}",  # getAverageNodeFee(address)
-                },
-                hex(block_number) if block_number else "latest",
-            ],
-            use_infura=True,
+        result = await self._call(
+            to=node_manager_address,
+            data=f"0x414dd1d2000000000000000000000000{node_address[2:]}",  # getAverageNodeFee(address)
+            block_number=block_number,
         )
         return Decimal(int(result, base=16))
 
@@ -164,16 +228,10 @@ class RocketPoolDataProvider:
         print(f"Getting collateralization ratio using {node_staking_address}")
 
         # Step 2 - get collateralization ratio from node staking contract
-        result = await self.execution_node.eth_call(
-            params=[
-                {
-                    "from": "0x0000000000000000000000000000000000000000",
-                    "to": node_staking_address,
-                    "data": f"0x97be2143000000000000000000000000{node_address[2:]}",  # getNodeETHCollateralisationRatio(address)
-                },
-                hex(block_number) if block_number else "latest",
-            ],
-            use_infura=True,
+        result = await self._call(
+            to=node_staking_address,
+            data=f"0x97be2143000000000000000000000000{node_address[2:]}",  # getNodeETHCollateralisationRatio(address)
+            block_number=block_number,
         )
         return int(result, base=16)
 
@@ -182,16 +240,10 @@ class RocketPoolDataProvider:
         node_fee_distributor_address: str,
         block_number: int
     ) -> Decimal:
-        result = await self.execution_node.eth_call(
-            params=[
-                {
-                    "from": "0x0000000000000000000000000000000000000000",
-                    "to": node_fee_distributor_address,
-                    "data": "0x372d054b",  # getNodeShare()
-                },
-                hex(block_number)
-            ],
-            use_infura=True,
+        result = await self._call(
+            to=node_fee_distributor_address,
+            data="0x372d054b",  # getNodeShare()
+            block_number=block_number,
         )
         return Decimal(int(result, base=16))
 
@@ -200,16 +252,10 @@ class RocketPoolDataProvider:
         minipool_address: str,
         block_number: int = None
     ) -> Decimal:
-        result = await self.execution_node.eth_call(
-            params=[
-                {
-                    "from": "0x0000000000000000000000000000000000000000",
-                    "to": minipool_address,
-                    "data": "0x74ca6bf2",  # getNodeDepositBalance()
-                },
-                hex(block_number),
-            ],
-            use_infura=True,
+        result = await self._call(
+            to=minipool_address,
+            data="0x74ca6bf2",  # getNodeDepositBalance()
+            block_number=block_number,
         )
         return Decimal(int(result, base=16))
 
@@ -218,21 +264,22 @@ class RocketPoolDataProvider:
         minipool_address: str,
         block_number: int = None
     ) -> Decimal:
-        result = await self.execution_node.eth_call(
-            params=[
-                {
-                    "from": "0x0000000000000000000000000000000000000000",
-                    "to": minipool_address,
-                    "data": "0xe7e04aba",  # getUserDepositBalance()
-                },
-                hex(block_number),
-            ],
-            use_infura=True,
+        result = await self._call(
+            to=minipool_address,
+            data="0xe7e04aba",  # getUserDepositBalance()
+            block_number=block_number,
         )
         return Decimal(int(result, base=16))
 
-    async def get_reward_snapshots(self, start_at_period: int, from_block_number: int) -> list:
-        reward_snapshots = []
+    async def get_reward_snapshots(
+        self,
+        start_at_period: int,
+        from_block_number: int,
+        to_block_number: int,
+    ) -> list[tuple[int, str]]:
+        """
+        Returns (reward period index, local rewards tree path) for reward snapshots since start_at_period.
+        """
         # RewardSnapshot (
         #   index_topic_1 uint256 rewardIndex,
         #   tuple submission,
@@ -242,37 +289,25 @@ class RocketPoolDataProvider:
         # )
         logs = await self.execution_node.get_logs(
             address=None,
-            block_number_range=(from_block_number, await self.execution_node.get_block_number()),
+            block_number_range=(from_block_number, to_block_number),
             topics=[
                 "0x61caab0be2a0f10d869a5f437dab4535eb8e9c868b8c1fc68f3e5c10d0cd8f66"],
             use_infura=True,
         )
 
-        for log_item in logs:
-            reward_period_index = int(log_item['topics'][1][2:], base=16)
-            if reward_period_index < start_at_period:
-                continue
-
-            # Downloading from GitHub since IPFS CID no longer available on-chain
-            github_url = f"https://github.com/rocket-pool/rewards-trees/raw/main/mainnet/rp-rewards-mainnet-{reward_period_index}.json"
-            resp = requests.get(github_url)
-            if resp.status_code != 200:
-                raise ValueError(f"Received unexpected status code {resp.status_code} for {github_url} - reward index {reward_period_index} ({resp.text})")
-            data = resp.json()
-
-            reward_snapshots.append(
-                (reward_period_index, data["nodeRewards"], data["endTime"])
-            )
-
-        return reward_snapshots
+        reward_period_indexes = [int(log_item['topics'][1][2:], base=16) for log_item in logs]
+        reward_period_indexes = [i for i in reward_period_indexes if i >= start_at_period]
+        tree_paths = await download_rewards_trees(reward_period_indexes)
+        return list(zip(reward_period_indexes, tree_paths))
 
     async def get_bond_reductions(
         self,
         from_block_number: int,
         to_block_number: int,
+        minipool_address: str | None = None,
     ) -> list:
         logs = await self.execution_node.get_logs(
-            address=None,
+            address=minipool_address,
             block_number_range=(from_block_number, to_block_number),
             topics=["0x90e131460b9acb17565f1719b9ebc49998aec6b07a4743a09b1b700545769eb6"], # BondReduced
             use_infura=True,
@@ -303,19 +338,66 @@ class RocketPoolDataProvider:
 
         return bond_reductions
 
-    async def get_minipools(
+    async def _get_new_minipool(
+        self,
+        minipool_manager_address: str,
+        minipool_address: str,
+        creation_block_number: int,
+    ) -> tuple[str, int, int] | None:
+        logger.info(f"Processing minipool {minipool_address}")
+
+        try:
+            # Get the minipool's initial bond and fee values and its associated validator public key
+            initial_bond_value, initial_fee_value, pubkey = await asyncio.gather(
+                self.get_minipool_bond(
+                    minipool_address=minipool_address,
+                    block_number=creation_block_number,
+                ),
+                self.get_minipool_node_fee(
+                    minipool_address=minipool_address,
+                    block_number=creation_block_number,
+                ),
+                self.get_minipool_validator_pubkey(
+                    minipool_manager_address=minipool_manager_address,
+                    minipool_address=minipool_address
+                ),
+            )
+
+            if initial_bond_value == 32 * 1e18:
+                # Full Deposit Type - temporary option where NOs opted to provide the full
+                # 32ETH for a minipool when there was no ETH in the deposit pool.
+                # The NO would later get the 2nd 16ETH refunded.
+                # This deposit type is not used at the moment of writing.
+                # For the purposes of ethstaker.tax we can consider this the same way as if the
+                # bond was 16ETH from the beginning, since the NO only earned full rewards
+                # on 16ETH, on the rest they earned only commission-based rewards.
+                # Source - Discord, knoshua: "The latter, full on 16 plus commission, from the point of creation"
+                initial_bond_value = 16 * 1e18
+
+            assert initial_fee_value > 0
+
+            return pubkey, initial_bond_value, initial_fee_value
+        except Exception as e:
+            logger.error(f"Error processing minipool {minipool_address}! Exception: {e}")
+            return None
+
+    async def get_new_minipools(
         self,
-        known_node_addresses: list[str],
-        known_minipool_addresses: list[str],
+        known_minipool_addresses: set[str],
         from_block_number: int,
         to_block_number: int,
-    ) -> dict[str, list[tuple[str, str, int, int]]]:
-        minipools_per_node = defaultdict(list)
-
-        for minipool_manager in _MINIPOOL_MANAGER_ADDRESSES:
+    ) -> list[NewMinipool]:
+        """
+        Returns the minipools created between from_block_number and to_block_number that are not known yet.
+        """
+        new_minipools = []
+        minipool_manager_addresses = await self.get_contract_addresses_between(
+            "rocketMinipoolManager", from_block_number, to_block_number,
+        )
+        for minipool_manager_address in minipool_manager_addresses:
             # Get all emitted "MinipoolCreated" events
             events = await self.execution_node.get_logs(
-                address=minipool_manager["address"],
+                address=minipool_manager_address,
                 block_number_range=(from_block_number, to_block_number),
                 topics=[
                     "0x08b4b91bafaf992145c5dd7e098dfcdb32f879714c154c651c2758a44c7aeae4"  # MinipoolCreated
@@ -332,85 +414,82 @@ class RocketPoolDataProvider:
                     logger.debug(f"Skipping {minipool_address}, already known")
                     continue
 
-                if node_address not in known_node_addresses:
-                    logger.warning(f"Skipping {minipool_address}, its node address {node_address} is not known yet")
+                new_minipools.append(NewMinipool(
+                    node_address=node_address,
+                    minipool_address=minipool_address,
+                    minipool_manager_address=minipool_manager_address,
+                    creation_block_number=int(minipool_creation_event["blockNumber"], base=16),
+                ))
+        return new_minipools
+
+    async def get_minipools(
+        self,
+        known_node_addresses: set[str],
+        new_minipools: list[NewMinipool],
+    ) -> tuple[dict[str, list[tuple[str, str, int, int]]], list[NewMinipool]]:
+        """
+        Returns the data of the new minipools per node address, and the minipools that could not be
+        resolved - because their node is not known yet or because their data could not be read.
+        """
+        minipools_per_node = defaultdict(list)
+        unresolved_minipools = []
+
+        readable_minipools = []
+        for new_minipool in new_minipools:
+            if new_minipool.node_address not in known_node_addresses:
+                logger.warning(f"Skipping {new_minipool.minipool_address},"
+                               f" its node address {new_minipool.node_address} is not known yet")
+                unresolved_minipools.append(new_minipool)
+                continue
+            readable_minipools.append(new_minipool)
+
+        for i in range(0, len(readable_minipools), _CONTRACT_READS_CHUNK_SIZE):
+            chunk = readable_minipools[i:i + _CONTRACT_READS_CHUNK_SIZE]
+            minipool_data = await asyncio.gather(*[
+                self._get_new_minipool(
+                    minipool_manager_address=new_minipool.minipool_manager_address,
+                    minipool_address=new_minipool.minipool_address,
+                    creation_block_number=new_minipool.creation_block_number,
+                )
+                for new_minipool in chunk
+            ])
+            for new_minipool, data in zip(chunk, minipool_data):
+                if data is None:
+                    unresolved_minipools.append(new_minipool)
                     continue
+                pubkey, initial_bond_value, initial_fee_value = data
+                minipools_per_node[new_minipool.node_address].append((new_minipool.minipool_address, pubkey,
+                                                                      initial_bond_value,
+                                                                      initial_fee_value))
+        return minipools_per_node, unresolved_minipools
+
+    async def get_node_fee_distributor(self, node_address: str) -> str:
+        res = await self._call(
+            to=_NODE_DISTRIBUTOR_FACTORY_ADDRESS,
+            data=f"0xfa2a5b01000000000000000000000000{node_address[2:]}",  # getProxyAddress(address)
+            use_infura=False,
+        )
+        return f"0x{res[26:]}"
 
-                logger.info(f"Processing minipool {minipool_address}")
-
-                try:
-                    # Get the minipool's initial bond and fee values
-                    initial_bond_value = await self.get_minipool_bond(
-                        minipool_address=minipool_address,
-                        block_number=int(minipool_creation_event["blockNumber"],
-                                         base=16))
-
-                    if initial_bond_value == 32 * 1e18:
-                        # Full Deposit Type - temporary option where NOs opted to provide the full
-                        # 32ETH for a minipool when there was no ETH in the deposit pool.
-                        # The NO would later get the 2nd 16ETH refunded.
-                        # This deposit type is not used at the moment of writing.
-                        # For the purposes of ethstaker.tax we can consider this the same way as if the
-                        # bond was 16ETH from the beginning, since the NO only earned full rewards
-                        # on 16ETH, on the rest they earned only commission-based rewards.
-                        # Source - Discord, knoshua: "The latter, full on 16 plus commission, from the point of creation"
-                        initial_bond_value = 16 * 1e18
-
-                    initial_fee_value = await self.get_minipool_node_fee(
-                        minipool_address=minipool_address,
-                        block_number=int(minipool_creation_event["blockNumber"],
-                                         base=16))
-
-                    assert initial_fee_value > 0
-
-                    # Get the minipool's associated validator public key
-                    pubkey = await self.get_minipool_validator_pubkey(
-                        minipool_manager_address=minipool_manager["address"],
-                        minipool_address=minipool_address
-                    )
-
-                    minipools_per_node[node_address].append((minipool_address, pubkey,
-                                                             initial_bond_value,
-                                                             initial_fee_value))
-
-                except Exception as e:
-                    logger.error(f"Error processing minipool {minipool_address}! Exception: {e}")
-        return minipools_per_node
-
-    async def get_nodes(self, known_node_addresses: list[str], block_number: int) -> list[tuple[str, str]]:
+    async def get_nodes(self, known_node_addresses: set[str], block_number: int) -> list[tuple[str, str]]:
         nodes = []
 
-        resp = await self.execution_node.eth_call(
-            params=[
-                {
-                    "from": "0x0000000000000000000000000000000000000000",
-                    "to": _NODE_MANAGER_ADDRESS,
-                    "data": f"0x2d7f21d000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000",
-                },
-                hex(block_number)
-            ],
+        resp = await self._call(
+            to=_NODE_MANAGER_ADDRESS,
+            data=f"0x2d7f21d000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000",
+            block_number=block_number,
             use_infura=False,
         )
         node_addresses_string = resp[130:]
         n = 64
         node_addresses = [f"0x{node_addresses_string[i+24:i+n]}" for i in range(0, len(node_addresses_string), n)]
+        new_node_addresses = [a for a in node_addresses if a not in known_node_addresses]
 
         # Get node fee distributor contract (collects EL rewards)
-        for node_address in node_addresses:
-            if node_address in known_node_addresses:
-                continue
-
-            res = await self.execution_node.eth_call(
-                params=[
-                    {
-                        "from": "0x0000000000000000000000000000000000000000",
-                        "to": _NODE_DISTRIBUTOR_FACTORY_ADDRESS,
-                        "data": f"0xfa2a5b01000000000000000000000000{node_address[2:]}",
-                    },
-                    "latest"
-                ],
-                use_infura=False,
-            )
-            fee_distributor_address = f"0x{res[26:]}"
-            nodes.append((node_address, fee_distributor_address))
+        for i in range(0, len(new_node_addresses), _CONTRACT_READS_CHUNK_SIZE):
+            chunk = new_node_addresses[i:i + _CONTRACT_READS_CHUNK_SIZE]
+            fee_distributor_addresses = await asyncio.gather(*[
+                self.get_node_fee_distributor(node_address) for node_address in chunk
+            ])
+            nodes.extend(zip(chunk, fee_distributor_addresses))
         return nodes
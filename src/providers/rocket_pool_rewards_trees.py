@@ -0,0 +1,149 @@
+"""
+Downloads Rocket Pool rewards trees (rp-rewards-mainnet-N.json) into a local file cache
+and reads them back as a stream.
+
+Rewards trees never change once they are published, so each one is downloaded only once.
+The trees are several MB in size - reading them as a stream means only a single node's
+rewards are held in memory at a time.
+"""
+import asyncio
+import json
+import logging
+import os
+import tempfile
+from typing import Any, IO, Iterator
+
+import aiofiles
+from httpx import AsyncClient
+
+logger = logging.getLogger(__name__)
+
+REWARDS_TREE_CACHE_DIR = os.getenv("ROCKET_POOL_REWARDS_TREE_CACHE_DIR") or os.path.join(
+    tempfile.gettempdir(), "rp-rewards-trees"
+)
+# Downloading from GitHub since IPFS CID no longer available on-chain
+_REWARDS_TREE_URL = "https://github.com/rocket-pool/rewards-trees/raw/main/mainnet/rp-rewards-mainnet-{index}.json"
+_MAX_CONCURRENT_DOWNLOADS = 4
+_READ_CHUNK_SIZE = 64 * 1024
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_VALUE_DELIMITERS = _WHITESPACE + ",:]}"
+
+
+def rewards_tree_path(reward_period_index: int) -> str:
+    return os.path.join(REWARDS_TREE_CACHE_DIR, f"rp-rewards-mainnet-{reward_period_index}.json")
+
+
+async def _download_rewards_tree(client: AsyncClient, reward_period_index: int) -> str:
+    path = rewards_tree_path(reward_period_index)
+    if os.path.exists(path):
+        return path
+
+    url = _REWARDS_TREE_URL.format(index=reward_period_index)
+    logger.info(f"Downloading rewards tree {reward_period_index}")
+    partial_path = f"{path}.part"
+    async with client.stream("GET", url) as resp:
+        if resp.status_code != 200:
+            await resp.aread()
+            raise ValueError(f"Received unexpected status code {resp.status_code} for {url} - reward index {reward_period_index} ({resp.text})")
+        async with aiofiles.open(partial_path, "wb") as f:
+            async for chunk in resp.aiter_bytes():
+                await f.write(chunk)
+    # Only complete downloads end up in the cache
+    os.replace(partial_path, path)
+    return path
+
+
+async def download_rewards_trees(reward_period_indexes: list[int]) -> list[str]:
+    """
+    Returns the local paths of the rewards trees, downloading those that are not cached yet.
+    """
+    os.makedirs(REWARDS_TREE_CACHE_DIR, exist_ok=True)
+    semaphore = asyncio.Semaphore(_MAX_CONCURRENT_DOWNLOADS)
+
+    async with AsyncClient(follow_redirects=True, timeout=60) as client:
+        async def _download(reward_period_index: int) -> str:
+            async with semaphore:
+                return await _download_rewards_tree(client, reward_period_index)
+
+        return await asyncio.gather(*[_download(index) for index in reward_period_indexes])
+
+
+class _JsonObjectStream:
+    """
+    Minimal incremental reader for JSON objects - iterates over an object's keys, the caller
+    reads each key's value (or iterates over it as a nested object) before moving on to the next key.
+    """
+    def __init__(self, f: IO[str], chunk_size: int = _READ_CHUNK_SIZE) -> None:
+        self._f = f
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        chunk = self._f.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON document")
+
+    def _expect(self, chars: str) -> str:
+        char = self._peek()
+        if char not in chars:
+            raise ValueError(f"Expected one of {chars!r} in JSON document, found {char!r}")
+        self._pos += 1
+        return char
+
+    def value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number cut off by the end of the buffer (e.g. "1500" of "1500.0") continues in the next chunk
+            if (end == len(self._buffer) or self._buffer[end] not in _VALUE_DELIMITERS) and not self._eof and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def keys(self) -> Iterator[str]:
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            self._expect(":")
+            yield key
+            if self._expect(",}") == "}":
+                return
+
+
+def iter_rewards_tree(f: IO[str], chunk_size: int = _READ_CHUNK_SIZE) -> Iterator[tuple[tuple[str, ...], Any]]:
+    """
+    Yields the top-level fields of a rewards tree as ((key,), value) and
+    every node's rewards separately as (("nodeRewards", node_address), node_rewards).
+    """
+    stream = _JsonObjectStream(f, chunk_size=chunk_size)
+    for key in stream.keys():
+        if key == "nodeRewards":
+            for node_address in stream.keys():
+                yield (key, node_address), stream.value()
+        else:
+            yield (key,), stream.value()
@@ -0,0 +1,29 @@
+import datetime
+from decimal import Decimal
+
+import numpy as np
+
+from api.api_v1.models import BalanceAtSlot
+from api.api_v2.models import RewardForDate, ValidatorRewards
+from api.responses import encode_json
+
+
+def test_encode_json():
+    assert encode_json(ValidatorRewards.construct(
+        validator_index=123,
+        consensus_layer_rewards=[RewardForDate.construct(date=datetime.date(2023, 4, 12), amount_wei=2 ** 70)],
+        execution_layer_rewards=[],
+        withdrawals=[RewardForDate(date=datetime.date(2023, 4, 13), amount_wei=-32 * 10 ** 18)],
+    )) == (
+        b'{"validator_index":123,'
+        b'"consensus_layer_rewards":[{"date":"2023-04-12","amount_wei":1180591620717411303424}],'
+        b'"execution_layer_rewards":[],'
+        b'"withdrawals":[{"date":"2023-04-13","amount_wei":-32000000000000000000}]}'
+    )
+
+
+def test_encode_json_decimals():
+    # Decimals keep all of their digits
+    assert encode_json(BalanceAtSlot(date=datetime.date(2023, 4, 12), slot=6_209_998, balance=Decimal("34.247005602123456789"))) \
+           == b'{"date":"2023-04-12","slot":6209998,"balance":34.247005602123456789}'
+    assert encode_json({datetime.date(2023, 4, 12): np.float64(1920.5)}) == b'{"2023-04-12":1920.5}'
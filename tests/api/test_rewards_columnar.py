@@ -0,0 +1,78 @@
+import datetime
+
+import numpy as np
+import pyarrow as pa
+
+from api.rewards_columnar import RewardsMatrix
+from api.rewards_engine import DailyAmounts, slot_days
+
+# Last slots of 2023-04-12, 2023-04-13 and 2023-04-14
+EOD_SLOTS = [6_209_998, 6_217_198, 6_224_398]
+DAYS = slot_days(np.array(EOD_SLOTS))
+
+
+def _amounts(validator_indexes: list[int], day_offsets: list[int], amounts_wei: list[int], verified: list[bool] | None = None) -> DailyAmounts:
+    amounts = np.empty(len(amounts_wei), dtype=object)
+    amounts[:] = amounts_wei
+    return DailyAmounts(
+        validator_indexes=np.array(validator_indexes, dtype=np.int64),
+        days=DAYS[0] + np.array(day_offsets, dtype=np.int64),
+        amounts_wei=amounts,
+        verified=np.array(verified) if verified is not None else None,
+    )
+
+
+def _rewards_matrix() -> RewardsMatrix:
+    return RewardsMatrix.from_daily_amounts(
+        validator_indexes=[1, 2],
+        days=DAYS,
+        # Validator 2 was activated on the second day
+        consensus_layer_rewards=_amounts([1, 1, 1, 2, 2], [0, 1, 2, 1, 2], [3, -1, 5, 7, 2 ** 70]),
+        # Validator 3 was not requested
+        execution_layer_rewards=_amounts([2, 3], [2, 0], [42_002_960_893_000_000_000, 1], verified=[False, True]),
+        withdrawals=_amounts([1], [1], [32 * 10 ** 18]),
+    )
+
+
+def test_columnar_json():
+    assert _rewards_matrix().to_json() == (
+        b'{"dates":["2023-04-12","2023-04-13","2023-04-14"],"validator_indexes":[1,2],'
+        b'"consensus_layer_rewards_wei":[[3,-1,5],[null,7,1180591620717411303424]],'
+        b'"execution_layer_rewards_wei":[[0,0,0],[0,0,42002960893000000000]],'
+        b'"execution_layer_rewards_verified":[[true,true,true],[true,true,false]],'
+        b'"withdrawals_wei":[[0,32000000000000000000,0],[0,0,0]]}'
+    )
+
+
+def test_arrow_ipc():
+    table = pa.ipc.open_stream(_rewards_matrix().to_arrow_ipc()).read_all()
+
+    assert table.column("validator_index").to_pylist() == [1, 1, 1, 2, 2, 2]
+    assert table.column("date").to_pylist() == [datetime.date(2023, 4, 12), datetime.date(2023, 4, 13), datetime.date(2023, 4, 14)] * 2
+    assert table.column("consensus_layer_reward_wei").to_pylist() == [3, -1, 5, None, 7, 2 ** 70]
+    assert table.column("execution_layer_reward_wei").to_pylist() == [0, 0, 0, 0, 0, 42_002_960_893_000_000_000]
+    assert table.column("execution_layer_reward_verified").to_pylist() == [True] * 5 + [False]
+    assert table.column("withdrawal_wei").to_pylist() == [0, 32 * 10 ** 18, 0, 0, 0, 0]
+
+
+def test_no_days():
+    # E.g. a period that starts today - capped to the day before, no day is left
+    no_days = np.array([], dtype=np.int64)
+    rewards_matrix = RewardsMatrix.from_daily_amounts(
+        validator_indexes=[1, 2],
+        days=no_days,
+        consensus_layer_rewards=_amounts([], [], []),
+        execution_layer_rewards=_amounts([], [], [], verified=[]),
+        withdrawals=_amounts([], [], []),
+    )
+
+    assert rewards_matrix.to_json() == (
+        b'{"dates":[],"validator_indexes":[1,2],"consensus_layer_rewards_wei":[[],[]],'
+        b'"execution_layer_rewards_wei":[[],[]],"execution_layer_rewards_verified":[[],[]],"withdrawals_wei":[[],[]]}'
+    )
+    table = pa.ipc.open_stream(rewards_matrix.to_arrow_ipc()).read_all()
+    assert table.num_rows == 0
+    assert table.column_names == [
+        "validator_index", "date", "consensus_layer_reward_wei", "execution_layer_reward_wei",
+        "execution_layer_reward_verified", "withdrawal_wei",
+    ]
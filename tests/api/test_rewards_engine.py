@@ -0,0 +1,67 @@
+import datetime
+
+import numpy as np
+
+from api.rewards_engine import BalanceArrays, BlockRewardArrays, WithdrawalArrays, \
+    compute_consensus_layer_rewards, compute_execution_layer_rewards
+
+# Last slots of 2023-04-12, 2023-04-13 and 2023-04-14
+EOD_SLOTS = [6_209_998, 6_217_198, 6_224_398]
+
+
+def _balances(rows: list[tuple[int, int, int]]) -> BalanceArrays:
+    return BalanceArrays.from_rows(rows)
+
+
+def test_compute_consensus_layer_rewards():
+    rewards, withdrawals = compute_consensus_layer_rewards(
+        initial_balances=_balances([(1, 6_202_798, 32_000_000_000), (2, 6_214_000, 32_000_000_000)]),
+        activation_slots={1: 6_000_000, 2: 6_214_000},
+        eod_balances=_balances([
+            (2, EOD_SLOTS[2], 32_000_004_000),
+            (1, EOD_SLOTS[0], 32_002_000_000),
+            # Before validator 2 was activated
+            (2, EOD_SLOTS[0], 0),
+            (1, EOD_SLOTS[1], 32_000_000_000),
+            (2, EOD_SLOTS[1], 32_000_001_000),
+            (1, EOD_SLOTS[2], 32_003_000_000),
+        ]),
+        withdrawals=WithdrawalArrays(
+            validator_indexes=np.array([1, 1]),
+            slots=np.array([EOD_SLOTS[1], EOD_SLOTS[0] + 1]),
+            amounts_gwei=np.array([1_000_000, 3_000_000]),
+        ),
+    )
+
+    assert rewards.by_validator() == {
+        1: [
+            (datetime.date(2023, 4, 12), 2_000_000 * 10 ** 9),
+            (datetime.date(2023, 4, 13), 2_000_000 * 10 ** 9),
+            (datetime.date(2023, 4, 14), 3_000_000 * 10 ** 9),
+        ],
+        2: [
+            (datetime.date(2023, 4, 13), 1_000 * 10 ** 9),
+            (datetime.date(2023, 4, 14), 3_000 * 10 ** 9),
+        ],
+    }
+    assert withdrawals.by_validator() == {
+        1: [(datetime.date(2023, 4, 13), 4_000_000 * 10 ** 9)],
+    }
+
+
+def test_compute_execution_layer_rewards():
+    amounts_wei = np.empty(3, dtype=object)
+    amounts_wei[:] = [42_002_960_893_000_000_000, 1, 29_608_930_218_000_000]
+    rewards = compute_execution_layer_rewards(BlockRewardArrays(
+        proposer_indexes=np.array([123, 123, 123]),
+        slots=np.array([EOD_SLOTS[2], EOD_SLOTS[0], EOD_SLOTS[0] - 100]),
+        amounts_wei=amounts_wei,
+        verified=np.array([True, False, True]),
+    ))
+
+    assert rewards.by_validator() == {
+        123: [
+            (datetime.date(2023, 4, 12), 29_608_930_218_000_001, False),
+            (datetime.date(2023, 4, 14), 42_002_960_893_000_000_000, True),
+        ],
+    }
@@ -0,0 +1,25 @@
+import pytest
+
+from api.rewards_stream import ValidatorOrderedRows
+
+
+async def _partitions(partitions: list[list[tuple]]):
+    for partition in partitions:
+        yield partition
+
+
+@pytest.mark.asyncio
+async def test_validator_ordered_rows():
+    rows = ValidatorOrderedRows(_partitions([
+        [(1, 10), (1, 20), (2, 10)],
+        [(2, 20), (4, 10)],
+        [(4, 20), (7, 10)],
+    ]))
+
+    assert await rows.take_up_to(0) == []
+    # Rows of a validator can span partitions
+    assert await rows.take_up_to(2) == [(1, 10), (1, 20), (2, 10), (2, 20)]
+    assert await rows.take_up_to(3) == []
+    assert await rows.take_up_to(5) == [(4, 10), (4, 20)]
+    assert await rows.take_up_to(10) == [(7, 10)]
+    assert await rows.take_up_to(11) == []
@@ -0,0 +1,61 @@
+import datetime
+
+import pytest
+
+from db.db_helpers import session_scope
+from db.tables import Balance
+from indexer import balances
+from providers.beacon_node import BeaconNode
+
+ACTIVATED_VALIDATOR_INDEX = 1_000_000
+# Activated within the backfill lane
+ACTIVATION_SLOT = BeaconNode.head_slot() - 20 * 7200
+
+
+class _StubBeaconNode(BeaconNode):
+    activation_lookups = 0
+
+    def __init__(self) -> None:
+        pass
+
+    async def activation_slots_for_validators(self, validator_indexes, cache) -> dict[int, int | None]:
+        _StubBeaconNode.activation_lookups += 1
+        return {ACTIVATED_VALIDATOR_INDEX: ACTIVATION_SLOT, 1_000_001: None}
+
+    async def is_slot_finalized(self, slot: int) -> bool:
+        return True
+
+    async def balances_for_slot(self, slot: int, validator_indexes=None) -> list[Balance]:
+        return [
+            Balance(slot=slot, validator_index=validator_index, balance=32)
+            for validator_index in (validator_indexes or [0])
+        ]
+
+
+@pytest.fixture
+def _stubbed_beacon_node(monkeypatch):
+    monkeypatch.setattr(balances, "BeaconNode", _StubBeaconNode)
+    monkeypatch.setattr(balances, "ALREADY_INDEXED_SLOTS", [])
+    monkeypatch.setattr(balances, "START_DATE", (datetime.date.today() - datetime.timedelta(days=30)).isoformat())
+    with session_scope() as session:
+        session.query(Balance).delete()
+    yield
+    with session_scope() as session:
+        session.query(Balance).delete()
+
+
+@pytest.mark.usefixtures("_stubbed_beacon_node")
+@pytest.mark.asyncio
+async def test_index_balances():
+    # The whole backlog - several backfill batches - is indexed in a single run
+    await balances.index_balances()
+
+    eod_slots = balances._eod_slots(_StubBeaconNode())
+    assert len(eod_slots) > 2 * balances.BACKFILL_BATCH_SIZE
+    assert _StubBeaconNode.activation_lookups == 1
+    with session_scope() as session:
+        indexed = set(session.query(Balance.slot, Balance.validator_index))
+    assert {slot for slot, _ in indexed} == eod_slots | {ACTIVATION_SLOT}
+    assert (ACTIVATION_SLOT, ACTIVATED_VALIDATOR_INDEX) in indexed
+    assert len(balances.BACKFILL_LANE) == 0
+    assert len(balances.HEAD_LANE) == 0
@@ -0,0 +1,90 @@
+import pytest
+
+from db.db_helpers import session_scope
+from db.tables import BlockReward, BlockRewardInput
+from indexer.block_rewards import block_inputs, main, reclassify
+from indexer.block_rewards.block_inputs import BlockInputs, ReplayExecutionNode
+from indexer.block_rewards.block_rewards_mev_simple import get_block_reward_value
+from providers.beacon_node import SlotProposerData
+from providers.mev_relay import DeliveredPayloadsResponse
+
+SLOT = 8_000_000
+BLOCK_NUMBER = 20_000_000
+FEE_RECIPIENT = "0x" + "fe" * 20
+BUILDER = "0x" + "b0" * 20
+MEV_REWARD = 50_000_000_000_000_000
+SLOT_PROPOSER_DATA = SlotProposerData(
+    slot=SLOT, proposer_index=1, fee_recipient=FEE_RECIPIENT, block_number=BLOCK_NUMBER, block_hash="0x" + "ab" * 32,
+)
+
+
+class _StubExecutionNode:
+    """
+    A block with a single tx - the builder paying the MEV reward to the fee recipient.
+    """
+    async def get_block(self, block_number: int, verbose=False) -> dict:
+        tx = {"hash": "0x01", "from": BUILDER, "to": FEE_RECIPIENT, "value": hex(MEV_REWARD), "nonce": "0x5"}
+        return {
+            "number": hex(block_number), "miner": BUILDER, "extraData": "0x", "baseFeePerGas": "0x7", "gasUsed": "0x5208",
+            "transactions": [tx if verbose else tx["hash"]],
+        }
+
+    async def get_block_receipts(self, block_number: int, use_infura: bool = True) -> list[dict]:
+        return [{"gasUsed": "0x5208", "effectiveGasPrice": "0x9", "status": "0x1"}]
+
+    async def get_balance(self, address: str, block_number: int, use_infura=False) -> int:
+        return 10**18 + (MEV_REWARD if block_number == BLOCK_NUMBER else 0)
+
+
+async def _get_relay_payload(block_hash: str) -> DeliveredPayloadsResponse | None:
+    return DeliveredPayloadsResponse(
+        slot=SLOT, block_hash=block_hash, builder_pubkey="0x01", proposer_fee_recipient=FEE_RECIPIENT,
+        value=MEV_REWARD, block_number=BLOCK_NUMBER,
+    )
+
+
+@pytest.fixture
+def _clean_block_rewards():
+    yield
+    with session_scope() as session:
+        session.query(BlockRewardInput).filter(BlockRewardInput.slot == SLOT).delete()
+        session.query(BlockReward).filter(BlockReward.slot == SLOT).delete()
+
+
+@pytest.mark.usefixtures("_clean_block_rewards")
+@pytest.mark.asyncio
+async def test_record_and_reclassify(monkeypatch, db_provider):
+    monkeypatch.setattr(main, "RECORD_INPUTS", True)
+    monkeypatch.setattr(block_inputs, "get_relay_payload", _get_relay_payload)
+
+    assert await main._index_slot(SLOT_PROPOSER_DATA, execution_node=_StubExecutionNode(), db_provider=db_provider)
+
+    with session_scope() as session:
+        stored = session.query(BlockReward).filter(BlockReward.slot == SLOT).one()
+        assert stored.mev
+        assert stored.mev_reward_recipient == FEE_RECIPIENT
+        assert stored.mev_reward_value_wei == MEV_REWARD
+        stored_priority_fees_wei = stored.priority_fees_wei
+        recorded = session.query(BlockRewardInput).filter(BlockRewardInput.slot == SLOT).one().data
+
+    # Replayed offline - the same block reward from the recorded inputs only
+    inputs = BlockInputs.decode(recorded)
+    assert inputs.slot_proposer_data == SLOT_PROPOSER_DATA
+    replay_node = ReplayExecutionNode(inputs)
+    block_reward_value = await get_block_reward_value(
+        slot_proposer_data=inputs.slot_proposer_data,
+        execution_node=replay_node,
+        db_provider=db_provider,
+        relay_payload_source=replay_node.get_relay_payload,
+    )
+    assert block_reward_value.contains_mev
+    assert block_reward_value.mev_recipient == FEE_RECIPIENT
+    assert block_reward_value.mev_recipient_balance_change == MEV_REWARD
+    assert block_reward_value.block_priority_tx_fees == stored_priority_fees_wei
+
+    assert await reclassify._reclassify_slots(SLOT, SLOT) == (1, [])
+
+
+def test_block_inputs_execution_node_requires_input():
+    with pytest.raises(TypeError):
+        block_inputs._BlockInputsExecutionNode(BlockInputs())
@@ -0,0 +1,54 @@
+import datetime
+
+import pytz
+
+from db.db_helpers import session_scope
+from db.tables import BlockRewardLease
+from indexer.block_rewards.leases import ensure_leases, claim_lease, heartbeat_lease, release_lease
+
+RUN = "test-leases"
+
+
+def _lease(range_start: int) -> BlockRewardLease:
+    with session_scope() as session:
+        lease = session.get(BlockRewardLease, (RUN, range_start))
+        session.expunge(lease)
+    return lease
+
+
+def test_leases():
+    with session_scope() as session:
+        session.query(BlockRewardLease).filter(BlockRewardLease.run == RUN).delete()
+
+    ensure_leases(run=RUN, start_slot=105, end_slot=330, range_size=100)
+    # Existing leases are left untouched
+    ensure_leases(run=RUN, start_slot=105, end_slot=330, range_size=100)
+    with session_scope() as session:
+        assert [(l.range_start, l.range_end) for l in session.query(BlockRewardLease).filter(BlockRewardLease.run == RUN).order_by(BlockRewardLease.range_start)] \
+               == [(100, 199), (200, 299), (300, 399)]
+
+    # Leases reaching the preferred slot first, then the oldest
+    assert claim_lease(run=RUN, owner="a", prefer_from_slot=250) == (200, 299)
+    assert claim_lease(run=RUN, owner="b", prefer_from_slot=250, skip_range_starts=[300]) == (100, 199)
+    assert claim_lease(run=RUN, owner="c", prefer_from_slot=250) == (300, 399)
+    assert claim_lease(run=RUN, owner="d") is None
+
+    assert heartbeat_lease(run=RUN, range_start=200, owner="a")
+    assert not heartbeat_lease(run=RUN, range_start=200, owner="b")
+
+    # Completed leases are done for good, others can be claimed again
+    release_lease(run=RUN, range_start=200, owner="a", completed=True)
+    release_lease(run=RUN, range_start=300, owner="c", completed=False)
+    assert _lease(200).completed and _lease(200).owner is None
+    assert not _lease(300).completed and _lease(300).owner is None
+    assert claim_lease(run=RUN, owner="d", skip_range_starts=[300]) is None
+    assert claim_lease(run=RUN, owner="d") == (300, 399)
+
+    # Expired leases are reclaimed, the previous owner's heartbeats fail from then on
+    with session_scope() as session:
+        session.query(BlockRewardLease).filter(BlockRewardLease.run == RUN, BlockRewardLease.range_start == 100).update({
+            BlockRewardLease.expires_at: datetime.datetime.now(tz=pytz.UTC) - datetime.timedelta(seconds=1),
+        })
+    assert claim_lease(run=RUN, owner="e") == (100, 199)
+    assert not heartbeat_lease(run=RUN, range_start=100, owner="b")
+    assert heartbeat_lease(run=RUN, range_start=100, owner="e")
@@ -0,0 +1,198 @@
+import asyncio
+import datetime
+
+import pytest
+import pytz
+
+from db.db_helpers import session_scope
+from db.tables import BlockReward, BlockRewardLease
+from indexer.block_rewards import main
+from providers.beacon_node import SlotProposerData
+
+HEAD_FINALIZED = main.START_SLOT + 30
+
+
+class _StubBeaconNode:
+    async def head_finalized(self) -> int:
+        return HEAD_FINALIZED
+
+    async def is_slot_finalized(self, slot: int) -> bool:
+        return slot <= HEAD_FINALIZED
+
+    async def get_slot_proposer_data(self, slot: int) -> SlotProposerData:
+        # Missed slots - no execution layer data needed to index them
+        return SlotProposerData(slot=slot, proposer_index=None, fee_recipient=None, block_number=None, block_hash=None)
+
+
+class _StubExecutionNode:
+    pass
+
+
+@pytest.fixture
+def _stubbed_nodes(monkeypatch):
+    monkeypatch.setattr(main, "BeaconNode", _StubBeaconNode)
+    monkeypatch.setattr(main, "ExecutionNode", _StubExecutionNode)
+    monkeypatch.setattr(main, "ALREADY_INDEXED_SLOTS", set())
+    with session_scope() as session:
+        session.query(BlockReward).delete()
+    yield
+    with session_scope() as session:
+        session.query(BlockReward).delete()
+
+
+def _indexed_slots() -> list[int]:
+    with session_scope() as session:
+        return sorted(s for s, in session.query(BlockReward.slot).all())
+
+
+@pytest.mark.usefixtures("_stubbed_nodes")
+@pytest.mark.asyncio
+async def test_index_block_rewards(monkeypatch):
+    # Both the head and the backfill lane get some slots
+    monkeypatch.setattr(main, "HEAD_LANE_SLOTS", 10)
+    monkeypatch.setattr(main, "USE_LEASES", False)
+
+    await main.index_block_rewards()
+
+    assert _indexed_slots() == list(range(main.START_SLOT, HEAD_FINALIZED))
+
+
+@pytest.fixture
+def _leases(monkeypatch):
+    monkeypatch.setattr(main, "USE_LEASES", True)
+    monkeypatch.setattr(main, "LEASE_RUN", "test-indexer")
+    monkeypatch.setattr(main, "LEASE_RANGE_SIZE", 10)
+    with session_scope() as session:
+        session.query(BlockRewardLease).filter(BlockRewardLease.run == "test-indexer").delete()
+    yield
+    with session_scope() as session:
+        session.query(BlockRewardLease).filter(BlockRewardLease.run == "test-indexer").delete()
+
+
+def _leases_state() -> list[tuple[int, bool, str | None]]:
+    with session_scope() as session:
+        return [
+            (lease.range_start, lease.completed, lease.owner)
+            for lease in session.query(BlockRewardLease).filter(BlockRewardLease.run == "test-indexer").order_by(BlockRewardLease.range_start)
+        ]
+
+
+@pytest.mark.usefixtures("_stubbed_nodes", "_leases")
+@pytest.mark.asyncio
+async def test_index_block_rewards_leased():
+    # Returns once all leases are processed - the lease containing the finalized head is only handed back
+    await asyncio.wait_for(main.index_block_rewards(), timeout=30)
+
+    assert _indexed_slots() == list(range(main.START_SLOT, HEAD_FINALIZED + 1))
+    assert _leases_state() == [
+        (4_700_010, True, None),
+        (4_700_020, True, None),
+        (4_700_030, True, None),
+        (4_700_040, False, None),
+    ]
+
+
+@pytest.mark.usefixtures("_stubbed_nodes", "_leases")
+@pytest.mark.asyncio
+async def test_index_block_rewards_leased_follows_head(monkeypatch):
+    new_head_finalized = HEAD_FINALIZED + 15
+    head_finalized_calls = []
+
+    class _AdvancingStubBeaconNode(_StubBeaconNode):
+        async def head_finalized(self) -> int:
+            head_finalized_calls.append(None)
+            # More slots are finalized while the leases are being processed
+            return HEAD_FINALIZED if len(head_finalized_calls) == 1 else new_head_finalized
+
+        async def is_slot_finalized(self, slot: int) -> bool:
+            await asyncio.sleep(0.02)
+            return slot <= new_head_finalized
+
+    monkeypatch.setattr(main, "BeaconNode", _AdvancingStubBeaconNode)
+    monkeypatch.setattr(main, "SLOT_TIME", 0.001)
+
+    await asyncio.wait_for(main.index_block_rewards(), timeout=30)
+
+    assert _indexed_slots() == list(range(main.START_SLOT, new_head_finalized + 1))
+    assert _leases_state() == [
+        (4_700_010, True, None),
+        (4_700_020, True, None),
+        (4_700_030, True, None),
+        (4_700_040, True, None),
+        (4_700_050, False, None),
+    ]
+
+
+class _SlowStubBeaconNode(_StubBeaconNode):
+    async def is_slot_finalized(self, slot: int) -> bool:
+        await asyncio.sleep(0.2)
+        return True
+
+
+@pytest.mark.usefixtures("_stubbed_nodes", "_leases")
+@pytest.mark.asyncio
+async def test_index_block_rewards_leased_lost_leases(monkeypatch):
+    monkeypatch.setattr(main, "BeaconNode", _SlowStubBeaconNode)
+    monkeypatch.setattr(main, "LEASE_DURATION", datetime.timedelta(seconds=0.03))
+    monkeypatch.setattr(main, "heartbeat_lease", lambda run, range_start, owner: False)
+
+    # Work on every lease is stopped, the leases stay with their (expiring) owner
+    await asyncio.wait_for(main.index_block_rewards(), timeout=30)
+
+    assert _indexed_slots() == []
+    assert [(range_start, completed) for range_start, completed, _ in _leases_state()] \
+           == [(4_700_010, False), (4_700_020, False), (4_700_030, False), (4_700_040, False)]
+
+
+@pytest.mark.usefixtures("_stubbed_nodes", "_leases")
+@pytest.mark.asyncio
+async def test_index_block_rewards_leased_cancelled(monkeypatch):
+    monkeypatch.setattr(main, "BeaconNode", _SlowStubBeaconNode)
+
+    indexer = asyncio.create_task(main.index_block_rewards())
+    await asyncio.sleep(0.1)
+    indexer.cancel()
+
+    # Cancelling the indexer is not mistaken for a lost lease
+    with pytest.raises(asyncio.CancelledError):
+        await indexer
+    assert _indexed_slots() == []
+
+
+class _BlockStubBeaconNode(_StubBeaconNode):
+    async def get_slot_proposer_data(self, slot: int) -> SlotProposerData:
+        return SlotProposerData(slot=slot, proposer_index=1, fee_recipient="0x" + "fe" * 20, block_number=slot,
+                                block_hash="0x" + "ab" * 32)
+
+
+@pytest.mark.usefixtures("_stubbed_nodes")
+@pytest.mark.asyncio
+async def test_verify_provisional_slot_failure(monkeypatch):
+    monkeypatch.setattr(main, "BeaconNode", _BlockStubBeaconNode)
+    verifications = []
+
+    async def _get_block_reward_value(slot_proposer_data, **kwargs):
+        verifications.append(slot_proposer_data.slot)
+        raise ValueError("Relay unavailable")
+
+    monkeypatch.setattr(main, "get_block_reward_value", _get_block_reward_value)
+    with session_scope() as session:
+        session.add(BlockReward(
+            slot=main.START_SLOT, proposer_index=1, mev=True, mev_reward_value_wei=10**17,
+            reward_processed_ok=True, reward_verified=False, reward_processing_attempts=1,
+        ))
+
+    await main.verify_provisional_slots()
+
+    with session_scope() as session:
+        block_reward = session.get(BlockReward, main.START_SLOT)
+        # The provisional value stays usable and is verified again after a backoff period
+        assert (block_reward.reward_processed_ok, block_reward.reward_verified) == (True, False)
+        assert block_reward.mev_reward_value_wei == 10**17
+        assert block_reward.reward_processing_error == "ValueError: Relay unavailable"
+        assert block_reward.reward_processing_attempts == 2
+        assert block_reward.reward_processing_next_attempt > datetime.datetime.now(tz=pytz.UTC)
+
+    # Not verified again before its next attempt is due
+    await main.verify_provisional_slots()
+    assert verifications == [main.START_SLOT]
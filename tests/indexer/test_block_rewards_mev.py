@@ -1,7 +1,13 @@
 import pytest
 
-from indexer.block_rewards.block_rewards_mev_simple import get_block_reward_value, ManualInspectionRequired
+from indexer.block_rewards.block_rewards_mev_simple import (
+    get_block_reward_value, ManualInspectionRequired,
+    BlockRewardContext, BlockRewardDetector, MevDetection, _run_detectors, _traced_value_received, DETECTORS,
+)
+from indexer.block_rewards.address_labels import AddressLabelRegistry
 from providers.beacon_node import SlotProposerData
+from providers.execution_node import TxData
+from providers.mev_relay import DeliveredPayloadsResponse
 from db.db_helpers import session_scope
 from db.tables import Withdrawal, WithdrawalAddress
 
@@ -870,3 +876,99 @@ async def test_get_block_reward_value(
     assert block_reward_value.contains_mev == expected_contains_mev
     assert block_reward_value.mev_recipient == expected_mev_reward_recipient
     assert block_reward_value.mev_recipient_balance_change == expected_mev_reward
+
+
+@pytest.mark.asyncio
+async def test_detectors_short_circuit(execution_node, db_provider):
+    ran = []
+
+    class _Detector(BlockRewardDetector):
+        def __init__(self, name, detection):
+            self.name = name
+            self.detection = detection
+
+        async def detect(self, ctx):
+            ran.append(self.name)
+            return self.detection
+
+    detection = MevDetection(mev_recipient="0x0", expected_value=1)
+    detectors = [_Detector("miss", None), _Detector("hit", detection), _Detector("expensive", detection)]
+    ctx = BlockRewardContext(
+        SlotProposerData(slot=1, proposer_index=1, fee_recipient="0x1", block_number=1, block_hash="0x2"),
+        execution_node=execution_node,
+        db_provider=db_provider,
+    )
+
+    detector, result = await _run_detectors(ctx, detectors)
+    assert detector.name == "hit"
+    assert result == detection
+    assert ran == ["miss", "hit"]
+
+
+@pytest.mark.asyncio
+async def test_relay_payload_takes_precedence(execution_node, db_provider):
+    # Block built by a builder that is its own fee recipient - the relay-reported value wins over the last tx
+    builder = "0x" + "bb" * 20
+    ctx = BlockRewardContext(
+        SlotProposerData(slot=1, proposer_index=1, fee_recipient=builder, block_number=1, block_hash="0x2"),
+        execution_node=execution_node,
+        db_provider=db_provider,
+        relay_payload_source=None,
+    )
+    ctx.labels = AddressLabelRegistry(labels={builder: frozenset({"builder"})}, version="test")
+    ctx._data.update(
+        block={"extraData": "0x", "transactions": ["0x3"]},
+        last_tx=TxData(from_=builder, to="0x" + "11" * 20, value=1),
+        relay_payload=DeliveredPayloadsResponse(
+            slot=1, block_hash="0x2", builder_pubkey="0x4", proposer_fee_recipient="0x" + "22" * 20, value=2,
+            block_number=1,
+        ),
+    )
+
+    names = [detector.name for detector in DETECTORS]
+    assert names.index("relay_payload") < names.index("builder_fee_recipient")
+    assert names.index("relay_payload") < names.index("mev_bot_contract")
+    detector, result = await _run_detectors(ctx, DETECTORS)
+    assert detector.name == "relay_payload"
+    assert result == MevDetection(mev_recipient="0x" + "22" * 20, expected_value=2)
+
+
+def test_detector_requires_detect():
+    class _Detector(BlockRewardDetector):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        _Detector()
+
+
+def test_traced_value_received():
+    address = "0xaa"
+    trace = {
+        "type": "CALL", "from": "0x01", "to": "0xbb", "value": "0x0",
+        "calls": [
+            {"type": "CALL", "from": "0xbb", "to": "0xaa", "value": "0x64"},
+            # Reverted, including its nested calls
+            {"type": "CALL", "from": "0xbb", "to": "0xcc", "value": "0x0", "error": "execution reverted", "calls": [
+                {"type": "CALL", "from": "0xcc", "to": "0xaa", "value": "0x10"},
+            ]},
+            # Value of delegate calls is not transferred
+            {"type": "DELEGATECALL", "from": "0xbb", "to": "0xaa", "value": "0x64"},
+            {"type": "SELFDESTRUCT", "from": "0xdd", "to": "0xAA", "value": "0x1"},
+        ],
+    }
+    labels = AddressLabelRegistry(labels={}, version="test")
+    assert _traced_value_received(trace, address, top_level=True, labels=labels) == 101
+
+
+def test_address_label_registry():
+    labels = AddressLabelRegistry.from_yaml(b"""
+labels:
+  builder:
+    - "0xDAFEA492D9c6733ae3d56b7Ed1ADB60692c98Bc5"
+  forwarder:
+    - "0xdafea492d9c6733ae3d56b7ed1adb60692c98bc5"
+""")
+    assert labels.labels_for("0xdafea492d9c6733ae3d56b7ed1adb60692c98bc5") == {"builder", "forwarder"}
+    assert labels.has_label("0xDAFEA492D9C6733AE3D56B7ED1ADB60692C98BC5", "builder")
+    assert labels.labels_for("0x0000000000000000000000000000000000000000") == frozenset()
+    assert labels.labels_for(None) == frozenset()
@@ -0,0 +1,202 @@
+import datetime
+import json
+
+import pytest
+import pytz
+
+from db.db_helpers import session_scope
+from db.tables import IndexerCursor, RocketPoolBondReduction, RocketPoolMinipool, RocketPoolNode, \
+    RocketPoolReward, RocketPoolRewardPeriod, RocketPoolUnresolvedMinipool
+from indexer.rocket_pool import main
+from providers.rocket_pool import RocketPoolDataProvider
+
+MINIPOOL_CREATED = "0x08b4b91bafaf992145c5dd7e098dfcdb32f879714c154c651c2758a44c7aeae4"
+BOND_REDUCED = "0x90e131460b9acb17565f1719b9ebc49998aec6b07a4743a09b1b700545769eb6"
+MINIPOOL_MANAGER = "0x" + "ee" * 20
+NODE = "0x" + "11" * 20
+MINIPOOL_A = "0x" + "aa" * 20
+MINIPOOL_B = "0x" + "bb" * 20
+BOND_REDUCTION_TIMESTAMP = 1_700_000_000
+
+
+def _word(value: str | int) -> str:
+    if isinstance(value, int):
+        return f"{value:064x}"
+    return value[2:].rjust(64, "0")
+
+
+def _minipool_created(block_number: int, minipool_address: str) -> dict:
+    return {
+        "blockNumber": hex(block_number),
+        "address": MINIPOOL_MANAGER,
+        "topics": [MINIPOOL_CREATED, "0x" + _word(minipool_address), "0x" + _word(NODE)],
+    }
+
+
+def _bond_reduced(block_number: int, minipool_address: str) -> dict:
+    return {
+        "blockNumber": hex(block_number),
+        "address": minipool_address,
+        "topics": [BOND_REDUCED],
+        "data": "0x" + _word(16 * 10**18) + _word(8 * 10**18) + _word(BOND_REDUCTION_TIMESTAMP),
+    }
+
+
+class _StubExecutionNode:
+    def __init__(self, logs: list[dict]):
+        self.logs = logs
+
+    async def get_logs(self, address, block_number_range, topics, use_infura=False) -> list[dict]:
+        from_block_number, to_block_number = block_number_range
+        return [
+            log for log in self.logs
+            if log["topics"][0] == topics[0] and from_block_number <= int(log["blockNumber"], 16) <= to_block_number
+            and address in (None, log["address"])
+        ]
+
+
+@pytest.fixture
+def _clean_rocket_pool_tables():
+    with session_scope() as session:
+        session.query(RocketPoolBondReduction).delete()
+        session.query(RocketPoolMinipool).delete()
+        session.query(RocketPoolUnresolvedMinipool).delete()
+        session.query(RocketPoolNode).delete()
+        session.query(IndexerCursor).delete()
+        session.add(RocketPoolNode(node_address=NODE, fee_distributor="0x" + "ff" * 20))
+    yield
+    with session_scope() as session:
+        session.query(RocketPoolBondReduction).delete()
+        session.query(RocketPoolMinipool).delete()
+        session.query(RocketPoolUnresolvedMinipool).delete()
+        session.query(RocketPoolNode).delete()
+        session.query(IndexerCursor).delete()
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("_clean_rocket_pool_tables")
+async def test_index_minipools_and_bond_reductions_resume(monkeypatch):
+    start = main.INITIAL_BLOCK_NUMBER
+    # B is created after A, then both of their bonds are reduced
+    logs = [
+        _minipool_created(start + 10, MINIPOOL_A),
+        _minipool_created(start + 20, MINIPOOL_B),
+        _bond_reduced(start + 30, MINIPOOL_A),
+        _bond_reduced(start + 40, MINIPOOL_B),
+    ]
+    rocket_pool_data = RocketPoolDataProvider(execution_node=_StubExecutionNode(logs))
+
+    async def _get_contract_addresses_between(contract_name, from_block_number, to_block_number):
+        return [MINIPOOL_MANAGER]
+
+    readable_minipools = {MINIPOOL_A}
+
+    async def _get_new_minipool(minipool_manager_address, minipool_address, creation_block_number):
+        if minipool_address not in readable_minipools:
+            return None
+        return "0x" + minipool_address[2:] * 2, 16 * 10**18, 14 * 10**16
+
+    monkeypatch.setattr(rocket_pool_data, "get_contract_addresses_between", _get_contract_addresses_between)
+    monkeypatch.setattr(rocket_pool_data, "_get_new_minipool", _get_new_minipool)
+
+    # First run - the data of minipool B cannot be read
+    with session_scope() as session:
+        await main._index_minipools_and_bond_reductions(session, rocket_pool_data, {NODE}, start + 100)
+
+    with session_scope() as session:
+        assert {a for a, in session.query(RocketPoolMinipool.minipool_address)} == {MINIPOOL_A}
+        assert {br.minipool_address for br in session.query(RocketPoolBondReduction)} == {MINIPOOL_A}
+        assert [(m.minipool_address, m.attempts) for m in session.query(RocketPoolUnresolvedMinipool)] == [
+            (MINIPOOL_B, 1)
+        ]
+        # Both cursors move on regardless of minipool B
+        assert main._get_next_block_number(session, main.CURSOR_MINIPOOLS) == start + 101
+        assert main._get_next_block_number(session, main.CURSOR_BOND_REDUCTIONS) == start + 101
+
+    # Second run - minipool B is retried, and its earlier bond reduction is picked up with it
+    readable_minipools.add(MINIPOOL_B)
+    with session_scope() as session:
+        await main._index_minipools_and_bond_reductions(session, rocket_pool_data, {NODE}, start + 200)
+
+    with session_scope() as session:
+        assert {a for a, in session.query(RocketPoolMinipool.minipool_address)} == {MINIPOOL_A, MINIPOOL_B}
+        assert {
+            (br.minipool_address, br.timestamp) for br in session.query(RocketPoolBondReduction)
+        } == {
+            (minipool_address, datetime.datetime.fromtimestamp(BOND_REDUCTION_TIMESTAMP, tz=pytz.UTC))
+            for minipool_address in (MINIPOOL_A, MINIPOOL_B)
+        }
+        assert session.query(RocketPoolUnresolvedMinipool).count() == 0
+        assert main._get_next_block_number(session, main.CURSOR_MINIPOOLS) == start + 201
+        assert main._get_next_block_number(session, main.CURSOR_BOND_REDUCTIONS) == start + 201
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("_clean_rocket_pool_tables")
+async def test_unresolved_minipool_attempts(monkeypatch):
+    start = main.INITIAL_BLOCK_NUMBER
+    monkeypatch.setattr(main, "MAX_MINIPOOL_ATTEMPTS", 2)
+    rocket_pool_data = RocketPoolDataProvider(
+        execution_node=_StubExecutionNode([_minipool_created(start + 10, MINIPOOL_A)])
+    )
+
+    async def _get_contract_addresses_between(contract_name, from_block_number, to_block_number):
+        return [MINIPOOL_MANAGER]
+
+    monkeypatch.setattr(rocket_pool_data, "get_contract_addresses_between", _get_contract_addresses_between)
+
+    # The node of minipool A is never indexed
+    for run in range(3):
+        with session_scope() as session:
+            await main._index_minipools_and_bond_reductions(session, rocket_pool_data, set(), start + 100 * (run + 1))
+
+    with session_scope() as session:
+        # No more attempts after MAX_MINIPOOL_ATTEMPTS
+        assert session.get(RocketPoolUnresolvedMinipool, MINIPOOL_A).attempts == 2
+        assert session.query(RocketPoolMinipool).count() == 0
+    assert main.ROCKET_POOL_UNRESOLVED_MINIPOOLS_RETRIES_EXHAUSTED._value.get() == 1
+
+
+@pytest.fixture
+def _clean_reward_periods():
+    yield
+    with session_scope() as session:
+        session.query(RocketPoolReward).delete()
+        session.query(RocketPoolRewardPeriod).delete()
+
+
+@pytest.mark.usefixtures("_clean_reward_periods")
+def test_index_reward_period(monkeypatch, tmp_path):
+    monkeypatch.setattr(main, "REWARDS_INSERT_BATCH_SIZE", 2)
+    inserted_batches = []
+    insert = main.insert
+
+    def _insert(table):
+        inserted_batches.append(table)
+        return insert(table)
+
+    monkeypatch.setattr(main, "insert", _insert)
+    node_addresses = [f"0x{i:040x}" for i in range(5)]
+    tree_path = tmp_path / "rp-rewards-mainnet-7.json"
+    # endTime comes after the node rewards
+    tree_path.write_text(json.dumps({
+        "index": 7,
+        "nodeRewards": {
+            node_address: {"collateralRpl": str(i), "smoothingPoolEth": str(10 * i)}
+            for i, node_address in enumerate(node_addresses)
+        },
+        "endTime": "2023-01-05T00:00:00Z",
+    }))
+
+    with session_scope() as session:
+        main._index_reward_period(session, 7, str(tree_path))
+
+    # Inserted in batches while reading the tree - 2 full batches and the rest
+    assert len(inserted_batches) == 3
+    with session_scope() as session:
+        reward_period = session.get(RocketPoolRewardPeriod, 7)
+        assert reward_period.reward_period_end_time == datetime.datetime(2023, 1, 5, tzinfo=pytz.UTC)
+        assert {
+            (reward.node_address, reward.reward_collateral_rpl, reward.reward_smoothing_pool_wei)
+            for reward in session.query(RocketPoolReward)
+        } == {(node_address, i, 10 * i) for i, node_address in enumerate(node_addresses)}
@@ -0,0 +1,184 @@
+import asyncio
+import datetime
+from decimal import Decimal
+
+import pytest
+import pytz
+
+from db.db_helpers import session_scope
+from db.tables import BlockReward, Validator, Withdrawal, RocketPoolBondReduction, RocketPoolMinipool, \
+    RocketPoolNode, RocketPoolProposalShare
+from indexer.rocket_pool import shares
+from indexer.rocket_pool.shares import get_withdrawal_node_operator_share, get_proposal_node_operator_share
+from providers.beacon_node import BeaconNode
+from providers.execution_node import ExecutionNode
+from providers.rocket_pool import RocketPoolDataProvider
+
+
+@pytest.mark.parametrize(
+    ["withdrawal_amount_gwei", "slot", "expected_node_share"],
+    [
+        pytest.param(
+            Decimal(10_000_000),
+            100,
+            5_900_000_000_000_000,
+            id="Partial withdrawal before bond reduction, initial fee & bond should be used"
+        ),
+        pytest.param(
+            32 * Decimal(1e9) + Decimal(50_000_000),
+            5_074_010,
+            29_500_000_000_000_000,
+            id="Full withdrawal before bond reduction, initial fee & bond should be used"
+        ),
+        pytest.param(
+            Decimal(10_000_000),
+            BeaconNode.slot_for_datetime(dt=datetime.datetime(year=2023, month=5, day=1, tzinfo=pytz.UTC)) + 1_000,
+            3_550_000_000_000_000,
+            id="Partial withdrawal after 1st bond reduction, LEB8"
+        ),
+        pytest.param(
+            Decimal(10_000_000),
+            BeaconNode.slot_for_datetime(dt=datetime.datetime(year=2025, month=1, day=1, tzinfo=pytz.UTC)) + 1_000,
+            2300000000000000,
+            id="Partial withdrawal after 2nd bond reduction, LEB4"
+        ),
+    ]
+)
+@pytest.mark.asyncio
+async def test_get_withdrawal_node_operator_share(withdrawal_amount_gwei, slot, expected_node_share):
+    # Set up - a validator with 2 bond reductions
+    initial_bond = Decimal(16_000_000_000_000_000_000)
+    initial_fee = Decimal(180_000_000_000_000_000)
+    bond_reductions = [
+        # Bond reduction 1 - to 8ETH, network fee 14%
+        RocketPoolBondReduction(
+            timestamp=datetime.datetime(year=2023, month=5, day=1, tzinfo=pytz.UTC),
+            new_bond_amount=Decimal(8_000_000_000_000_000_000),
+            new_fee=Decimal(140_000_000_000_000_000)
+        ),
+        # Bond reduction 1 - to 4ETH, network fee 12%
+        RocketPoolBondReduction(
+            timestamp=datetime.datetime(year=2025, month=1, day=1, tzinfo=pytz.UTC),
+            new_bond_amount=Decimal(4_000_000_000_000_000_000),
+            new_fee=Decimal(120_000_000_000_000_000)
+        ),
+    ]
+
+    minipool = RocketPoolMinipool(
+        minipool_address="0xb8d17ec656d5353d04d7f876e0ff6cc10f9d3b65",
+        bond_reductions=bond_reductions,
+        initial_bond_value=initial_bond,
+        initial_fee_value=initial_fee,
+    )
+
+    share = await get_withdrawal_node_operator_share(
+        withdrawal=Withdrawal(
+            slot=slot,
+            validator_index=123,
+            amount_gwei=withdrawal_amount_gwei,
+        ),
+        minipool=minipool,
+        rocket_pool_data=RocketPoolDataProvider(execution_node=ExecutionNode()),
+        beacon_node=BeaconNode(),
+    )
+    assert share == expected_node_share
+
+
+@pytest.mark.asyncio
+async def test_get_proposal_node_operator_share():
+    # Easiest case - fee distributor delegate supports getNodeShare()
+    # at time of block proposal
+    share = await get_proposal_node_operator_share(
+        node_address="0xb81e87018ec50d17116310c87b36622807581fa6",
+        fee_distributor="0xd03979c6952f74e80fe0c8a126c32fc1454b1627",
+        slot=8_211_441,
+        beacon_node=BeaconNode(),
+        rocket_pool_data=RocketPoolDataProvider(execution_node=ExecutionNode()),
+    )
+    # Full reward in wei - 25_468_585_834_907_426
+    # It was proposed by an LEB8 @ 14%
+    assert share == 9_041_347_971_392_136
+
+    # Manual calculation - fee distributor does not support getNodeShare()
+    # at time of block proposal (before Redstone upgrade)
+    share = await get_proposal_node_operator_share(
+        node_address="0xb81e87018ec50d17116310c87b36622807581fa6",
+        fee_distributor="0xd03979c6952f74e80fe0c8a126c32fc1454b1627",
+        slot=6_086_164,
+        beacon_node=BeaconNode(),
+        rocket_pool_data=RocketPoolDataProvider(execution_node=ExecutionNode()),
+    )
+    # Full reward in wei - 28_388_055_379_583_825
+    # It was proposed by an LEB16 @ 15%
+    assert share == 16_323_131_843_260_699
+
+
+NODE = "0x" + "11" * 20
+FEE_DISTRIBUTOR = "0x" + "fd" * 20
+FAILING_SLOT = 9_000_001
+
+
+@pytest.fixture
+def _rocket_pool_proposals():
+    with session_scope() as session:
+        session.add(RocketPoolNode(node_address=NODE, fee_distributor=FEE_DISTRIBUTOR))
+        session.add(Validator(validator_index=1, pubkey="0x" + "01" * 48))
+        session.flush()
+        session.add(RocketPoolMinipool(
+            minipool_address="0x" + "aa" * 20, validator_pubkey="0x" + "01" * 48,
+            initial_bond_value=16 * 10**18, initial_fee_value=14 * 10**16, node_address=NODE,
+        ))
+        for slot in (9_000_000, FAILING_SLOT, 9_000_002):
+            session.add(BlockReward(
+                slot=slot, block_number=slot, proposer_index=1, fee_recipient=FEE_DISTRIBUTOR, mev=False,
+                reward_processed_ok=True,
+            ))
+    yield
+    with session_scope() as session:
+        session.query(RocketPoolProposalShare).delete()
+        session.query(BlockReward).filter(BlockReward.slot.between(9_000_000, 9_000_002)).delete()
+        session.query(RocketPoolMinipool).filter(RocketPoolMinipool.node_address == NODE).delete()
+        session.query(RocketPoolNode).filter(RocketPoolNode.node_address == NODE).delete()
+        session.query(Validator).filter(Validator.validator_index == 1).delete()
+
+
+@pytest.mark.usefixtures("_rocket_pool_proposals")
+@pytest.mark.asyncio
+async def test_index_proposal_shares_failure(monkeypatch):
+    failing_slots = {FAILING_SLOT}
+
+    async def _get_proposal_node_operator_share(node_address, fee_distributor, slot, beacon_node,
+                                                rocket_pool_data, block_number=None):
+        if slot in failing_slots:
+            raise RuntimeError("Node unavailable")
+        return slot
+
+    monkeypatch.setattr(shares, "get_proposal_node_operator_share", _get_proposal_node_operator_share)
+
+    async def _index() -> int:
+        with session_scope() as session:
+            return await shares.index_proposal_shares(session, None, None, FAILING_SLOT + 1, asyncio.Semaphore(10))
+
+    # The failing proposal is stored with its error, the others are not held up by it
+    assert await _index() == 3
+    with session_scope() as session:
+        stored = {share.slot: share for share in session.query(RocketPoolProposalShare)}
+        assert {slot: share.node_operator_share_wei for slot, share in stored.items()} == {
+            9_000_000: 9_000_000, FAILING_SLOT: None, 9_000_002: 9_000_002,
+        }
+        assert stored[FAILING_SLOT].error == "RuntimeError: Node unavailable"
+        assert stored[FAILING_SLOT].attempts == 1
+        assert stored[FAILING_SLOT].next_attempt > datetime.datetime.now(tz=pytz.UTC)
+
+    # Not retried before its next attempt is due
+    assert await _index() == 0
+
+    failing_slots.clear()
+    with session_scope() as session:
+        session.get(RocketPoolProposalShare, FAILING_SLOT).next_attempt = datetime.datetime.now(tz=pytz.UTC)
+    assert await _index() == 1
+    with session_scope() as session:
+        retried = session.get(RocketPoolProposalShare, FAILING_SLOT)
+        assert (retried.node_operator_share_wei, retried.error, retried.attempts, retried.next_attempt) == (
+            FAILING_SLOT, None, 2, None,
+        )
@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import psycopg2
+
+from db.db_helpers import session_scope
+from providers.db_provider import ARRAY_PARAMETER_MIN_LENGTH, balances_gwei_query, balances_query, \
+    block_rewards_query, withdrawals_query
+
+# End of day slots of a year, starting with Apr-12-2023
+_EOD_SLOTS = [6_209_998 + day * 7_200 for day in range(365)]
+
+
+def _queries(validator_indexes: list[int]) -> dict:
+    return {
+        "balances": balances_query(slots=_EOD_SLOTS, validator_indexes=validator_indexes),
+        "balances_gwei": balances_gwei_query(slots=_EOD_SLOTS, validator_indexes=validator_indexes),
+        "withdrawals": withdrawals_query(min_slot=_EOD_SLOTS[0], max_slot=_EOD_SLOTS[-1], validator_indexes=validator_indexes),
+        "block_rewards": block_rewards_query(min_slot=_EOD_SLOTS[0], max_slot=_EOD_SLOTS[-1], proposer_indexes=validator_indexes),
+    }
+
+
+# Indexes the queries have to use, regardless of the number of validators
+_EXPECTED_INDEXES = {
+    "balances": {"balance_pkey"},
+    "balances_gwei": {"balance_pkey"},
+    "withdrawals": {"ix_withdrawal_validator_index"},
+    "block_rewards": {"block_reward_pkey"},
+}
+
+
+def _plan_nodes(node: dict) -> list[dict]:
+    return [node, *(n for child in node.get("Plans", []) for n in _plan_nodes(child))]
+
+
+def _explain(query) -> tuple[int, list[dict]]:
+    compiled = query.compile(dialect=psycopg2.dialect())
+    with session_scope() as session:
+        # The plan should not depend on the statistics of the (small) test tables,
+        # only on which indexes are usable for the conditions
+        session.execute(text("SET LOCAL enable_seqscan = off"))
+        plan = session.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled.string}", compiled.params).scalar()
+    return len(compiled.params), _plan_nodes(plan[0]["Plan"])
+
+
+@pytest.mark.parametrize("validator_count", [10_000, 50_000])
+@pytest.mark.parametrize("query_name", list(_EXPECTED_INDEXES))
+def test_plan_shape_for_big_validator_lists(query_name, validator_count):
+    param_count, plan_nodes = _explain(_queries(validator_indexes=list(range(validator_count)))[query_name])
+
+    # A single array parameter instead of a parameter per validator
+    assert param_count == len(_queries(validator_indexes=list(range(ARRAY_PARAMETER_MIN_LENGTH)))[query_name].compile().params)
+    assert not [n for n in plan_nodes if n["Node Type"] == "Seq Scan"]
+    assert {n["Index Name"] for n in plan_nodes if "Index Name" in n} == _EXPECTED_INDEXES[query_name]
+
+
+def test_short_lists_stay_in_lists():
+    query = balances_query(slots=_EOD_SLOTS[:3], validator_indexes=[1, 2])
+    assert " IN " in str(query.compile(dialect=psycopg2.dialect()))
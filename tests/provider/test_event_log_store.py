@@ -0,0 +1,73 @@
+import threading
+import time
+
+import pytest
+
+from db.db_helpers import session_scope
+from db.tables import EventLog, IndexerCursor
+from providers import event_log_store
+from providers.event_log_store import EventLogStore, SUBSCRIPTIONS, cursor_stream
+from providers.execution_node import ExecutionNode
+
+_LIDO = next(s for s in SUBSCRIPTIONS if s.name == "lido_el_rewards_received")
+_BOND_REDUCED = next(s for s in SUBSCRIPTIONS if s.name == "rocket_pool_bond_reduced")
+
+
+@pytest.mark.parametrize(
+    "address, block_number_range, topics, expected_range",
+    [
+        pytest.param(None, (20_000_000, 20_000_100), [_BOND_REDUCED.topic0], (20_000_000, 20_000_100), id="Fully covered"),
+        pytest.param(None, (20_000_000, 22_000_000), [_BOND_REDUCED.topic0], (20_000_000, 21_000_000), id="Partially covered"),
+        pytest.param(None, (21_000_001, 22_000_000), [_BOND_REDUCED.topic0], None, id="Not covered yet"),
+        pytest.param("0xAE7AB96520DE3A18E5E111B5EAAB095312D7FE84", (20_000_000, 20_000_000), [_LIDO.topic0], (20_000_000, 20_000_000), id="Subscribed address"),
+        pytest.param("0x0000000000000000000000000000000000000001", (20_000_000, 20_000_000), [_LIDO.topic0], None, id="Other address"),
+        pytest.param(None, (20_000_000, 20_000_000), [_BOND_REDUCED.topic0, "0x" + "00" * 32], None, id="Additional topic filter"),
+        pytest.param(None, (20_000_000, 20_000_000), ["0x" + "00" * 32], None, id="Topic without subscription"),
+    ]
+)
+def test_covered_range(address, block_number_range, topics, expected_range):
+    store = EventLogStore()
+    store._covered_up_to = {s.name: 21_000_000 for s in SUBSCRIPTIONS}
+    store._coverage_loaded_at = time.monotonic()
+
+    assert store.covered_range(address, block_number_range, topics) == expected_range
+
+
+@pytest.mark.asyncio
+async def test_execution_node_reads_shared_store(monkeypatch):
+    monkeypatch.setenv("EVENT_LOG_STORE_ENABLED", "true")
+    monkeypatch.setattr(event_log_store, "_SHARED_STORE", None)
+    log = {
+        "address": "0x" + "aa" * 20,
+        "topics": [_BOND_REDUCED.topic0],
+        "data": "0x" + "00" * 32,
+        "blockNumber": hex(20_000_050),
+        "logIndex": "0x3",
+        "transactionHash": "0x" + "bb" * 32,
+        "removed": False,
+    }
+    with session_scope() as session:
+        session.query(EventLog).filter(EventLog.topic0 == _BOND_REDUCED.topic0).delete()
+        event_log_store.store_logs(session, [_BOND_REDUCED], [log], last_block_number=20_000_100)
+
+    execution_node, other_execution_node = ExecutionNode(), ExecutionNode()
+    assert execution_node.log_store is other_execution_node.log_store
+
+    # Served from the store, in a worker thread instead of on the event loop
+    store_threads = []
+    get_stored_logs = execution_node.log_store.get_logs
+
+    def _get_stored_logs(*args, **kwargs):
+        store_threads.append(threading.current_thread())
+        return get_stored_logs(*args, **kwargs)
+
+    monkeypatch.setattr(execution_node.log_store, "get_logs", _get_stored_logs)
+    try:
+        logs = await execution_node.get_logs(None, (20_000_000, 20_000_100), [_BOND_REDUCED.topic0])
+    finally:
+        with session_scope() as session:
+            session.query(EventLog).filter(EventLog.topic0 == _BOND_REDUCED.topic0).delete()
+            session.query(IndexerCursor).filter(IndexerCursor.stream == cursor_stream(_BOND_REDUCED)).delete()
+
+    assert logs == [log]
+    assert store_threads and threading.main_thread() not in store_threads
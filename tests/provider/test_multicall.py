@@ -0,0 +1,168 @@
+import asyncio
+
+import pytest
+
+from providers.multicall import MULTICALL3_ADDRESS, MULTICALL3_DEPLOYMENT_BLOCK, Multicall, MulticallError, \
+    decode_aggregate3, encode_aggregate3
+
+TARGET_A = "0x" + "11" * 20
+TARGET_B = "0x" + "22" * 20
+REVERTING_TARGET = "0x" + "dd" * 20
+
+
+def _word(value: int) -> str:
+    return f"{value:064x}"
+
+
+def _decode_calls(calldata: str) -> list[tuple[str, str]]:
+    # aggregate3 calldata -> (target, calldata) pairs
+    data = bytes.fromhex(calldata[10:])
+
+    def _read_int(position: int) -> int:
+        return int.from_bytes(data[position:position + 32], byteorder="big")
+
+    items_start = _read_int(0) + 32
+    calls = []
+    for i in range(_read_int(items_start - 32)):
+        item_start = items_start + _read_int(items_start + 32 * i)
+        target = "0x" + data[item_start + 12:item_start + 32].hex()
+        data_start = item_start + _read_int(item_start + 64)
+        calls.append((target, "0x" + data[data_start + 32:data_start + 32 + _read_int(data_start)].hex()))
+    return calls
+
+
+def _encode_results(results: list[tuple[bool, str]]) -> str:
+    # (bool success, bytes returnData)[]
+    encoded_results = []
+    for success, return_data in results:
+        return_data = return_data[2:]
+        encoded_results.append(
+            _word(int(success)) + _word(64) + _word(len(return_data) // 2)
+            + return_data.ljust(-(-len(return_data) // 64) * 64, "0")
+        )
+    offsets = []
+    offset = 32 * len(results)
+    for encoded_result in encoded_results:
+        offsets.append(_word(offset))
+        offset += len(encoded_result) // 2
+    return "0x" + _word(32) + _word(len(results)) + "".join(offsets) + "".join(encoded_results)
+
+
+class _StubExecutionNode:
+    """
+    Answers aggregate3 calls - each call returns its target's address and
+    its calldata, calls to REVERTING_TARGET fail.
+    """
+    def __init__(self):
+        self.eth_calls = []
+
+    async def eth_call(self, params: list, use_infura: bool = False) -> str:
+        call, block = params
+        self.eth_calls.append((call["to"], block, call["data"]))
+        if call["to"] != MULTICALL3_ADDRESS:
+            return _return_data(call["to"], call["data"])
+        return _encode_results([
+            (target != REVERTING_TARGET, _return_data(target, data)) for target, data in _decode_calls(call["data"])
+        ])
+
+
+def _return_data(target: str, data: str) -> str:
+    return "0x" + target[2:].rjust(64, "0") + data[2:]
+
+
+def test_encode_aggregate3():
+    assert encode_aggregate3([(TARGET_A, "0x06fdde03"), (TARGET_B, "0x")]) == (
+        "0x82ad56cb"
+        + _word(0x20)  # offset of the calls array
+        + _word(2)  # number of calls
+        + _word(0x40)  # offset of the 1st call, from the start of the offsets
+        + _word(0xe0)  # offset of the 2nd call - after the 1st call's 5 words
+        # 1st call: target, allowFailure, offset of callData, callData length, callData
+        + ("11" * 20).rjust(64, "0") + _word(1) + _word(0x60) + _word(4) + "06fdde03".ljust(64, "0")
+        # 2nd call - empty callData
+        + ("22" * 20).rjust(64, "0") + _word(1) + _word(0x60) + _word(0)
+    )
+
+
+def test_decode_aggregate3():
+    result = (
+        "0x"
+        + _word(0x20)  # offset of the results array
+        + _word(2)  # number of results
+        + _word(0x40)  # offset of the 1st result, from the start of the offsets
+        + _word(0xc0)  # offset of the 2nd result - after the 1st result's 4 words
+        # 1st result: success, offset of returnData, returnData length, returnData
+        + _word(1) + _word(0x40) + _word(32) + _word(42)
+        # 2nd result - reverted with Error(string) selector only
+        + _word(0) + _word(0x40) + _word(4) + "08c379a0".ljust(64, "0")
+    )
+    assert decode_aggregate3(result) == [(True, "0x" + _word(42)), (False, "0x08c379a0")]
+
+
+def test_aggregate3_round_trip():
+    calls = [(TARGET_A, "0x06fdde03"), (TARGET_B, "0x"), (TARGET_A, "0x" + "ab" * 68)]
+    assert _decode_calls(encode_aggregate3(calls)) == calls
+
+
+@pytest.mark.asyncio
+async def test_multicall_allow_failure():
+    execution_node = _StubExecutionNode()
+    multicall = Multicall(execution_node=execution_node)
+
+    results = await asyncio.gather(
+        multicall.call(TARGET_A, "0x01", block_number=MULTICALL3_DEPLOYMENT_BLOCK),
+        multicall.call(REVERTING_TARGET, "0x02", block_number=MULTICALL3_DEPLOYMENT_BLOCK),
+        multicall.call(TARGET_B, "0x03", block_number=MULTICALL3_DEPLOYMENT_BLOCK),
+        return_exceptions=True,
+    )
+
+    # A single eth_call - the reverted call fails on its own
+    assert len(execution_node.eth_calls) == 1
+    assert results[0] == _return_data(TARGET_A, "0x01")
+    assert isinstance(results[1], MulticallError)
+    assert results[2] == _return_data(TARGET_B, "0x03")
+
+
+@pytest.mark.asyncio
+async def test_multicall_batches():
+    execution_node = _StubExecutionNode()
+    multicall = Multicall(execution_node=execution_node, max_batch_size=2)
+    block_number = MULTICALL3_DEPLOYMENT_BLOCK + 1
+    calls = [(TARGET_A, f"0x{i:02x}", block_number) for i in range(5)] + [
+        # Another block - a batch of its own
+        (TARGET_B, "0x10", block_number + 1),
+        # Before Multicall3 was deployed - called directly
+        (TARGET_B, "0x11", MULTICALL3_DEPLOYMENT_BLOCK - 1),
+    ]
+
+    results = await asyncio.gather(*[
+        multicall.call(target, data, block_number=call_block_number) for target, data, call_block_number in calls
+    ])
+
+    assert results == [_return_data(target, data) for target, data, _ in calls]
+    batch_sizes = sorted(
+        (block, len(_decode_calls(data)) if to == MULTICALL3_ADDRESS else None)
+        for to, block, data in execution_node.eth_calls
+    )
+    assert batch_sizes == [
+        (hex(MULTICALL3_DEPLOYMENT_BLOCK - 1), None),
+        (hex(block_number), 1),
+        (hex(block_number), 2),
+        (hex(block_number), 2),
+        (hex(block_number + 1), 1),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_multicall_failed_batch():
+    class _FailingExecutionNode:
+        async def eth_call(self, params: list, use_infura: bool = False) -> str:
+            raise ValueError("Node unavailable")
+
+    multicall = Multicall(execution_node=_FailingExecutionNode())
+    results = await asyncio.gather(
+        multicall.call(TARGET_A, "0x01", block_number=MULTICALL3_DEPLOYMENT_BLOCK),
+        multicall.call(TARGET_B, "0x02", block_number=MULTICALL3_DEPLOYMENT_BLOCK),
+        return_exceptions=True,
+    )
+    assert [str(result) for result in results] == ["Node unavailable"] * 2
@@ -0,0 +1,100 @@
+import datetime
+from decimal import Decimal
+
+import numpy as np
+import pytest
+import pytz
+
+from db.db_helpers import session_scope
+from db.tables import Price
+from providers.coin_gecko import SupportedToken
+from providers.price_cache import MissingPriceError, PriceCache
+
+DAY_0 = datetime.date(2023, 1, 1)
+
+
+def _day(offset: int) -> datetime.date:
+    return DAY_0 + datetime.timedelta(days=offset)
+
+
+def _add_prices(token: SupportedToken, currency: str, prices: dict[int, str]) -> None:
+    with session_scope() as session:
+        for day_offset, value in prices.items():
+            session.add(Price(
+                token=token.value,
+                currency=currency,
+                timestamp=datetime.datetime.combine(_day(day_offset), datetime.time(), tzinfo=pytz.UTC),
+                value=Decimal(value),
+            ))
+
+
+@pytest.fixture
+def _prices():
+    with session_scope() as session:
+        session.query(Price).delete()
+    # No price on day 3
+    _add_prices(SupportedToken.ETH, "usd", {0: "1200.10", 1: "1210.20", 2: "1220.30", 4: "1240.50"})
+    _add_prices(SupportedToken.ETH, "eur", {0: "1100.00"})
+    yield
+    with session_scope() as session:
+        session.query(Price).delete()
+
+
+@pytest.mark.usefixtures("_prices")
+@pytest.mark.asyncio
+async def test_close_prices():
+    cache = PriceCache()
+
+    assert np.array_equal(
+        await cache.close_prices(SupportedToken.ETH, "USD", _day(0), _day(2)), [1200.10, 1210.20, 1220.30],
+    )
+    assert np.array_equal(await cache.close_prices(SupportedToken.ETH, "usd", _day(1), _day(1)), [1210.20])
+    assert np.array_equal(await cache.close_prices(SupportedToken.ETH, "eur", _day(0), _day(0)), [1100.00])
+    assert len(await cache.close_prices(SupportedToken.ETH, "usd", _day(2), _day(1))) == 0
+
+
+@pytest.mark.parametrize(
+    "token, currency, start_day, end_day, missing_day",
+    [
+        pytest.param(SupportedToken.ETH, "usd", 0, 4, 3, id="Gap"),
+        pytest.param(SupportedToken.ETH, "usd", 4, 6, 5, id="After the last price"),
+        pytest.param(SupportedToken.ETH, "eur", 0, 1, 1, id="Other currency"),
+        pytest.param(SupportedToken.ETH, "gbp", 0, 0, 0, id="Unknown currency"),
+        pytest.param(SupportedToken.ROCKET_POOL, "usd", 0, 0, 0, id="Token without prices"),
+    ]
+)
+@pytest.mark.usefixtures("_prices")
+@pytest.mark.asyncio
+async def test_close_prices_missing(token, currency, start_day, end_day, missing_day):
+    with pytest.raises(MissingPriceError) as exc_info:
+        await PriceCache().close_prices(token, currency, _day(start_day), _day(end_day))
+    assert exc_info.value.date == _day(missing_day)
+
+
+@pytest.mark.usefixtures("_prices")
+@pytest.mark.asyncio
+async def test_refresh():
+    cache = PriceCache()
+    await cache.close_prices(SupportedToken.ETH, "usd", _day(0), _day(0))
+    _, _, day_capacity = cache._prices.shape
+    assert day_capacity >= (_day(4) - cache._first_date).days + 1
+
+    # Older than the prices loaded so far - not loaded by an incremental refresh
+    _add_prices(SupportedToken.ETH, "usd", {3: "1230.40"})
+    # Beyond the cached days - the days axis grows
+    beyond_capacity = day_capacity - (_day(0) - cache._first_date).days + 10
+    _add_prices(SupportedToken.ETH, "usd", {5: "1250.60", beyond_capacity: "2000.00"})
+    _add_prices(SupportedToken.ETH, "chf", {5: "1150.00"})
+    cache._refreshed_at = None
+
+    assert np.array_equal(await cache.close_prices(SupportedToken.ETH, "usd", _day(4), _day(5)), [1240.50, 1250.60])
+    assert cache._prices.shape[2] > day_capacity
+    assert np.array_equal(
+        await cache.close_prices(SupportedToken.ETH, "usd", _day(beyond_capacity), _day(beyond_capacity)), [2000.00],
+    )
+    assert np.array_equal(await cache.close_prices(SupportedToken.ETH, "chf", _day(5), _day(5)), [1150.00])
+    # Prices loaded before growing the cache are kept
+    assert np.array_equal(await cache.close_prices(SupportedToken.ETH, "eur", _day(0), _day(0)), [1100.00])
+    with pytest.raises(MissingPriceError) as exc_info:
+        await cache.close_prices(SupportedToken.ETH, "usd", _day(0), _day(4))
+    assert exc_info.value.date == _day(3)
@@ -1,7 +1,11 @@
+import io
+import json
+
 import pytest
 
 from providers.execution_node import ExecutionNode
-from providers.rocket_pool import RocketPoolDataProvider, _STORAGE_ROCKET_NODE_MANAGER_KEY
+from providers.rocket_pool import RocketPoolDataProvider, ContractAddressHistory, _STORAGE_ROCKET_NODE_MANAGER_KEY
+from providers.rocket_pool_rewards_trees import iter_rewards_tree
 
 
 @pytest.mark.asyncio
@@ -64,3 +68,48 @@ async def test_get_rocket_storage_value():
     assert await rocket_pool_data.get_rocket_storage_value(_STORAGE_ROCKET_NODE_MANAGER_KEY, block_number=15_300_000) == "0x4477fbf4af5b34e49662d9217681a763ddc0a322"
     assert await rocket_pool_data.get_rocket_storage_value(_STORAGE_ROCKET_NODE_MANAGER_KEY, block_number=15_500_000) == "0x67cde7af920682a29fcfea1a179ef0f30f48df3e"
     assert await rocket_pool_data.get_rocket_storage_value(_STORAGE_ROCKET_NODE_MANAGER_KEY, block_number=16_500_000) == "0x372236c940f572020c0c0eb1ac7212460e4e5a33"
+
+
+def test_contract_address_history():
+    history = ContractAddressHistory(
+        changes=[
+            (13_300_000, "0x0000000000000000000000000000000000000000"),
+            (15_400_000, "0x67cde7af920682a29fcfea1a179ef0f30f48df3e"),
+            (13_400_000, "0x4477fbf4af5b34e49662d9217681a763ddc0a322"),
+            (16_000_000, "0x372236c940f572020c0c0eb1ac7212460e4e5a33"),
+        ],
+        checked_up_to_block=17_000_000,
+    )
+    assert history.address_at(13_350_000) is None
+    assert history.address_at(15_300_000) == "0x4477fbf4af5b34e49662d9217681a763ddc0a322"
+    assert history.address_at(15_400_000) == "0x67cde7af920682a29fcfea1a179ef0f30f48df3e"
+    assert history.address_at(16_500_000) == "0x372236c940f572020c0c0eb1ac7212460e4e5a33"
+    assert history.covers(17_000_000) and not history.covers(17_000_001)
+    assert history.addresses_between(15_000_000, 15_999_999) == [
+        "0x4477fbf4af5b34e49662d9217681a763ddc0a322",
+        "0x67cde7af920682a29fcfea1a179ef0f30f48df3e",
+    ]
+    assert history.addresses_between(1, 13_000_000) == []
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+def test_iter_rewards_tree(chunk_size: int):
+    tree = {
+        "index": 12345,
+        "endTime": "2023-01-05T12:00:00Z",
+        "networkRewards": {"0": {"collateralRpl": "1", "smoothingPoolEth": "2"}},
+        "nodeRewards": {
+            "0xaa": {"collateralRpl": "100", "smoothingPoolEth": "200", "oracleDaoRpl": "0"},
+            "0xbb": {"collateralRpl": "300", "smoothingPoolEth": "400", "oracleDaoRpl": "0"},
+        },
+        "totalRewards": 1.5e3,
+    }
+    items = list(iter_rewards_tree(io.StringIO(json.dumps(tree, indent=2)), chunk_size=chunk_size))
+    assert items == [
+        (("index",), 12345),
+        (("endTime",), "2023-01-05T12:00:00Z"),
+        (("networkRewards",), tree["networkRewards"]),
+        (("nodeRewards", "0xaa"), tree["nodeRewards"]["0xaa"]),
+        (("nodeRewards", "0xbb"), tree["nodeRewards"]["0xbb"]),
+        (("totalRewards",), 1500.0),
+    ]
@@ -0,0 +1,98 @@
+"""
+Benchmarks encoding the /api/v2/rewards/full response with msgspec (src/api/responses.py) against
+FastAPI's default path (response_model validation, jsonable_encoder and json.dumps), using
+synthetic rewards. Also compares the cache codec of the v1 endpoints: json.dumps with
+pydantic_encoder and parse_raw_as on every cache hit against caching the encoded response.
+
+Usage: PYTHONPATH=src:tools python tools/benchmark_json_responses.py [validator count] [day count]
+"""
+import asyncio
+import datetime
+import json
+import sys
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic import parse_raw_as
+from pydantic.json import pydantic_encoder
+
+from api.api_v1.models import ExecLayerBlockReward
+from api.api_v2.models import ExecutionLayerRewardForDate, RewardForDate, RewardsResponseFull, ValidatorRewards
+from api.responses import MsgspecJSONResponse, encode_json
+from benchmark_rewards_engine import _balance_rows, _engine, _generate, _timed
+
+
+def _response(validator_count: int, day_count: int) -> RewardsResponseFull:
+    # Built the way /api/v2/rewards/full builds it
+    validator_indexes, activation_slots, initial_balances, eod_balances, withdrawals, block_rewards = \
+        _generate(validator_count, day_count)
+    consensus_layer_rewards, withdrawals, execution_layer_rewards = _engine(
+        activation_slots, initial_balances, _balance_rows(eod_balances), withdrawals, block_rewards,
+    )
+    return RewardsResponseFull.construct(validator_rewards_list=[
+        ValidatorRewards.construct(
+            validator_index=validator_index,
+            consensus_layer_rewards=[
+                RewardForDate.construct(date=date, amount_wei=amount_wei)
+                for date, amount_wei in consensus_layer_rewards.get(validator_index, [])
+            ],
+            execution_layer_rewards=[
+                ExecutionLayerRewardForDate.construct(date=date, amount_wei=amount_wei, verified=verified)
+                for date, amount_wei, verified in execution_layer_rewards.get(validator_index, [])
+            ],
+            withdrawals=[
+                RewardForDate.construct(date=date, amount_wei=amount_wei)
+                for date, amount_wei in withdrawals.get(validator_index, [])
+            ],
+        )
+        for validator_index in validator_indexes
+    ])
+
+
+def _fastapi_default(response: RewardsResponseFull) -> bytes:
+    content = asyncio.run(serialize_response(
+        field=create_response_field(name="response", type_=RewardsResponseFull),
+        response_content=response,
+        is_coroutine=True,
+    ))
+    return JSONResponse(content).body
+
+
+def _msgspec(response: RewardsResponseFull) -> bytes:
+    return MsgspecJSONResponse(response).body
+
+
+def main(validator_count: int, day_count: int) -> None:
+    print(f"{validator_count} validators x {day_count} days")
+    response = _response(validator_count, day_count)
+
+    default_body = _timed("FastAPI default (validation, jsonable_encoder, json.dumps)", _fastapi_default, response)
+    msgspec_body = _timed("msgspec", _msgspec, response)
+    print(f"Body: {len(default_body) / 1e6:.1f} MB / {len(msgspec_body) / 1e6:.1f} MB")
+    assert json.loads(default_body) == json.loads(msgspec_body), "Response bodies differ"
+
+    # Cache codec of /api/v1/latest_block_rewards
+    block_rewards = [
+        ExecLayerBlockReward(date=datetime.date(2023, 4, 12), reward=0.013 * i, slot=6_209_998 - i, mev=i % 2 == 0)
+        for i in range(50)
+    ]
+    iterations = 1_000
+    start = time.perf_counter()
+    for _ in range(iterations):
+        parse_raw_as(list[ExecLayerBlockReward], json.dumps(block_rewards, default=pydantic_encoder))
+    print(f"latest_block_rewards cache, json.dumps + parse_raw_as: {(time.perf_counter() - start) / iterations * 1e6:.0f}us")
+    start = time.perf_counter()
+    for _ in range(iterations):
+        # Cache hits return the cached bytes as they are
+        MsgspecJSONResponse(block_rewards)
+    print(f"latest_block_rewards cache, encode_json: {(time.perf_counter() - start) / iterations * 1e6:.0f}us")
+    assert json.loads(encode_json(block_rewards)) == json.loads(json.dumps(block_rewards, default=pydantic_encoder))
+
+
+if __name__ == "__main__":
+    main(
+        validator_count=int(sys.argv[1]) if len(sys.argv) > 1 else 1_000,
+        day_count=int(sys.argv[2]) if len(sys.argv) > 2 else 365,
+    )
@@ -0,0 +1,150 @@
+"""
+Benchmarks the vectorized rewards engine (src/api/rewards_engine.py) against the per-validator
+loop it replaced, using synthetic balances, withdrawals and block rewards.
+
+Usage: PYTHONPATH=src python tools/benchmark_rewards_engine.py [validator count] [day count]
+"""
+import datetime
+import random
+import sys
+import time
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+import pytz
+
+from api.rewards_engine import BalanceArrays, BlockRewardArrays, WithdrawalArrays, \
+    compute_consensus_layer_rewards, compute_execution_layer_rewards
+from providers.beacon_node import BeaconNode
+
+BalanceRow = namedtuple("BalanceRow", ["validator_index", "slot", "balance"])
+WithdrawalRow = namedtuple("WithdrawalRow", ["validator_index", "slot", "amount_gwei"])
+BlockRewardRow = namedtuple("BlockRewardRow", ["proposer_index", "slot", "mev", "mev_reward_value_wei",
+                                               "priority_fees_wei", "reward_verified"])
+
+START_DATE = datetime.date(2023, 6, 1)
+SLOTS_PER_DAY = 7200
+
+
+def _generate(validator_count: int, day_count: int, seed: int = 0):
+    rng = random.Random(seed)
+    start_slot = BeaconNode.slot_for_datetime(datetime.datetime.combine(START_DATE, datetime.time(), tzinfo=pytz.UTC))
+    eod_slots = [start_slot + (day + 1) * SLOTS_PER_DAY - 1 for day in range(day_count)]
+    validator_indexes = list(range(100_000, 100_000 + validator_count))
+
+    activation_slots, initial_balances, eod_balances, withdrawals, block_rewards = {}, {}, [], [], []
+    for validator_index in validator_indexes:
+        # Some validators are activated during the requested period
+        activation_slot = start_slot - 1 if rng.random() < 0.9 else rng.choice(eod_slots) - 3600
+        activation_slots[validator_index] = activation_slot
+        balance_gwei = 32_000_000_000 + rng.randrange(0, 50_000_000)
+        initial_balances[validator_index] = BalanceRow(validator_index, max(activation_slot, start_slot), Decimal(balance_gwei) / 10 ** 9)
+
+        next_withdrawal_slot = start_slot + rng.randrange(0, 5 * SLOTS_PER_DAY)
+        for eod_slot in eod_slots:
+            balance_gwei += rng.randrange(2_000_000, 3_000_000)
+            while next_withdrawal_slot <= eod_slot:
+                withdrawal_gwei = balance_gwei - 32_000_000_000
+                withdrawals.append(WithdrawalRow(validator_index, next_withdrawal_slot, withdrawal_gwei))
+                balance_gwei -= withdrawal_gwei
+                next_withdrawal_slot += 5 * SLOTS_PER_DAY
+            eod_balances.append(BalanceRow(validator_index, eod_slot, Decimal(balance_gwei) / 10 ** 9))
+
+        for _ in range(rng.randrange(0, 6)):
+            mev = rng.random() < 0.8
+            block_rewards.append(BlockRewardRow(
+                validator_index, rng.randrange(start_slot, eod_slots[-1]), mev,
+                Decimal(rng.randrange(10 ** 16, 10 ** 20)) if mev else None,
+                Decimal(rng.randrange(10 ** 15, 10 ** 17)), rng.random() < 0.95,
+            ))
+
+    eod_balances.sort(key=lambda b: b.slot)
+    return validator_indexes, activation_slots, initial_balances, eod_balances, withdrawals, block_rewards
+
+
+def _legacy(validator_indexes, activation_slots, initial_balances, eod_balances, all_withdrawals, all_block_rewards):
+    # The per-validator loop previously used by /api/v2/rewards/full
+    consensus_layer_rewards, withdrawals, execution_layer_rewards = defaultdict(list), defaultdict(list), defaultdict(list)
+    for validator_index in validator_indexes:
+        prev_balance = initial_balances[validator_index]
+        validator_withdrawals = [w for w in all_withdrawals if w.validator_index == validator_index]
+        for eod_balance in [eodb for eodb in eod_balances if eodb.validator_index == validator_index]:
+            if eod_balance.slot < activation_slots[validator_index]:
+                continue
+            amount_earned_wei = Decimal(1e18) * (eod_balance.balance - prev_balance.balance)
+            amount_withdrawn_this_day_wei = 0
+            for w in validator_withdrawals:
+                if eod_balance.slot >= w.slot > prev_balance.slot:
+                    amount_withdrawn_this_day_wei += w.amount_gwei * Decimal(1e9)
+            amount_earned_wei += amount_withdrawn_this_day_wei
+            date = BeaconNode.datetime_for_slot(slot=eod_balance.slot, timezone=pytz.UTC).date()
+            consensus_layer_rewards[validator_index].append((date, int(amount_earned_wei)))
+            if amount_withdrawn_this_day_wei > 0:
+                withdrawals[validator_index].append((date, int(amount_withdrawn_this_day_wei)))
+            prev_balance = eod_balance
+
+        exec_layer_rewards_for_date = defaultdict(int)
+        exec_layer_rewards_verified_for_date = defaultdict(lambda: True)
+        for br in [br for br in all_block_rewards if br.proposer_index == validator_index]:
+            date = BeaconNode.datetime_for_slot(br.slot, pytz.UTC).date()
+            exec_layer_rewards_for_date[date] += br.mev_reward_value_wei if br.mev else br.priority_fees_wei
+            exec_layer_rewards_verified_for_date[date] &= br.reward_verified
+        for date, rewards_sum in sorted(exec_layer_rewards_for_date.items()):
+            execution_layer_rewards[validator_index].append((date, int(rewards_sum), exec_layer_rewards_verified_for_date[date]))
+    return dict(consensus_layer_rewards), dict(withdrawals), dict(execution_layer_rewards)
+
+
+def _balance_rows(balances: list[BalanceRow]) -> list[tuple[int, int, int]]:
+    # As returned by DbProvider.balances_gwei
+    return [(b.validator_index, b.slot, int(b.balance * 10 ** 9)) for b in balances]
+
+
+def _engine(activation_slots, initial_balances, eod_balance_rows, withdrawals, block_rewards):
+    cl_rewards, cl_withdrawals = compute_consensus_layer_rewards(
+        initial_balances=BalanceArrays.from_rows(_balance_rows(list(initial_balances.values()))),
+        activation_slots=activation_slots,
+        eod_balances=BalanceArrays.from_rows(eod_balance_rows),
+        withdrawals=WithdrawalArrays.from_withdrawals(withdrawals),
+    )
+    el_rewards = compute_execution_layer_rewards(BlockRewardArrays.from_block_rewards(block_rewards))
+    return cl_rewards.by_validator(), cl_withdrawals.by_validator(), el_rewards.by_validator()
+
+
+def _timed(label: str, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    print(f"{label}: {time.perf_counter() - start:.3f}s")
+    return result
+
+
+def main(validator_count: int, day_count: int) -> None:
+    # Results match the previous implementation
+    validator_indexes, activation_slots, initial_balances, eod_balances, withdrawals, block_rewards = \
+        _generate(validator_count=50, day_count=60, seed=1)
+    assert _legacy(validator_indexes, activation_slots, initial_balances, eod_balances, withdrawals, block_rewards) \
+        == _engine(activation_slots, initial_balances, _balance_rows(eod_balances), withdrawals, block_rewards), \
+        "Engine results differ from the previous implementation"
+
+    print(f"{validator_count} validators x {day_count} days")
+    validator_indexes, activation_slots, initial_balances, eod_balances, withdrawals, block_rewards = \
+        _generate(validator_count, day_count)
+    eod_balance_rows = _balance_rows(eod_balances)
+    print(f"{len(eod_balance_rows)} balances, {len(withdrawals)} withdrawals, {len(block_rewards)} block rewards")
+    _timed("Rewards engine (incl. loading rows into arrays)", _engine,
+           activation_slots, initial_balances, eod_balance_rows, withdrawals, block_rewards)
+
+    # The previous implementation scales with validators x rows - measure a subset and extrapolate
+    subset_size = max(1, min(validator_count, 100))
+    subset = _generate(subset_size, day_count)
+    start = time.perf_counter()
+    _legacy(*subset)
+    elapsed = time.perf_counter() - start
+    print(f"Previous implementation, {subset_size} validators: {elapsed:.3f}s"
+          f" (~{elapsed * (validator_count / subset_size) ** 2:.0f}s extrapolated to {validator_count})")
+
+
+if __name__ == "__main__":
+    main(
+        validator_count=int(sys.argv[1]) if len(sys.argv) > 1 else 10_000,
+        day_count=int(sys.argv[2]) if len(sys.argv) > 2 else 365,
+    )